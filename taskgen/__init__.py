@@ -0,0 +1,18 @@
+"""
+Task generation and submission review for the course repository.
+
+Every stage is a module of this package and runs through a single entry
+point, ``python -m taskgen <command>``. Keep this module free of imports
+beyond the standard library: it is loaded by every command, including the
+quick ones that must not pay for the OpenAI SDK.
+"""
+import os
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def package_env(extra=None):
+    """Environment for a subprocess that runs ``python -m taskgen`` from any working directory."""
+    env = dict(os.environ, **(extra or {}))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [PACKAGE_ROOT, env.get("PYTHONPATH")]))
+    return env
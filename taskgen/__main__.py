@@ -0,0 +1,151 @@
+import os
+import re
+import sys
+import runpy
+import subprocess
+
+from . import package_env
+
+# command: (module, leading arguments, help). Modules are only imported when
+# their command runs, so quick commands never load openai, requests or pytz.
+COMMANDS = {
+    # Generate Task workflow, in pipeline order
+    "generate-task-description": ("generate_task_description", [], "Generate a task description on a new branch"),
+    "generate-solution": ("generate_solution", [], "Generate the hidden solution"),
+    "adversarial-review": ("adversarial_solution", [], "Review and improve the solution"),
+    "generate-tests": ("generate_tests", [], "Generate JUnit tests for the solution"),
+    "adversarial-test-review": ("adversarial_tests", [], "Review and improve the tests"),
+    "generate-template-code": ("generate_template_code", [], "Generate the student template"),
+    "pipeline": ("pipeline", [], "Run every generation stage locally"),
+    "cohort": ("generate_cohort", [], "Generate a matrix of task variants"),
+    # Pull request workflow
+    "review": ("review_submission", [], "Review a submission and comment on the PR"),
+    "review-daemon": ("review_daemon", [], "Serve PR webhooks and review them on warm workers"),
+    "feedback": ("generate_feedback_and_clues", [], "Comment hints for failing tests"),
+    "compliment": ("generate_compliment_and_merge", [], "Comment a compliment for passing tests"),
+    "grade": ("grade_submission", [], "Grade a submission against the solution"),
+    "grade-all": ("grading_pool", [], "Run the tests against many submissions"),
+    "benchmark": ("benchmark_complexity", [], "Estimate the complexity of a submission"),
+    "mutation": ("mutation", [], "Measure how many solution mutants the tests catch"),
+    "microbench": ("microbench", [], "Time the text-processing steps and check them against the baseline"),
+    # Quick local commands
+    "stats": ("completion", ["stats"], "Show completion latency and hedging statistics"),
+    "feedback-stats": ("feedback_store", ["stats"], "Show feedback store hit rates"),
+    "budget": ("budget", [], "Show the token and time budget report of a run"),
+    "pool": ("response_pool", [], "Fill or inspect the pre-generated response pools"),
+    "test-results": ("test_results", [], "Summarize a test report as the feedback prompt sees it"),
+    "artifacts": ("artifact_store", [], "Store, fetch or measure generated artifacts outside the branches"),
+    "gate": ("validation", [], "Show which files the adversarial stages would review"),
+    "symbols": ("symbols", [], "Index the Java symbols and check solution, template and tests agree"),
+    "validate": (None, [], "Validate generated solution code without calling the API"),
+    "fake-llm": ("fake_llm", [], "Serve a fake OpenAI-compatible API for local runs"),
+    "import-times": (None, [], "Measure the import time of every module"),
+}
+
+# Imports that should only happen inside the commands that need them
+HEAVY_MODULES = ("openai", "requests", "pytz", "yaml")
+
+
+def print_usage():
+    print("Usage: python -m taskgen <command> [arguments]\n")
+    width = max(len(command) for command in COMMANDS)
+    for command, (_, _, description) in COMMANDS.items():
+        print(f"  {command:<{width}}  {description}")
+
+
+def validate(paths):
+    """Run the local solution checks on Java files or a raw model response."""
+    from .generate_solution import validate_solution
+
+    if not paths:
+        print("Usage: python -m taskgen validate <file_or_directory>...")
+        return 1
+
+    contents = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".java"):
+                    with open(os.path.join(path, name), "r") as f:
+                        contents.append(f.read())
+        else:
+            with open(path, "r") as f:
+                contents.append(f.read())
+
+    problems = validate_solution("\n\n".join(contents))
+    for problem in problems:
+        print(f"- {problem}")
+    print("Solution is invalid." if problems else "Solution is valid.")
+    return 1 if problems else 0
+
+
+def import_times(modules):
+    """
+    Import each module in a fresh interpreter under -X importtime and report
+    its cumulative import time and which heavy dependencies it pulled in.
+    """
+    modules = modules or ["__main__"] + sorted({module for module, _, _ in COMMANDS.values() if module})
+    print(f"{'module':<32}{'import':>10}  heavy dependencies")
+    for module in modules:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import taskgen.{module}"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            env=package_env()
+        )
+        cumulative = None
+        loaded = set()
+        for line in result.stderr.splitlines():
+            match = re.match(r'import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)', line)
+            if not match:
+                continue
+            if match.group(3) == f"taskgen.{module}":
+                cumulative = int(match.group(1))
+            if match.group(3).split(".")[0] in HEAVY_MODULES:
+                loaded.add(match.group(3).split(".")[0])
+        if result.returncode != 0 or cumulative is None:
+            print(f"{module:<32}{'failed':>10}")
+            continue
+        print(f"{module:<32}{cumulative / 1000:>8.1f}ms  {', '.join(sorted(loaded)) or '-'}")
+    return 0
+
+
+def materialise_artifacts():
+    """Write the stored artifacts a branch only has a manifest of, when the store is enabled."""
+    from . import artifact_store
+
+    if artifact_store.enabled() and os.path.exists(artifact_store.MANIFEST):
+        written = artifact_store.materialise(artifact_store.ArtifactStore())
+        if written:
+            print(f"Materialised {written} artifact files from the store.")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print_usage()
+        return 0
+
+    command, arguments = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"Error: Unknown command '{command}'.\n")
+        print_usage()
+        return 1
+    if command == "validate":
+        return validate(arguments)
+    if command == "import-times":
+        return import_times(arguments)
+
+    module, leading, _ = COMMANDS[command]
+    if module != "artifact_store":
+        materialise_artifacts()
+
+    # Run the module exactly as if it had been started as a script
+    sys.argv = [f"taskgen {command}"] + leading + arguments
+    runpy.run_module(f"taskgen.{module}", run_name="__main__")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
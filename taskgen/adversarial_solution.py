@@ -1,10 +1,13 @@
 import os
 import re
 import sys
-from openai import OpenAI
+
+from .completion import chat_messages, create_client, generate_with_retries
+from .java import api_surface, check_and_add_missing_imports, clean_class_block
+from .validation import files_to_review, format_problems, java_files, validate
 
 def main(api_key, task_file, solution_dir):
-    client = OpenAI(api_key=api_key)
+    client = create_client(api_key)
 
     # Read the task description
     try:
@@ -14,14 +17,22 @@ def main(api_key, task_file, solution_dir):
         print("Error: task description file not found.")
         sys.exit(1)
 
-    # Read the existing solution files in the solution directory
-    solution_files = []
-    for filename in os.listdir(solution_dir):
-        if filename.endswith(".java"):
-            with open(os.path.join(solution_dir, filename), "r") as file:
-                solution_files.append(file.read())
+    # Only files that fail the local checks are rewritten; a rewrite of a
+    # sound file costs a full completion and can make it worse
+    problems, _ = validate(solution_dir)
+    review = files_to_review(problems, solution_dir)
+    if not review and problems:
+        # Problems that no file can fix, such as a missing solution
+        print(f"Error: the solution has problems but no files to review:\n{format_problems(problems, sorted(problems))}")
+        sys.exit(1)
+    if not review:
+        print("The solution passes validation, skipping the adversarial review.")
+        return
 
-    solution_content = "\n\n".join(solution_files)
+    solution_files = java_files(solution_dir)
+    solution_content = "\n\n".join(solution_files[name] for name in review)
+    others = "\n".join(api_surface(code) for name, code in solution_files.items() if name not in review)
+    print(f"Reviewing {', '.join(review)}.")
 
     # Prompt to improve the solution
     prompt = (
@@ -29,6 +40,12 @@ def main(api_key, task_file, solution_dir):
         f"Correct any issues or missing requirements that might be present in the solution.\n\n"
         f"### Task Description\n{task_description}\n\n"
         f"### Current Solution\n{solution_content}\n\n"
+    )
+    if problems:
+        prompt += f"### Problems Found by Local Checks\n{format_problems(problems, review)}\n\n"
+    if others:
+        prompt += f"### Other Classes (correct, do not return them)\n{others}\n\n"
+    prompt += (
         "IMPORTANT: Provide an improved version of the solution with corrections, if necessary, and ensure that the updated code is complete and functional."
         "Check for missing imports, misplaced code, and correct all invalid or incomplete class definitions."
         "Ensure all methods are correctly implemented, all imports are included, and the solution can be compiled and run without errors."
@@ -36,7 +53,9 @@ def main(api_key, task_file, solution_dir):
     )
 
     # Generate the improved solution
-    improved_solution = generate_with_retries(client, prompt, max_retries=3)
+    improved_solution = generate_with_retries(
+        client, chat_messages(prompt), stage="adversarial-review", description="improved solution"
+    )
     
     # Clean up the improved solution
     improved_solution = clean_up_non_code_content(improved_solution)
@@ -44,8 +63,8 @@ def main(api_key, task_file, solution_dir):
     # Check for missing imports and add them
     improved_solution = check_and_add_missing_imports(improved_solution)
 
-    # Overwrite the existing solution files with the cleaned and improved solution
-    write_improved_solution(solution_dir, improved_solution)
+    # Overwrite the reviewed solution files with the cleaned and improved solution
+    write_improved_solution(solution_dir, improved_solution, {name[:-len(".java")] for name in review})
 
 def clean_up_non_code_content(solution_code):
     """
@@ -73,38 +92,6 @@ def clean_up_non_code_content(solution_code):
 
     return cleaned_code.strip()
 
-def check_and_add_missing_imports(solution_code):
-    """
-    Check the solution for missing imports based on the usage of common Java classes
-    and add necessary imports if missing.
-    """
-    required_imports = {
-        "List": "import java.util.List;",
-        "ArrayList": "import java.util.ArrayList;",
-        "Map": "import java.util.Map;",
-        "HashMap": "import java.util.HashMap;",
-        "Scanner": "import java.util.Scanner;",
-        "Set": "import java.util.Set;",
-        "HashSet": "import java.util.HashSet;",
-        "Collections": "import java.util.Collections;",
-        "Random": "import java.util.Random;"
-    }
-
-    # Extract existing imports from the solution
-    existing_imports = re.findall(r'^\s*import .*;', solution_code, re.MULTILINE)
-
-    # Add missing imports
-    imports_to_add = []
-    for class_name, import_statement in required_imports.items():
-        if class_name in solution_code and import_statement not in existing_imports:
-            imports_to_add.append(import_statement)
-
-    # Prepend missing imports at the start of the solution code
-    if imports_to_add:
-        solution_code = "\n".join(imports_to_add) + "\n\n" + solution_code
-
-    return solution_code
-
 def validate_class_definitions(improved_solution):
     """
     Validates that all class definitions are correct, braces are balanced,
@@ -123,25 +110,12 @@ def validate_class_definitions(improved_solution):
     
     return improved_solution
 
-def generate_with_retries(client, prompt, max_retries=3):
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-2024-08-06",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"Error generating improved solution: {e}")
-            if attempt < max_retries - 1:
-                print("Retrying...")
-    return None
-
-def write_improved_solution(directory, improved_solution):
-    """Overwrite the existing solution files with the improved solution."""
+def write_improved_solution(directory, improved_solution, class_names=None):
+    """
+    Overwrite the existing solution files with the improved solution. With
+    class_names, other classes that already have a file are not written;
+    new classes, such as helpers the review added, are.
+    """
     
     # Split the solution by class definitions
     file_blocks = improved_solution.split("class ")
@@ -155,12 +129,16 @@ def write_improved_solution(directory, improved_solution):
                 if not class_name.isidentifier():
                     print(f"Skipping block with invalid class name: '{class_name}'")
                     continue
+                if class_names is not None and class_name not in class_names \
+                        and os.path.exists(os.path.join(directory, f"{class_name}.java")):
+                    print(f"Skipping {class_name}, it was not under review.")
+                    continue
             else:
                 print("Skipping block due to missing class name.")
                 continue
 
             # Clean the block, removing content after the last closing brace
-            cleaned_block = clean_class_block("class " + block)
+            cleaned_block = clean_class_block("class " + block, strip_preamble=True)
 
             # Write cleaned code to a file
             file_name = f"{class_name}.java"
@@ -173,21 +151,6 @@ def write_improved_solution(directory, improved_solution):
             except IOError as e:
                 print(f"Error writing file {file_name}: {e}")
 
-def clean_class_block(block):
-    """Ensure the block only contains content until the last closing brace."""
-    
-    # Find the position of the last closing brace '}' in the block
-    last_closing_brace = block.rfind("}")
-    
-    if last_closing_brace != -1:
-        # Truncate the block at the last closing brace
-        block = block[:last_closing_brace + 1]
-    
-    # Remove any content before the first class declaration
-    block = re.sub(r'.*?(class\s)', r'class ', block, count=1, flags=re.DOTALL)
-
-    return block
-
 if __name__ == "__main__":
     if len(sys.argv) != 4:
         print("Error: Missing required command line arguments 'api_key', 'task_file', and 'solution_dir'")
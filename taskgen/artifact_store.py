@@ -0,0 +1,430 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import zlib
+import shutil
+import hashlib
+import tarfile
+import argparse
+import tempfile
+import subprocess
+
+from .git import GitObjectReader
+from .rundir import STAGE_ARTIFACTS
+
+STORE_DIR = os.getenv(
+    "ARTIFACT_STORE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "taskgen", "artifacts")
+)
+
+# Chunks are published as blobs of a commit on this ref. It is outside
+# refs/heads, so a plain clone of the repository never downloads them.
+STORE_REF = "refs/artifacts/store"
+MANIFEST = ".artifacts.json"
+MANIFEST_VERSION = 1
+# Tries of publish before it gives up on concurrent publishes
+PUBLISH_ATTEMPTS = 5
+
+# Everything the generation stages write
+ARTIFACT_PATHS = sorted({path for _, outputs in STAGE_ARTIFACTS.values() for path in outputs})
+
+# Chunks end after a line whose CRC has these bits clear (about every 32
+# lines), so an edit only changes the chunks around it
+CHUNK_MASK = 0x1f
+MAX_CHUNK = 64 * 1024
+
+
+def enabled():
+    """Stages commit manifests instead of artifacts when ARTIFACT_STORE is set."""
+    return os.getenv("ARTIFACT_STORE", "").lower() in ("1", "true", "yes")
+
+
+def compress(data):
+    """zstd when the zstandard package is installed, zlib otherwise; the first byte says which."""
+    try:
+        import zstandard
+    except ImportError:
+        return b"Z" + zlib.compress(data, 9)
+    return b"S" + zstandard.ZstdCompressor(level=19).compress(data)
+
+
+def decompress(blob):
+    if blob[:1] == b"Z":
+        return zlib.decompress(blob[1:])
+    if blob[:1] == b"S":
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("This chunk is zstd-compressed; install the zstandard package to read it.")
+        return zstandard.ZstdDecompressor().decompress(blob[1:])
+    raise ValueError("Unknown chunk encoding")
+
+
+def split_chunks(data):
+    """Split data into content-defined chunks on line boundaries."""
+    chunks = []
+    start = position = 0
+    for line in data.splitlines(keepends=True):
+        position += len(line)
+        if (zlib.crc32(line) & CHUNK_MASK) == 0 or position - start >= MAX_CHUNK:
+            chunks.append(data[start:position])
+            start = position
+    if start < len(data):
+        chunks.append(data[start:])
+    return chunks
+
+
+def git(*args, check=True, **kwargs):
+    return subprocess.run(["git"] + list(args), check=check, stdout=subprocess.PIPE, **kwargs).stdout
+
+
+class ArtifactStore:
+    """
+    Compressed chunks keyed by the SHA-256 of their content, so a chunk
+    shared by any number of files, bundles or branches is stored once.
+    """
+
+    def __init__(self, directory=STORE_DIR):
+        self.directory = directory
+
+    def _path(self, digest):
+        return os.path.join(self.directory, "objects", digest[:2], digest[2:])
+
+    def has(self, digest):
+        return os.path.exists(self._path(digest))
+
+    def put_raw(self, digest, blob):
+        """Store an already compressed chunk."""
+        path = self._path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, path)
+
+    def get_raw(self, digest):
+        with open(self._path(digest), "rb") as f:
+            return f.read()
+
+    def put_file(self, path):
+        """Store the chunks of a file and return its manifest entry."""
+        with open(path, "rb") as f:
+            data = f.read()
+        chunks = []
+        for chunk in split_chunks(data):
+            digest = hashlib.sha256(chunk).hexdigest()
+            if not self.has(digest):
+                self.put_raw(digest, compress(chunk))
+            chunks.append(digest)
+        return {
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "size": len(data),
+            "executable": os.access(path, os.X_OK),
+            "chunks": chunks,
+        }
+
+    def read_file(self, entry):
+        data = b"".join(decompress(self.get_raw(digest)) for digest in entry["chunks"])
+        if hashlib.sha256(data).hexdigest() != entry["sha256"]:
+            raise ValueError("Reassembled file does not match its manifest hash")
+        return data
+
+    def digests(self):
+        objects = os.path.join(self.directory, "objects")
+        if not os.path.isdir(objects):
+            return []
+        return [prefix + name for prefix in os.listdir(objects) for name in os.listdir(os.path.join(objects, prefix))
+                if not name.endswith(".tmp")]
+
+    def size(self):
+        return sum(os.path.getsize(self._path(digest)) for digest in self.digests())
+
+
+def load_manifest(path=MANIFEST):
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {"version": MANIFEST_VERSION, "files": {}}
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"{path} has an unsupported manifest version")
+    return manifest
+
+
+def save_manifest(manifest, path=MANIFEST):
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def walk_files(path):
+    if os.path.isfile(path):
+        yield path
+        return
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            yield os.path.join(root, name)
+
+
+def store_paths(store, paths, manifest_path=MANIFEST):
+    """
+    Put every file below paths into the store and record them in the
+    manifest, replacing earlier entries under the same paths.
+    """
+    manifest = load_manifest(manifest_path)
+    for path in paths:
+        prefix = os.path.normpath(path)
+        manifest["files"] = {
+            name: entry for name, entry in manifest["files"].items()
+            if name != prefix and not name.startswith(prefix + "/")
+        }
+        for file in walk_files(path):
+            manifest["files"][os.path.normpath(file).replace(os.sep, "/")] = store.put_file(file)
+    save_manifest(manifest, manifest_path)
+    return manifest
+
+
+def manifest_digests(manifest):
+    return sorted({digest for entry in manifest["files"].values() for digest in entry["chunks"]})
+
+
+def materialise(store, manifest_path=MANIFEST, force=False, remote="origin"):
+    """
+    Write the files of the manifest into the working tree, fetching missing
+    chunks from the remote first. Files that already exist are kept unless
+    force is set, so local edits are never overwritten. Returns the number
+    of files written.
+    """
+    manifest = load_manifest(manifest_path)
+    fetch(store, manifest_digests(manifest), remote)
+    written = 0
+    for name, entry in sorted(manifest["files"].items()):
+        if os.path.exists(name) and not force:
+            continue
+        os.makedirs(os.path.dirname(name) or ".", exist_ok=True)
+        with open(name, "wb") as f:
+            f.write(store.read_file(entry))
+        if entry.get("executable"):
+            os.chmod(name, 0o755)
+        written += 1
+    return written
+
+
+def fetch(store, digests, remote="origin"):
+    """Copy the chunks missing from the local store out of the store ref of remote."""
+    missing = [digest for digest in digests if not store.has(digest)]
+    if not missing:
+        return 0
+    git("fetch", "--quiet", remote, f"+{STORE_REF}:{STORE_REF}")
+    with GitObjectReader() as reader:
+        for digest in missing:
+            blob = reader.read(STORE_REF, digest)
+            if blob is None:
+                raise KeyError(f"Chunk {digest} is not in {STORE_REF}")
+            store.put_raw(digest, blob)
+    return len(missing)
+
+
+def read_artifact_directory(reader, ref, directory, suffix=""):
+    """
+    Return {file name: text} of directory at ref like reader.read_directory,
+    taking the files from the store when ref only has them in its manifest.
+    """
+    files = reader.read_directory(ref, directory, suffix)
+    if files is not None:
+        return files
+    content = reader.read(ref, MANIFEST)
+    if content is None:
+        return None
+    manifest = json.loads(content)
+    prefix = directory.strip("/") + "/"
+    entries = {
+        name[len(prefix):]: entry for name, entry in manifest["files"].items()
+        if name.startswith(prefix) and "/" not in name[len(prefix):] and name.endswith(suffix)
+    }
+    if not entries:
+        return None
+    store = ArtifactStore()
+    fetch(store, sorted({digest for entry in entries.values() for digest in entry["chunks"]}))
+    return {name: store.read_file(entry).decode("utf-8") for name, entry in sorted(entries.items())}
+
+
+def publish(store, digests, remote="origin", env=None):
+    """
+    Add the given chunks to the store ref and push it. The ref holds one
+    commit whose tree maps every digest to its compressed chunk.
+
+    Several worktrees may publish at once. The ref only moves from the
+    commit the new one was built on, and the push is never forced; when
+    either is beaten by another publish, the chunks are added again on top
+    of the winner's commit.
+    """
+    for attempt in range(PUBLISH_ATTEMPTS):
+        git("fetch", "--quiet", remote, f"+{STORE_REF}:{STORE_REF}", stderr=subprocess.DEVNULL, env=env, check=False)
+        parent = git("rev-parse", "--verify", "--quiet", STORE_REF, text=True, check=False).strip() or None
+        existing = {}
+        if parent:
+            for line in git("ls-tree", parent, text=True).splitlines():
+                mode_type_oid, name = line.split("\t", 1)
+                existing[name] = mode_type_oid.split()[2]
+
+        new = [digest for digest in digests if digest not in existing]
+        if not new:
+            return 0
+        paths = "\n".join(store._path(digest) for digest in new) + "\n"
+        oids = git("hash-object", "-w", "--stdin-paths", input=paths, text=True).split()
+        existing.update(zip(new, oids))
+
+        tree_input = "".join(f"100644 blob {oid}\t{name}\n" for name, oid in sorted(existing.items()))
+        tree = git("mktree", input=tree_input, text=True).strip()
+        parents = ["-p", parent] if parent else []
+        commit = git("commit-tree", tree, *parents, "-m", f"Store {len(new)} chunks", text=True).strip()
+        try:
+            # An empty old value means the ref must not exist yet
+            git("update-ref", STORE_REF, commit, parent or "", stderr=subprocess.DEVNULL)
+            git("push", "--quiet", remote, f"{commit}:{STORE_REF}", stderr=subprocess.DEVNULL, env=env)
+        except subprocess.CalledProcessError:
+            if attempt == PUBLISH_ATTEMPTS - 1:
+                raise
+            time.sleep(random.uniform(0.5, 2.0) * (attempt + 1))
+            continue
+        return len(new)
+
+
+def stage_manifest(path, env=None):
+    """
+    Store path, publish its chunks and stage the manifest in its place. Used
+    by commit_and_push_changes when the store is enabled.
+    """
+    store = ArtifactStore()
+    manifest = store_paths(store, [path])
+    publish(store, manifest_digests(manifest), env=env)
+    git("rm", "-r", "--cached", "--quiet", "--ignore-unmatch", path)
+    git("add", MANIFEST)
+
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def timed_clone(source, target):
+    started = time.monotonic()
+    git("clone", "--quiet", "--no-local", source, target, stderr=subprocess.DEVNULL)
+    return time.monotonic() - started, directory_size(os.path.join(target, ".git"))
+
+
+# The converted repository is thrown away, so its commits need no real author
+SCRATCH_IDENTITY = {
+    "GIT_AUTHOR_NAME": "taskgen", "GIT_AUTHOR_EMAIL": "taskgen@localhost",
+    "GIT_COMMITTER_NAME": "taskgen", "GIT_COMMITTER_EMAIL": "taskgen@localhost",
+}
+
+
+def convert_branches(repo_dir, pattern, store, base_branch):
+    """
+    Rewrite every matching branch of a bare repository as a single commit on
+    its merge base with base_branch, with the artifacts replaced by a
+    manifest. This is what the branches look like when the store is enabled.
+    """
+    branches = git("-C", repo_dir, "for-each-ref", "--format=%(refname:short)", f"refs/heads/{pattern}", text=True).split()
+    previous = os.getcwd()
+    for branch in branches:
+        work = tempfile.mkdtemp(prefix="convert-")
+        try:
+            with tarfile.open(fileobj=io.BytesIO(git("-C", repo_dir, "archive", branch))) as archive:
+                archive.extractall(work)
+            os.chdir(work)
+            artifacts = [path for path in ARTIFACT_PATHS if os.path.exists(path)]
+            if not artifacts:
+                continue
+            store_paths(store, artifacts)
+            for path in artifacts:
+                shutil.rmtree(path) if os.path.isdir(path) else os.remove(path)
+
+            env = dict(os.environ, GIT_DIR=os.path.abspath(repo_dir), GIT_WORK_TREE=work, GIT_INDEX_FILE=work + ".index")
+            subprocess.run(["git", "add", "-A", "."], check=True, env=env)
+            tree = subprocess.run(["git", "write-tree"], check=True, env=env, stdout=subprocess.PIPE, text=True).stdout.strip()
+            base = git("-C", repo_dir, "merge-base", base_branch, branch, text=True).strip()
+            commit = git("-C", repo_dir, "commit-tree", tree, "-p", base, "-m", f"{branch} (artifacts in store)",
+                         text=True, env=dict(env, **SCRATCH_IDENTITY)).strip()
+            git("-C", repo_dir, "update-ref", f"refs/heads/{branch}", commit)
+        finally:
+            os.chdir(previous)
+            shutil.rmtree(work, ignore_errors=True)
+            if os.path.exists(work + ".index"):
+                os.remove(work + ".index")
+    return branches
+
+
+def measure(source, pattern, base_branch):
+    """Report clone time and size of source before and after moving the artifacts into the store."""
+    scratch = tempfile.mkdtemp(prefix="artifact-measure-")
+    cwd = os.getcwd()
+    try:
+        before_seconds, before_size = timed_clone(source, os.path.join(scratch, "before"))
+
+        converted = os.path.join(scratch, "converted.git")
+        git("clone", "--quiet", "--mirror", source, converted, stderr=subprocess.DEVNULL)
+        store = ArtifactStore(os.path.join(scratch, "store"))
+        branches = convert_branches(converted, pattern, store, base_branch)
+        git("-C", converted, "reflog", "expire", "--expire=now", "--all")
+        git("-C", converted, "gc", "--quiet", "--prune=now", "--aggressive")
+        after_seconds, after_size = timed_clone(converted, os.path.join(scratch, "after"))
+
+        print(f"Branches converted: {len(branches)} matching {pattern}")
+        print(f"{'':<22}{'clone size':>14}{'clone time':>12}")
+        print(f"{'artifacts in branches':<22}{before_size / 1024:>11.0f}KiB{before_seconds:>11.2f}s")
+        print(f"{'artifacts in store':<22}{after_size / 1024:>11.0f}KiB{after_seconds:>11.2f}s")
+        print(f"Store: {len(store.digests())} chunks, {store.size() / 1024:.0f}KiB, fetched only by stages that need them.")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep generated artifacts in a compressed content-addressed store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    put = subparsers.add_parser("put", help="Store files and record them in the manifest")
+    put.add_argument("paths", nargs="*", default=None, help="Files or directories (default: all generated artifacts)")
+    put.add_argument("--publish", action="store_true", help="Push the chunks to the store ref of origin")
+    checkout = subparsers.add_parser("checkout", help="Write the files of the manifest into the working tree")
+    checkout.add_argument("--force", action="store_true", help="Overwrite files that already exist")
+    subparsers.add_parser("status", help="Show the manifest and the local store")
+    measure_parser = subparsers.add_parser("measure", help="Compare clone size and time with and without the store")
+    measure_parser.add_argument("source", nargs="?", default=".", help="Repository path or URL")
+    measure_parser.add_argument("--branches", default="task-*", help="Branches that carry generated artifacts")
+    measure_parser.add_argument("--base", default="main", help="Branch the task branches start from")
+    args = parser.parse_args()
+
+    store = ArtifactStore()
+    if args.command == "put":
+        paths = args.paths or [path for path in ARTIFACT_PATHS if os.path.exists(path)]
+        manifest = store_paths(store, paths)
+        print(f"{len(manifest['files'])} files in {MANIFEST}.")
+        if args.publish:
+            print(f"Published {publish(store, manifest_digests(manifest))} new chunks to {STORE_REF}.")
+    elif args.command == "checkout":
+        if not os.path.exists(MANIFEST):
+            print(f"Error: No {MANIFEST} in this directory.")
+            sys.exit(1)
+        print(f"Wrote {materialise(store, force=args.force)} files.")
+    elif args.command == "status":
+        manifest = load_manifest()
+        digests = manifest_digests(manifest)
+        size = sum(entry["size"] for entry in manifest["files"].values())
+        print(f"{len(manifest['files'])} files ({size / 1024:.0f}KiB) in {len(digests)} chunks, "
+              f"{sum(store.has(d) for d in digests)} of them in {store.directory}.")
+        for name in sorted(manifest["files"]):
+            print(f"  {'present' if os.path.exists(name) else 'missing':<9}{name}")
+    else:
+        measure(os.path.abspath(args.source) if os.path.exists(args.source) else args.source, args.branches, args.base)
+
+
+if __name__ == "__main__":
+    main()
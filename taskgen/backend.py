@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import queue
+import threading
+from types import SimpleNamespace
+
+# Servers the completion layer knows defaults for. Any other OpenAI-compatible
+# server works through LLM_BASE_URL with one of these profiles.
+#   base_url: where the server listens by default, None for the OpenAI API
+#   max_concurrency: requests in flight at once; more wait for a free slot
+#   batching: the server returns several choices for one request (n > 1)
+BACKENDS = {
+    "openai": {"base_url": None, "max_concurrency": 16, "batching": True},
+    "vllm": {"base_url": "http://localhost:8000/v1", "max_concurrency": 64, "batching": True},
+    "llama.cpp": {"base_url": "http://localhost:8080/v1", "max_concurrency": 4, "batching": False},
+}
+
+BACKEND = os.getenv("LLM_BACKEND", "openai")
+BASE_URL = os.getenv("LLM_BASE_URL")
+# Model sent instead of the one a stage asks for. Local servers serve a model
+# of their own; without this the first model the server lists is used.
+BACKEND_MODEL = os.getenv("LLM_MODEL") or None
+MAX_CONCURRENCY = os.getenv("LLM_MAX_CONCURRENCY")
+# How long the first of several identical requests waits for the others
+# before they are sent together; 0 turns batching off
+BATCH_WINDOW = float(os.getenv("LLM_BATCH_WINDOW", "0.02"))
+
+_END = object()
+
+
+class Backend:
+    """
+    An OpenAI-compatible chat completion endpoint with a concurrency limit.
+
+    Offers client.chat.completions.create like the SDK client it wraps, so
+    stages use it unchanged. Identical requests made within the batch window
+    of each other are sent as one request for n choices when the server
+    supports it, and every caller gets one of the choices back.
+    """
+
+    def __init__(self, client, name="openai", max_concurrency=16, batching=True, model=None, batch_window=BATCH_WINDOW):
+        self.client = client
+        self.name = name
+        self.model = model
+        self.batching = batching and batch_window > 0
+        self.batch_window = batch_window
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.requests = 0
+        self.sent = 0
+        self._batches = {}
+        self._lock = threading.Lock()
+
+    def create(self, **request):
+        request["model"] = self.resolve_model(request.get("model"))
+        with self._lock:
+            self.requests += 1
+        if not self.batching or request.get("n", 1) != 1:
+            return self.send(request)
+
+        key = batch_key(request)
+        with self._lock:
+            batch = self._batches.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._batches[key] = Batch()
+            index = batch.size
+            batch.size += 1
+        if leader:
+            time.sleep(self.batch_window)
+            with self._lock:
+                del self._batches[key]
+            batch.dispatch(self, request)
+        return batch.result(index)
+
+    def resolve_model(self, model):
+        """The model to send: LLM_MODEL, else the requested one on OpenAI, else what the server serves."""
+        if self.model is None and self.name != "openai":
+            with self._lock:
+                if self.model is None:
+                    self.model = self.client.models.list().data[0].id
+        return self.model or model
+
+    def send(self, request):
+        """Send one request once a slot is free; a streamed response holds its slot until it is closed."""
+        if not self.slots.acquire(timeout=request.get("timeout")):
+            raise TimeoutError(f"No free {self.name} slot before the request timed out")
+        with self._lock:
+            self.sent += 1
+        try:
+            response = self.client.chat.completions.create(**request)
+        except BaseException:
+            self.slots.release()
+            raise
+        if request.get("stream"):
+            return SlotStream(response, self.slots.release)
+        self.slots.release()
+        return response
+
+
+class Batch:
+    """Identical requests collected during one batch window."""
+
+    def __init__(self):
+        self.size = 0
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+    def dispatch(self, backend, request):
+        try:
+            if self.size == 1:
+                self.results = [backend.send(request)]
+            else:
+                response = backend.send(dict(request, n=self.size))
+                if request.get("stream"):
+                    self.results = BatchStream(response, self.size).streams
+                else:
+                    self.results = split_response(response, self.size)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done.set()
+
+    def result(self, index):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.results[index]
+
+
+def batch_key(request):
+    """Requests with the same key can be answered by the choices of one request."""
+    return json.dumps({k: v for k, v in request.items() if k != "timeout"}, sort_keys=True, default=str)
+
+
+def split_response(response, size):
+    """One response per choice, each charged an equal share of the usage."""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        usage = SimpleNamespace(prompt_tokens=usage.prompt_tokens // size, completion_tokens=usage.completion_tokens // size)
+    choices = sorted(response.choices, key=lambda choice: choice.index)
+    return [SimpleNamespace(id=response.id, model=response.model, choices=[choice], usage=usage) for choice in choices]
+
+
+class SlotStream:
+    """A streamed response that gives back its concurrency slot when it is closed or exhausted."""
+
+    def __init__(self, stream, release):
+        self.stream = stream
+        self._release = release
+        self._released = False
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        try:
+            yield from self.stream
+        finally:
+            self.close()
+
+    def close(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        try:
+            self.stream.close()
+        finally:
+            self._release()
+
+
+class BatchStream:
+    """
+    Splits a streamed response with n choices into one stream per choice. A
+    choice's stream ends with its finish_reason, so the first finished choice
+    is not held up by the others; streams therefore carry no usage and the
+    run budget estimates their tokens. The response is closed once every
+    choice stream is.
+    """
+
+    def __init__(self, response, size):
+        self.response = response
+        self.open = size
+        self._lock = threading.Lock()
+        self.streams = [ChoiceStream(self) for _ in range(size)]
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        try:
+            for chunk in self.response:
+                for choice in chunk.choices:
+                    stream = self.streams[choice.index]
+                    stream.queue.put(SimpleNamespace(id=chunk.id, model=chunk.model, choices=[choice], usage=None))
+                    if choice.finish_reason:
+                        stream.queue.put(_END)
+        except Exception as e:
+            if self.open:
+                for stream in self.streams:
+                    stream.queue.put(e)
+        finally:
+            for stream in self.streams:
+                stream.queue.put(_END)
+            self.response.close()
+
+    def closed(self):
+        with self._lock:
+            self.open -= 1
+            last = self.open == 0
+        if last:
+            self.response.close()
+
+
+class ChoiceStream:
+    """The chunks of one choice of a BatchStream."""
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.queue = queue.Queue()
+        self._closed = False
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self.queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.close()
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self.batch.closed()
+
+
+def create_backend(api_key):
+    """The backend named by LLM_BACKEND, pointed at LLM_BASE_URL when set."""
+    if BACKEND not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{BACKEND}', expected one of {', '.join(BACKENDS)}")
+    from openai import OpenAI
+
+    profile = BACKENDS[BACKEND]
+    # Local servers usually accept any key
+    client = OpenAI(api_key=api_key or "unused", base_url=BASE_URL or profile["base_url"])
+    return Backend(
+        client,
+        name=BACKEND,
+        max_concurrency=int(MAX_CONCURRENCY or profile["max_concurrency"]),
+        batching=profile["batching"],
+        model=BACKEND_MODEL,
+    )
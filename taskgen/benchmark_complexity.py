@@ -0,0 +1,503 @@
+import os
+import re
+import sys
+import json
+import math
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+from .grading_pool import jvm_environment
+
+DEFAULT_SIZES = [1000, 2000, 4000, 8000, 16000, 32000, 64000]
+DEFAULT_SIZE_LIMIT_MS = 2000
+# Wall-clock limit of the whole benchmark JVM; methods it did not reach by
+# then are reported as skipped
+DEFAULT_TIMEOUT_S = 600
+
+COMPLEXITY_CLASSES = [
+    ("O(1)", lambda n: 1.0),
+    ("O(log n)", lambda n: math.log2(n)),
+    ("O(n)", lambda n: float(n)),
+    ("O(n log n)", lambda n: n * math.log2(n)),
+    ("O(n^2)", lambda n: float(n) ** 2),
+    ("O(n^3)", lambda n: float(n) ** 3),
+]
+CLASS_NAMES = [name for name, _ in COMPLEXITY_CLASSES]
+
+# Without a reference solution, methods in these classes are flagged
+SUSPICIOUS_CLASSES = ("O(n^2)", "O(n^3)")
+
+# Below this per-call time the JIT and timer noise dominate, so the method
+# is treated as constant time rather than fitted
+NOISE_FLOOR_NS = 2000
+
+# Runs every public method of the given classes at growing input sizes in a
+# single JVM. Everything is fully qualified because student code may declare
+# classes such as Arrays or Method in the default package.
+BENCH_DRIVER = r'''
+public class ComplexityBench {
+    static final java.util.Random RANDOM = new java.util.Random(42);
+    static long sizeLimitNanos;
+    static int sink;
+
+    public static void main(String[] args) throws Exception {
+        String[] sizeArgs = args[0].split(",");
+        int[] sizes = new int[sizeArgs.length];
+        for (int i = 0; i < sizes.length; i++) {
+            sizes[i] = Integer.parseInt(sizeArgs[i]);
+        }
+        sizeLimitNanos = Long.parseLong(args[1]) * 1000000L;
+
+        // List every method up front, so a harness that stops the run early
+        // knows which ones never got their turn
+        java.util.List<java.lang.reflect.Method> planned = new java.util.ArrayList<java.lang.reflect.Method>();
+        for (int i = 2; i < args.length; i++) {
+            Class<?> cls;
+            try {
+                cls = Class.forName(args[i]);
+            } catch (Throwable e) {
+                System.out.println("SKIP\t" + args[i] + "\t*\tcannot load class: " + e);
+                continue;
+            }
+            java.lang.reflect.Method[] methods = cls.getDeclaredMethods();
+            java.util.Arrays.sort(methods, java.util.Comparator.comparing(java.lang.reflect.Method::toGenericString));
+            for (java.lang.reflect.Method method : methods) {
+                int modifiers = method.getModifiers();
+                if (!java.lang.reflect.Modifier.isPublic(modifiers) || method.isSynthetic() || method.getName().equals("main")) {
+                    continue;
+                }
+                System.out.println("METHOD\t" + cls.getName() + "\t" + signature(method));
+                planned.add(method);
+            }
+        }
+        System.out.flush();
+        for (java.lang.reflect.Method method : planned) {
+            benchmark(method.getDeclaringClass(), method, sizes);
+        }
+    }
+
+    static String signature(java.lang.reflect.Method method) {
+        StringBuilder builder = new StringBuilder(method.getName()).append("(");
+        java.lang.reflect.Type[] types = method.getGenericParameterTypes();
+        for (int i = 0; i < types.length; i++) {
+            if (i > 0) {
+                builder.append(", ");
+            }
+            builder.append(types[i].getTypeName().replace("java.util.", "").replace("java.lang.", ""));
+        }
+        return builder.append(")").toString();
+    }
+
+    static void benchmark(Class<?> cls, java.lang.reflect.Method method, int[] sizes) {
+        String name = cls.getName() + "\t" + signature(method);
+        java.lang.reflect.Type[] types = method.getGenericParameterTypes();
+        if (types.length == 0) {
+            System.out.println("SKIP\t" + name + "\tno parameters to scale");
+            return;
+        }
+        boolean hasCollection = false;
+        for (java.lang.reflect.Type type : types) {
+            if (!isSupported(type)) {
+                System.out.println("SKIP\t" + name + "\tunsupported parameter type " + type.getTypeName());
+                return;
+            }
+            hasCollection |= isCollection(type);
+        }
+
+        Object target = null;
+        if (!java.lang.reflect.Modifier.isStatic(method.getModifiers())) {
+            try {
+                target = cls.getConstructor().newInstance();
+            } catch (Throwable e) {
+                System.out.println("SKIP\t" + name + "\tno public no-argument constructor");
+                return;
+            }
+        }
+
+        try {
+            method.setAccessible(true);
+            long warmupEnd = System.nanoTime() + 300000000L;
+            for (int i = 0; i < 2000 && System.nanoTime() < warmupEnd; i++) {
+                invoke(target, method, buildArguments(types, sizes[0], hasCollection));
+            }
+
+            for (int n : sizes) {
+                long[] samples = new long[51];
+                int count = 0;
+                long spent = 0;
+                while (count < 3 || (spent < 100000000L && count < samples.length)) {
+                    Object[] arguments = buildArguments(types, n, hasCollection);
+                    long start = System.nanoTime();
+                    invoke(target, method, arguments);
+                    long elapsed = System.nanoTime() - start;
+                    samples[count++] = elapsed;
+                    spent += elapsed;
+                    if (elapsed > sizeLimitNanos) {
+                        break;
+                    }
+                }
+                java.util.Arrays.sort(samples, 0, count);
+                long median = samples[count / 2];
+                System.out.println("RESULT\t" + name + "\t" + n + "\t" + median);
+                if (median > sizeLimitNanos) {
+                    break;
+                }
+            }
+            System.out.println("DONE\t" + name);
+        } catch (java.lang.reflect.InvocationTargetException e) {
+            System.out.println("SKIP\t" + name + "\tthrew " + e.getCause());
+        } catch (Throwable e) {
+            System.out.println("SKIP\t" + name + "\tfailed: " + e);
+        }
+        System.out.flush();
+    }
+
+    static void invoke(Object target, java.lang.reflect.Method method, Object[] arguments) throws Exception {
+        Object result = method.invoke(target, arguments);
+        sink ^= System.identityHashCode(result);
+    }
+
+    static boolean isCollection(java.lang.reflect.Type type) {
+        if (type instanceof Class<?>) {
+            return ((Class<?>) type).isArray() || java.util.Collection.class.isAssignableFrom((Class<?>) type);
+        }
+        return type instanceof java.lang.reflect.ParameterizedType
+            && java.util.Collection.class.isAssignableFrom((Class<?>) ((java.lang.reflect.ParameterizedType) type).getRawType());
+    }
+
+    static boolean isSupported(java.lang.reflect.Type type) {
+        if (type instanceof java.lang.reflect.ParameterizedType) {
+            java.lang.reflect.ParameterizedType parameterized = (java.lang.reflect.ParameterizedType) type;
+            java.lang.reflect.Type[] elementTypes = parameterized.getActualTypeArguments();
+            return isCollection(type) && elementTypes.length == 1 && elementTypes[0] instanceof Class<?>
+                && canCreateElement((Class<?>) elementTypes[0]);
+        }
+        if (!(type instanceof Class<?>)) {
+            return false;
+        }
+        Class<?> cls = (Class<?>) type;
+        if (cls.isArray()) {
+            return canCreateElement(cls.getComponentType());
+        }
+        return canCreateElement(cls);
+    }
+
+    static boolean canCreateElement(Class<?> cls) {
+        if (cls.isPrimitive() || cls == Integer.class || cls == Long.class || cls == Double.class || cls == String.class) {
+            return cls != void.class && cls != char.class && cls != byte.class && cls != short.class && cls != float.class;
+        }
+        if (java.lang.reflect.Modifier.isAbstract(cls.getModifiers()) || cls.isInterface()) {
+            return false;
+        }
+        try {
+            cls.getConstructor();
+            return true;
+        } catch (NoSuchMethodException e) {
+            return false;
+        }
+    }
+
+    static Object[] buildArguments(java.lang.reflect.Type[] types, int n, boolean hasCollection) throws Exception {
+        Object[] arguments = new Object[types.length];
+        for (int i = 0; i < types.length; i++) {
+            arguments[i] = build(types[i], n, hasCollection);
+        }
+        return arguments;
+    }
+
+    static Object build(java.lang.reflect.Type type, int n, boolean hasCollection) throws Exception {
+        if (type instanceof java.lang.reflect.ParameterizedType) {
+            java.lang.reflect.ParameterizedType parameterized = (java.lang.reflect.ParameterizedType) type;
+            Class<?> raw = (Class<?>) parameterized.getRawType();
+            Class<?> elementType = (Class<?>) parameterized.getActualTypeArguments()[0];
+            java.util.Collection<Object> collection = newCollection(raw);
+            for (int i = 0; i < n; i++) {
+                collection.add(element(elementType, n));
+            }
+            return collection;
+        }
+        Class<?> cls = (Class<?>) type;
+        if (cls.isArray()) {
+            Object array = java.lang.reflect.Array.newInstance(cls.getComponentType(), n);
+            for (int i = 0; i < n; i++) {
+                java.lang.reflect.Array.set(array, i, element(cls.getComponentType(), n));
+            }
+            return array;
+        }
+        if (java.util.Collection.class.isAssignableFrom(cls)) {
+            java.util.Collection<Object> collection = newCollection(cls);
+            for (int i = 0; i < n; i++) {
+                collection.add(RANDOM.nextInt(n));
+            }
+            return collection;
+        }
+        // Scalars carry the input size unless a collection already does
+        if (!hasCollection && (cls == int.class || cls == Integer.class)) {
+            return n;
+        }
+        if (!hasCollection && (cls == long.class || cls == Long.class)) {
+            return (long) n;
+        }
+        if (!hasCollection && cls == String.class) {
+            return randomString(n);
+        }
+        return element(cls, 6);
+    }
+
+    @SuppressWarnings("unchecked")
+    static java.util.Collection<Object> newCollection(Class<?> raw) throws Exception {
+        if (!raw.isInterface() && !java.lang.reflect.Modifier.isAbstract(raw.getModifiers())) {
+            return (java.util.Collection<Object>) raw.getConstructor().newInstance();
+        }
+        if (java.util.Set.class.isAssignableFrom(raw)) {
+            return new java.util.LinkedHashSet<Object>();
+        }
+        if (java.util.Queue.class.isAssignableFrom(raw)) {
+            return new java.util.ArrayDeque<Object>();
+        }
+        return new java.util.ArrayList<Object>();
+    }
+
+    static Object element(Class<?> cls, int bound) throws Exception {
+        if (cls == int.class || cls == Integer.class) {
+            return RANDOM.nextInt(bound) + 1;
+        }
+        if (cls == long.class || cls == Long.class) {
+            return (long) (RANDOM.nextInt(bound) + 1);
+        }
+        if (cls == double.class || cls == Double.class) {
+            return RANDOM.nextDouble() * bound;
+        }
+        if (cls == boolean.class) {
+            return RANDOM.nextBoolean();
+        }
+        if (cls == String.class) {
+            return randomString(8);
+        }
+        return cls.getConstructor().newInstance();
+    }
+
+    static String randomString(int length) {
+        StringBuilder builder = new StringBuilder(length);
+        for (int i = 0; i < length; i++) {
+            builder.append((char) ('a' + RANDOM.nextInt(26)));
+        }
+        return builder.toString();
+    }
+}
+'''
+
+
+def find_classes(source_dir):
+    """Return (fully qualified class name, path) for each public class below source_dir."""
+    classes = []
+    for root, _, files in os.walk(source_dir):
+        for file in sorted(files):
+            if not file.endswith(".java"):
+                continue
+            path = os.path.join(root, file)
+            with open(path, "r") as java_file:
+                content = java_file.read()
+            class_match = re.search(r'public\s+(?:final\s+)?class\s+(\w+)', content)
+            if not class_match:
+                continue
+            package_match = re.search(r'^\s*package\s+([\w.]+)\s*;', content, re.MULTILINE)
+            prefix = package_match.group(1) + "." if package_match else ""
+            classes.append((prefix + class_match.group(1), path))
+    return classes
+
+
+def run_benchmarks(source_dir, sizes=DEFAULT_SIZES, size_limit_ms=DEFAULT_SIZE_LIMIT_MS, timeout=DEFAULT_TIMEOUT_S):
+    """
+    Compile the sources with the driver and time every public method in one
+    JVM. Returns {class: {method: {"timings": {n: ns}} or {"skipped": reason}}}.
+    When the JVM runs out of time, the results it printed are kept, the
+    method it was timing is marked timed_out and the methods it did not
+    reach are skipped.
+    """
+    if not shutil.which("javac") or not shutil.which("java"):
+        raise RuntimeError("javac and java must be on the PATH to benchmark submissions.")
+
+    classes = find_classes(source_dir)
+    if not classes:
+        raise RuntimeError(f"No public Java classes found in {source_dir}.")
+
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        driver_path = os.path.join(scratch_dir, "ComplexityBench.java")
+        with open(driver_path, "w") as f:
+            f.write(BENCH_DRIVER)
+        classes_dir = os.path.join(scratch_dir, "classes")
+        compiled = subprocess.run(
+            ["javac", "-nowarn", "-d", classes_dir, driver_path] + [path for _, path in classes],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True
+        )
+        if compiled.returncode != 0:
+            raise RuntimeError(f"Compilation failed:\n{compiled.stdout}")
+
+        try:
+            output = subprocess.run(
+                ["java", "-Xss16m", "-cp", classes_dir, "ComplexityBench",
+                 ",".join(str(n) for n in sizes), str(size_limit_ms)] + [name for name, _ in classes],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                env=jvm_environment(),
+                timeout=timeout
+            ).stdout
+            timed_out = False
+        except subprocess.TimeoutExpired as e:
+            # The partial output is bytes even in text mode
+            output = (e.stdout or b"").decode("utf-8", errors="replace")
+            # Drop a line cut off by the kill
+            output = output[:output.rfind("\n") + 1]
+            timed_out = True
+
+    results = {}
+    planned = []
+    finished = set()
+    for line in output.splitlines():
+        fields = line.split("\t")
+        if fields[0] == "METHOD" and len(fields) == 3:
+            planned.append((fields[1], fields[2]))
+        elif fields[0] == "DONE" and len(fields) == 3:
+            finished.add((fields[1], fields[2]))
+        elif fields[0] == "RESULT" and len(fields) == 5:
+            method = results.setdefault(fields[1], {}).setdefault(fields[2], {"timings": {}})
+            method["timings"][int(fields[3])] = int(fields[4])
+        elif fields[0] == "SKIP" and len(fields) == 4:
+            results.setdefault(fields[1], {})[fields[2]] = {"skipped": fields[3]}
+    if timed_out:
+        # Methods run in order, so the first unfinished one used up the time
+        running = next((
+            (cls, method) for cls, method in planned
+            if (cls, method) not in finished and "skipped" not in results.get(cls, {}).get(method, {})
+        ), None)
+        if running:
+            results.setdefault(running[0], {}).setdefault(running[1], {"timings": {}})["timed_out"] = True
+        for cls, method in planned:
+            results.setdefault(cls, {}).setdefault(method, {"skipped": f"not reached within the {timeout}s time limit"})
+    return results
+
+
+def fit_complexity(timings):
+    """
+    Pick the complexity class whose growth curve best matches the timings,
+    comparing log(time / f(n)) so the unknown constant factor drops out.
+    Also returns the empirical exponent from a log-log regression.
+    """
+    points = sorted((n, t) for n, t in timings.items() if t > 0)
+    if len(points) < 3:
+        return None, None
+    if max(t for _, t in points) < NOISE_FLOOR_NS:
+        return "O(1)", 0.0
+
+    xs = [math.log(n) for n, _ in points]
+    ys = [math.log(t) for _, t in points]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    exponent = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / sum((x - mean_x) ** 2 for x in xs)
+
+    best_class, best_error = None, None
+    for name, growth in COMPLEXITY_CLASSES:
+        ratios = [math.log(t / growth(n)) for n, t in points]
+        mean_ratio = sum(ratios) / len(ratios)
+        error = sum((r - mean_ratio) ** 2 for r in ratios)
+        if best_error is None or error < best_error:
+            best_class, best_error = name, error
+    return best_class, round(exponent, 2)
+
+
+def score_methods(report, reference=None):
+    """
+    Score each method between 0 and 1: full marks when it grows no faster
+    than the reference solution (or is below O(n^2) without one), minus 0.5
+    per complexity class above that. A method too slow to fit scores 0
+    unless the reference is too slow as well. Returns the mean score.
+    """
+    scores = []
+    for cls, methods in report.items():
+        for method, entry in methods.items():
+            reference_entry = (reference or {}).get(cls, {}).get(method, {})
+            if entry.get("too_slow"):
+                entry["flagged"] = not reference_entry.get("too_slow")
+                entry["score"] = 0.0 if entry["flagged"] else 1.0
+                scores.append(entry["score"])
+                continue
+            if not entry.get("complexity"):
+                continue
+            rank = CLASS_NAMES.index(entry["complexity"])
+            if reference_entry.get("complexity"):
+                allowed = CLASS_NAMES.index(reference_entry["complexity"])
+                entry["reference_complexity"] = reference_entry["complexity"]
+            else:
+                allowed = CLASS_NAMES.index(SUSPICIOUS_CLASSES[0]) - 1
+            entry["flagged"] = rank > allowed
+            entry["score"] = max(0.0, 1.0 - 0.5 * max(0, rank - allowed))
+            scores.append(entry["score"])
+    return round(sum(scores) / len(scores), 3) if scores else None
+
+
+def analyze(source_dir, sizes=DEFAULT_SIZES, size_limit_ms=DEFAULT_SIZE_LIMIT_MS, timeout=DEFAULT_TIMEOUT_S):
+    report = run_benchmarks(source_dir, sizes, size_limit_ms, timeout)
+    for methods in report.values():
+        for entry in methods.values():
+            if "timings" in entry:
+                entry["complexity"], entry["exponent"] = fit_complexity(entry["timings"])
+                # Stopped by the size limit or the timeout before there were
+                # enough sizes to fit: slower than any class can show
+                if entry.get("timed_out") or (entry["complexity"] is None and len(entry["timings"]) < len(sizes)):
+                    entry["too_slow"] = True
+    return report
+
+
+def print_report(report):
+    for cls, methods in sorted(report.items()):
+        print(cls)
+        for method, entry in sorted(methods.items()):
+            if "skipped" in entry:
+                print(f"  {method}: skipped ({entry['skipped']})")
+                continue
+            timings = ", ".join(f"n={n}: {t / 1e6:.3f}ms" for n, t in sorted(entry["timings"].items()))
+            flag = "  <-- slower than expected" if entry.get("flagged") else ""
+            if entry.get("too_slow"):
+                print(f"  {method}: too slow to measure{' (timed out)' if entry.get('timed_out') else ''}{flag}")
+            else:
+                print(f"  {method}: {entry['complexity']} (exponent {entry['exponent']}){flag}")
+            print(f"    {timings}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estimate the time complexity of every public method in a submission.")
+    parser.add_argument("source_dir", nargs="?", default="gen_src")
+    parser.add_argument("--reference", help="Solution directory (e.g. .hidden_tasks) to compare complexity against")
+    parser.add_argument("--sizes", default=",".join(str(n) for n in DEFAULT_SIZES), help="Comma-separated input sizes")
+    parser.add_argument("--size-limit-ms", type=int, default=DEFAULT_SIZE_LIMIT_MS,
+                        help="Stop growing the input once one call takes longer than this")
+    parser.add_argument("--timeout", type=int, default=DEFAULT_TIMEOUT_S,
+                        help="Seconds before the remaining methods are skipped")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    sizes = [int(n) for n in args.sizes.split(",")]
+    try:
+        report = analyze(args.source_dir, sizes, args.size_limit_ms, args.timeout)
+        reference = analyze(args.reference, sizes, args.size_limit_ms, args.timeout) if args.reference else None
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    efficiency_score = score_methods(report, reference)
+    print_report(report)
+    print(f"\nEfficiency score: {efficiency_score if efficiency_score is not None else 'n/a'}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"efficiency_score": efficiency_score, "classes": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
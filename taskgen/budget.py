@@ -0,0 +1,234 @@
+import os
+import sys
+import json
+import time
+import fcntl
+from contextlib import contextmanager
+
+BUDGET_FILE = "budget.json"
+
+# Model used once the run has spent half of its budget
+FALLBACK_MODEL = "gpt-4o-mini"
+
+# Output cap per call, also applied when there is no run budget
+STAGE_MAX_TOKENS = {
+    "generate-task-description": 4000,
+    "generate-solution": 6000,
+    "adversarial-review": 6000,
+    "generate-tests": 6000,
+    "adversarial-test-review": 3000,
+    "generate-template-code": 3000,
+    "review-submission": 1000,
+    "grade-submission": 500,
+    "feedback": 500,
+    "compliment": 300,
+}
+DEFAULT_MAX_TOKENS = 2000
+MIN_MAX_TOKENS = 256
+
+# Share of the remaining token budget each generation stage may use
+STAGE_SHARES = {
+    "generate-task-description": 0.15,
+    "generate-solution": 0.2,
+    "adversarial-review": 0.2,
+    "generate-tests": 0.2,
+    "adversarial-test-review": 0.15,
+    "generate-template-code": 0.1,
+}
+
+# Stages the task is still usable without
+OPTIONAL_STAGES = ("adversarial-review", "adversarial-test-review")
+
+# Fractions of the budget left below which the run switches to the fallback
+# model, and below which it skips the optional stages
+ECONOMY_THRESHOLD = 0.5
+CRITICAL_THRESHOLD = 0.2
+
+CHARS_PER_TOKEN = 4
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised when a request is attempted after the run budget is spent."""
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def estimate_prompt_tokens(messages):
+    return sum(estimate_tokens(message["content"]) + 4 for message in messages)
+
+
+def stage_max_tokens(stage):
+    return STAGE_MAX_TOKENS.get(stage, DEFAULT_MAX_TOKENS)
+
+
+class RunBudget:
+    """
+    Token and wall-clock budget of one pipeline run, kept as budget.json in
+    the run directory so every stage process draws from the same ledger.
+    Either limit may be None for no limit.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def create(cls, run_dir, tokens=None, seconds=None):
+        budget = cls(os.path.join(run_dir, BUDGET_FILE))
+        os.makedirs(run_dir, exist_ok=True)
+        with budget._locked() as state:
+            state.update(tokens=tokens, seconds=seconds, started=time.time(), stages={})
+        return budget
+
+    @classmethod
+    def for_run(cls, run_dir):
+        """The budget recorded in run_dir, or None if the run has none."""
+        if not run_dir or not os.path.exists(os.path.join(run_dir, BUDGET_FILE)):
+            return None
+        return cls(os.path.join(run_dir, BUDGET_FILE))
+
+    @classmethod
+    def current(cls):
+        """The budget of the run this stage process belongs to, or None."""
+        return cls.for_run(os.getenv("TASK_RUN_DIR"))
+
+    @contextmanager
+    def _locked(self):
+        """Hold an exclusive lock and yield the budget state, saving it on exit."""
+        with open(self.path + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(self.path, "r") as f:
+                    state = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                state = {"tokens": None, "seconds": None, "started": time.time(), "stages": {}}
+            yield state
+            with open(self.path + ".tmp", "w") as f:
+                json.dump(state, f, indent=2)
+            os.replace(self.path + ".tmp", self.path)
+
+    def load(self):
+        with self._locked() as state:
+            return state
+
+    @staticmethod
+    def _stage(state, stage):
+        return state["stages"].setdefault(stage, {
+            "status": "running",
+            "calls": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "seconds": 0.0,
+            "models": [],
+        })
+
+    @staticmethod
+    def _remaining(state):
+        """Return (tokens left, seconds left, smallest fraction left); None means unlimited."""
+        used = sum(s["prompt_tokens"] + s["completion_tokens"] for s in state["stages"].values())
+        tokens_left = state["tokens"] - used if state["tokens"] else None
+        seconds_left = state["seconds"] - (time.time() - state["started"]) if state["seconds"] else None
+        fractions = [1.0]
+        if tokens_left is not None:
+            fractions.append(tokens_left / state["tokens"])
+        if seconds_left is not None:
+            fractions.append(seconds_left / state["seconds"])
+        return tokens_left, seconds_left, min(fractions)
+
+    def should_skip(self, stage):
+        with self._locked() as state:
+            return stage in OPTIONAL_STAGES and self._remaining(state)[2] < CRITICAL_THRESHOLD
+
+    def begin_stage(self, stage):
+        with self._locked() as state:
+            entry = self._stage(state, stage)
+            entry["status"] = "running"
+            entry["begun"] = time.time()
+
+    def end_stage(self, stage, status="done"):
+        with self._locked() as state:
+            entry = self._stage(state, stage)
+            entry["status"] = status
+            if "begun" in entry:
+                entry["seconds"] += time.time() - entry.pop("begun")
+
+    def plan(self, stage, messages, model, max_tokens=None):
+        """
+        Return (model, max_tokens, seconds left) for one request of stage.
+        max_tokens is the stage's share of the remaining tokens minus the
+        prompt; the model falls back once the run is in economy mode.
+        """
+        prompt_tokens = estimate_prompt_tokens(messages)
+        with self._locked() as state:
+            tokens_left, seconds_left, fraction = self._remaining(state)
+            if (tokens_left is not None and tokens_left <= prompt_tokens) or (seconds_left is not None and seconds_left <= 0):
+                raise BudgetExceeded(f"The run budget is spent, {stage} cannot make another request.")
+
+            max_tokens = max_tokens or stage_max_tokens(stage)
+            if tokens_left is not None:
+                unfinished = [
+                    name for name in STAGE_SHARES
+                    if state["stages"].get(name, {}).get("status") not in ("done", "skipped")
+                ]
+                share = STAGE_SHARES[stage] / sum(STAGE_SHARES[name] for name in unfinished) if stage in unfinished else 1.0
+                allowance = int(tokens_left * share) - prompt_tokens
+                max_tokens = min(max_tokens, max(allowance, MIN_MAX_TOKENS), tokens_left - prompt_tokens)
+            if fraction < ECONOMY_THRESHOLD:
+                model = FALLBACK_MODEL
+        return model, max_tokens, seconds_left
+
+    def record(self, stage, model, prompt_tokens, completion_tokens):
+        with self._locked() as state:
+            entry = self._stage(state, stage)
+            entry["calls"] += 1
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            if model not in entry["models"]:
+                entry["models"].append(model)
+
+    def report(self):
+        state = self.load()
+        lines = [f"{'stage':<28}{'status':<10}{'calls':>6}{'prompt':>9}{'output':>9}{'time':>8}  model"]
+        for stage, entry in state["stages"].items():
+            lines.append(
+                f"{stage:<28}{entry['status']:<10}{entry['calls']:>6}{entry['prompt_tokens']:>9}"
+                f"{entry['completion_tokens']:>9}{entry['seconds']:>7.0f}s  {', '.join(entry['models']) or '-'}"
+            )
+        used = sum(s["prompt_tokens"] + s["completion_tokens"] for s in state["stages"].values())
+        elapsed = time.time() - state["started"]
+        tokens = f"{used} of {state['tokens']} tokens ({used / state['tokens']:.0%})" if state["tokens"] else f"{used} tokens"
+        seconds = f"{elapsed:.0f}s of {state['seconds']}s" if state["seconds"] else f"{elapsed:.0f}s"
+        lines.append(f"Used {tokens} in {seconds}.")
+        return "\n".join(lines)
+
+
+def plan_request(stage, messages, model, max_tokens=None):
+    """Apply the run budget, if any, to a request; see RunBudget.plan."""
+    budget = RunBudget.current()
+    if budget is None:
+        return model, max_tokens or stage_max_tokens(stage), None
+    return budget.plan(stage, messages, model, max_tokens)
+
+
+def record_usage(stage, model, messages, content, usage=None):
+    """Charge a request to the run budget, estimating tokens the API did not report."""
+    budget = RunBudget.current()
+    if budget is None:
+        return
+    if usage is not None:
+        budget.record(stage, model, usage.prompt_tokens, usage.completion_tokens)
+    else:
+        budget.record(stage, model, estimate_prompt_tokens(messages), estimate_tokens(content or ""))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python -m taskgen budget <run_dir>")
+        sys.exit(1)
+
+    path = os.path.join(sys.argv[1], BUDGET_FILE)
+    if not os.path.exists(path):
+        print(f"No budget recorded in {sys.argv[1]}.")
+        sys.exit(1)
+    print(RunBudget(path).report())
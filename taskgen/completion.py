@@ -0,0 +1,370 @@
+import os
+import sys
+import re
+import json
+import time
+import queue
+import threading
+
+from .backend import create_backend
+from .budget import BudgetExceeded, plan_request, record_usage
+from .rundir import record_exchange
+
+MODEL = "gpt-4o-2024-08-06"
+
+STATS_FILE = os.getenv(
+    "LLM_STATS_FILE",
+    os.path.join(os.path.expanduser("~"), ".cache", "taskgen", "llm_stats.json")
+)
+
+# Wall-clock limit in seconds for one completion, hedges included. Can be
+# overridden per stage, e.g. LLM_DEADLINE_GENERATE_TESTS=600.
+STAGE_DEADLINES = {
+    "generate-task-description": 300,
+    "generate-solution": 300,
+    "adversarial-review": 300,
+    "generate-tests": 300,
+    "adversarial-test-review": 180,
+    "generate-template-code": 120,
+    "review-submission": 120,
+    "grade-submission": 120,
+    "feedback": 60,
+    "compliment": 30,
+}
+DEFAULT_DEADLINE = 180
+
+# Until a stage has enough first-token samples, hedge after this many seconds
+DEFAULT_HEDGE_DELAY = 8.0
+# How often a cancellable request checks its cancel event
+CANCEL_POLL_SECONDS = 0.5
+MIN_SAMPLES = 20
+MAX_SAMPLES = 200
+
+# Output cut off by max_tokens is continued up to this many times
+MAX_CONTINUATIONS = int(os.getenv("LLM_MAX_CONTINUATIONS", "3"))
+# Characters of the output's end quoted in a continuation request, and the
+# shortest repeat of them that is cut from the continuation
+TAIL_CHARS = 400
+MIN_OVERLAP = 16
+CONTINUE_PROMPT = (
+    "Your answer was cut off by the length limit. Continue it from exactly where it stopped: "
+    "do not repeat anything, do not add a preamble and do not open a new code block. "
+    "It stopped after:\n\n{tail}"
+)
+
+
+class Cancelled(Exception):
+    """Raised by complete() when its cancel event is set."""
+
+
+def stage_deadline(stage):
+    override = os.getenv("LLM_DEADLINE_" + stage.upper().replace("-", "_"))
+    return float(override) if override else float(STAGE_DEADLINES.get(stage, DEFAULT_DEADLINE))
+
+
+def create_client(api_key):
+    """
+    Create the client of the configured LLM backend, see taskgen.backend;
+    the SDK is only imported when a stage needs it.
+    """
+    return create_backend(api_key)
+
+
+def chat_messages(prompt, system="You are a helpful assistant."):
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def generate_with_retries(client, messages, stage, description="response", max_retries=3, **kwargs):
+    """
+    Call complete() up to max_retries times, returning None when every
+    attempt failed. description names the output in error messages.
+    """
+    for attempt in range(max_retries):
+        try:
+            return complete(client, messages, stage=stage, **kwargs)
+        except (BudgetExceeded, Cancelled):
+            raise
+        except Exception as e:
+            print(f"Error generating {description}: {e}")
+            if attempt < max_retries - 1:
+                print("Retrying...")
+    return None
+
+
+def complete(client, messages, stage, model=MODEL, **kwargs):
+    """
+    Run a chat completion with a per-stage deadline and request hedging.
+
+    The request is streamed; if no first token arrives within the observed
+    p90 time-to-first-token of the stage, an identical hedge request is
+    sent and whichever finishes first wins. Raises TimeoutError when the
+    stage deadline passes, or the last request error if every attempt failed.
+
+    Output cut off by max_tokens is continued rather than returned
+    truncated, see continue_truncated; the deadline covers the continuations.
+
+    Within a budgeted run the model, max_tokens and deadline are limited by
+    what is left of the run budget and the tokens used are charged to it.
+
+    Setting the threading.Event passed as cancel closes the streams and
+    raises Cancelled, e.g. when the input was superseded mid-request.
+    """
+    started = time.monotonic()
+    content, finish_reason = hedged_request(client, messages, stage, model, started, **kwargs)
+    if finish_reason == "length":
+        content = continue_truncated(client, messages, content, stage, model, started, **kwargs)
+    content = content.strip()
+    record_exchange(messages, content)
+    return content
+
+
+def continue_truncated(client, messages, content, stage, model=MODEL, started=None, **kwargs):
+    """
+    Extend output that stopped at the length limit. Each continuation request
+    carries the output so far and asks the model to go on after its tail;
+    the answer is spliced on without what it repeats. Gives up after
+    MAX_CONTINUATIONS requests and returns what there is.
+    """
+    started = time.monotonic() if started is None else started
+    for continuation in range(1, MAX_CONTINUATIONS + 1):
+        print(f"Output of {stage} was cut off at the length limit, requesting continuation {continuation}.")
+        more, finish_reason = hedged_request(client, continuation_messages(messages, content), stage, model, started, **kwargs)
+        content = splice(content, more)
+        if finish_reason != "length":
+            return content
+    print(f"Output of {stage} is still cut off after {MAX_CONTINUATIONS} continuations.")
+    return content
+
+
+def continuation_messages(messages, content):
+    return messages + [
+        {"role": "assistant", "content": content},
+        {"role": "user", "content": CONTINUE_PROMPT.format(tail=content[-TAIL_CHARS:])},
+    ]
+
+
+def splice(content, continuation):
+    """Join a continuation onto the output it continues, dropping a repeat of the tail."""
+    # A continuation likes to open the code block the output was still inside
+    if content.count("```") % 2 == 1:
+        continuation = re.sub(r'^\s*```\w*[ \t]*\n', '', continuation, count=1)
+    tail = content[-TAIL_CHARS:]
+    for size in range(min(len(tail), len(continuation)), MIN_OVERLAP - 1, -1):
+        if continuation.startswith(tail[-size:]):
+            return content + continuation[size:]
+    return content + continuation
+
+
+def hedged_request(client, messages, stage, model, started, **kwargs):
+    """
+    Make one request of a completion, hedged as described in complete(), and
+    return (content, finish reason). The stage deadline counts from started.
+    """
+    cancel = kwargs.pop("cancel", None)
+    model, kwargs["max_tokens"], seconds_left = plan_request(stage, messages, model, kwargs.get("max_tokens"))
+    deadline = stage_deadline(stage) - (time.monotonic() - started)
+    if seconds_left is not None:
+        deadline = min(deadline, seconds_left)
+    if deadline <= 0:
+        raise TimeoutError(f"{stage} did not complete within its {stage_deadline(stage):.0f}s deadline")
+    request = dict(model=model, messages=messages, timeout=deadline, stream_options={"include_usage": True}, **kwargs)
+    stats = LatencyStats.load()
+    hedge_delay = min(stats.hedge_delay(stage), deadline)
+
+    sent = time.monotonic()
+    results = queue.Queue()
+    primary_responded = threading.Event()
+    attempts = [Attempt("primary", results, lambda cancelled, opened: stream_attempt(client, request, cancelled, primary_responded, opened))]
+    hedged = False
+    try:
+        hedge_at = sent + hedge_delay
+        while not primary_responded.is_set() and time.monotonic() < hedge_at:
+            if cancel is not None and cancel.is_set():
+                raise Cancelled(f"{stage} was cancelled")
+            wait_seconds = hedge_at - time.monotonic()
+            primary_responded.wait(min(wait_seconds, CANCEL_POLL_SECONDS) if cancel is not None else wait_seconds)
+        if not primary_responded.is_set():
+            print(f"No first token after {hedge_delay:.1f}s for {stage}, sending hedge request.")
+            hedged = True
+            hedge_responded = threading.Event()
+            attempts.append(Attempt("hedge", results, lambda cancelled, opened: stream_attempt(client, request, cancelled, hedge_responded, opened)))
+
+        pending = len(attempts)
+        last_error = None
+        while pending:
+            if cancel is not None and cancel.is_set():
+                raise Cancelled(f"{stage} was cancelled")
+            remaining = deadline - (time.monotonic() - sent)
+            if remaining <= 0:
+                raise TimeoutError(f"{stage} did not complete within its {stage_deadline(stage):.0f}s deadline")
+            timeout = min(remaining, CANCEL_POLL_SECONDS) if cancel is not None else remaining
+            try:
+                attempt, result, error = results.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            pending -= 1
+            if error is not None:
+                last_error = error
+                continue
+            content, first_token_seconds, usage, finish_reason = result
+            record_usage(stage, model, messages, content, usage)
+            if content is None:
+                continue
+            stats.record(stage, first_token_seconds, hedged, attempt.name == "hedge")
+            stats.save()
+            return content, finish_reason
+        raise last_error
+    finally:
+        for attempt in attempts:
+            attempt.cancel()
+
+
+class Attempt:
+    """
+    One streamed completion running on a daemon thread, so an attempt that
+    is still waiting for the server never keeps the process alive. stream
+    is called with the attempt's cancel event and a callback to hand over
+    its stream once the response starts; (attempt, result, error) goes to
+    results when it returns. cancel() closes the stream from the outside,
+    which ends the read it is blocked in; an attempt still waiting for its
+    response headers is closed as soon as they arrive, and gives up at the
+    request timeout at the latest.
+    """
+
+    def __init__(self, name, results, stream):
+        self.name = name
+        self.cancelled = threading.Event()
+        self.stream = None
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, args=(results, stream), daemon=True).start()
+
+    def _run(self, results, stream):
+        try:
+            results.put((self, stream(self.cancelled, self._opened), None))
+        except Exception as e:
+            results.put((self, None, e))
+
+    def _opened(self, stream):
+        with self._lock:
+            self.stream = stream
+            cancelled = self.cancelled.is_set()
+        if cancelled:
+            stream.close()
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled.set()
+            stream = self.stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+
+def stream_attempt(client, request, cancelled, responded, opened=None):
+    """
+    Stream one completion and return (content, seconds to first token,
+    usage, finish reason). responded is set on the first token, or when the
+    attempt ends early; opened, if given, is called with the stream once the
+    response has started.
+    """
+    started = time.monotonic()
+    first_token_seconds = None
+    usage = None
+    finish_reason = None
+    parts = []
+    try:
+        stream = client.chat.completions.create(stream=True, **request)
+        if opened is not None:
+            opened(stream)
+        try:
+            for chunk in stream:
+                if cancelled.is_set():
+                    return None, first_token_seconds, None, None
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                if chunk.choices[0].delta.content:
+                    if first_token_seconds is None:
+                        first_token_seconds = time.monotonic() - started
+                        responded.set()
+                    parts.append(chunk.choices[0].delta.content)
+        finally:
+            stream.close()
+    finally:
+        responded.set()
+    return "".join(parts), first_token_seconds, usage, finish_reason
+
+
+class LatencyStats:
+    """
+    Recent time-to-first-token samples and hedge counters per stage, kept in
+    a JSON file so thresholds carry over between runs.
+    """
+
+    def __init__(self, path, stages):
+        self.path = path
+        self.stages = stages
+
+    @classmethod
+    def load(cls, path=STATS_FILE):
+        try:
+            with open(path, "r") as f:
+                return cls(path, json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls(path, {})
+
+    def _stage(self, stage):
+        return self.stages.setdefault(stage, {"first_token": [], "calls": 0, "hedges": 0, "hedge_wins": 0})
+
+    def hedge_delay(self, stage):
+        samples = self._stage(stage)["first_token"]
+        if len(samples) < MIN_SAMPLES:
+            return DEFAULT_HEDGE_DELAY
+        return percentile(samples, 90)
+
+    def record(self, stage, first_token_seconds, hedged, hedge_won):
+        entry = self._stage(stage)
+        entry["calls"] += 1
+        if first_token_seconds is not None:
+            entry["first_token"] = (entry["first_token"] + [round(first_token_seconds, 3)])[-MAX_SAMPLES:]
+        if hedged:
+            entry["hedges"] += 1
+        if hedge_won:
+            entry["hedge_wins"] += 1
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.stages, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def print_stats(stats):
+    print(f"{'stage':<28}{'calls':>7}{'p50 ttft':>10}{'p90 ttft':>10}{'hedges':>8}{'won':>6}{'win rate':>10}")
+    for stage, entry in sorted(stats.stages.items()):
+        samples = entry["first_token"]
+        p50 = f"{percentile(samples, 50):.2f}s" if samples else "-"
+        p90 = f"{percentile(samples, 90):.2f}s" if samples else "-"
+        win_rate = f"{entry['hedge_wins'] / entry['hedges']:.0%}" if entry["hedges"] else "-"
+        print(f"{stage:<28}{entry['calls']:>7}{p50:>10}{p90:>10}{entry['hedges']:>8}{entry['hedge_wins']:>6}{win_rate:>10}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != "stats":
+        print("Usage: python -m taskgen stats")
+        sys.exit(1)
+
+    print_stats(LatencyStats.load())
@@ -0,0 +1,177 @@
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_MODEL = "fake-model"
+
+
+def echo_reply(messages, index):
+    """Default reply: which choice this is and the start of the last message."""
+    return f"Reply {index + 1} to: {' '.join(messages[-1]['content'].split()[:12])}"
+
+
+def tokenize(text):
+    """Words with their trailing whitespace, standing in for model tokens."""
+    return re.findall(r'\S+\s*|\s+', text)
+
+
+class FakeLLM:
+    """
+    A tiny OpenAI-compatible server for trying the backend and the stages
+    without a model. Serves /v1/models and /v1/chat/completions, streamed or
+    not, with n choices, max_tokens truncation (finish_reason "length") and
+    usage. Every request body is kept in requests.
+
+    reply(messages, index) returns the text of choice index; a reply longer
+    than max_tokens is cut off the way a real model's would be.
+    """
+
+    def __init__(self, reply=echo_reply, model=DEFAULT_MODEL, token_delay=0.0, supports_n=True):
+        self.reply = reply
+        self.model = model
+        self.token_delay = token_delay
+        self.supports_n = supports_n
+        self.requests = []
+        self._server = None
+
+    def start(self, host="127.0.0.1", port=0):
+        """Serve in a background thread and return the base URL."""
+        self._server = ThreadingHTTPServer((host, port), make_handler(self))
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def choices(self, body):
+        """(tokens, finish reason) of every requested choice."""
+        choices = []
+        for index in range(body.get("n") or 1):
+            tokens = tokenize(self.reply(body["messages"], index))
+            limit = body.get("max_tokens") or body.get("max_completion_tokens")
+            if limit is not None and len(tokens) > limit:
+                choices.append((tokens[:limit], "length"))
+            else:
+                choices.append((tokens, "stop"))
+        return choices
+
+    def usage(self, body, choices):
+        prompt_tokens = sum(len(tokenize(message["content"])) for message in body["messages"])
+        completion_tokens = sum(len(tokens) for tokens, _ in choices)
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.rstrip("/") != "/v1/models":
+                return self.send_json(404, {"error": {"message": "not found"}})
+            self.send_json(200, {"object": "list", "data": [{"id": fake.model, "object": "model", "owned_by": "taskgen"}]})
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/v1/chat/completions":
+                return self.send_json(404, {"error": {"message": "not found"}})
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            fake.requests.append(body)
+            if (body.get("n") or 1) > 1 and not fake.supports_n:
+                return self.send_json(400, {"error": {"message": "n > 1 is not supported"}})
+
+            choices = fake.choices(body)
+            created = int(time.time())
+            if not body.get("stream"):
+                return self.send_json(200, {
+                    "id": "chatcmpl-fake",
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": body["model"],
+                    "choices": [
+                        {"index": i, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": reason}
+                        for i, (tokens, reason) in enumerate(choices)
+                    ],
+                    "usage": fake.usage(body, choices),
+                })
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            chunk = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": created, "model": body["model"]}
+            try:
+                # Choices are interleaved token by token, as a batching server sends them
+                for position in range(max(len(tokens) for tokens, _ in choices) + 1):
+                    for i, (tokens, reason) in enumerate(choices):
+                        if position < len(tokens):
+                            delta, finish = {"content": tokens[position]}, None
+                        elif position == len(tokens):
+                            delta, finish = {}, reason
+                        else:
+                            continue
+                        self.send_event(dict(chunk, choices=[{"index": i, "delta": delta, "finish_reason": finish}]))
+                    if fake.token_delay:
+                        time.sleep(fake.token_delay)
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    self.send_event(dict(chunk, choices=[], usage=fake.usage(body, choices)))
+                self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                # The client closed the stream early
+                pass
+
+        def send_event(self, data):
+            self.wfile.write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        def send_json(self, status, data):
+            payload = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake OpenAI-compatible API for trying the pipeline without a model.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--reply", help="Answer every request with this text instead of an echo")
+    parser.add_argument("--reply-file", help="Answer every request with the content of this file")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Seconds between streamed tokens")
+    parser.add_argument("--no-batching", action="store_true", help="Reject n > 1 like llama.cpp's server")
+    args = parser.parse_args()
+
+    reply = echo_reply
+    if args.reply_file:
+        with open(args.reply_file, "r") as f:
+            text = f.read()
+        reply = lambda messages, index: text
+    elif args.reply is not None:
+        reply = lambda messages, index: args.reply
+
+    fake = FakeLLM(reply, args.model, args.token_delay, supports_n=not args.no_batching)
+    base_url = fake.start(args.host, args.port)
+    print(f"Serving a fake OpenAI-compatible API on {base_url}, stop with Ctrl+C.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        fake.stop()
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
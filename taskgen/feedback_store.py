@@ -0,0 +1,137 @@
+import os
+import re
+import sys
+import json
+import fcntl
+import hashlib
+import threading
+from contextlib import contextmanager
+
+# Outside the checkout like the response pools, so the feedback outlives the
+# job that wrote it; workflows restore and save this directory with
+# actions/cache under the "feedback-store-" key prefix
+STORE_DIR = os.getenv(
+    "FEEDBACK_STORE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "taskgen", "feedback_store")
+)
+
+# Applied in order, so quoted text is abstracted before the numbers inside it
+CANONICAL_PATTERNS = [
+    (re.compile(r'"[^"]*"'), '<str>'),
+    (re.compile(r"'[^']*'"), '<str>'),
+    (re.compile(r'\b[\w.$]+@[0-9a-f]+\b'), '<obj>'),
+    (re.compile(r'\b0x[0-9a-fA-F]+\b'), '<hex>'),
+    (re.compile(r'-?\b\d+(?:\.\d+)?\b'), '<n>'),
+    (re.compile(r'\s+'), ' '),
+]
+
+
+def canonicalize_message(message):
+    """Abstract values that differ between students failing the same way."""
+    message = message or ""
+    for pattern, replacement in CANONICAL_PATTERNS:
+        message = pattern.sub(replacement, message)
+    return message.strip()
+
+
+def failure_signature(report):
+    """
+    Hash of the sorted failing test ids and their canonicalised messages, or
+    None when the report contains no recognised failures.
+    """
+    if not report.failures:
+        return None
+    lines = sorted(
+        f"{failure.test_id}: {canonicalize_message(failure.message)}"
+        for failure in report.failures.values()
+    )
+    if report.dropped:
+        lines.append(f"+{report.dropped} more")
+    return hashlib.sha256("\n".join(lines).encode("utf-8")).hexdigest()
+
+
+def personalize(feedback, report, author=None):
+    """Greet the student and name their failing tests around a shared hint."""
+    greeting = f"Hi @{author}! " if author else ""
+    failing = ", ".join(f"`{test_id}`" for test_id in list(report.failures)[:5])
+    more = f" and {len(report.failures) - 5} more" if len(report.failures) > 5 else ""
+    return f"{greeting}Your submission currently fails {failing}{more}.\n\n{feedback}"
+
+
+class FeedbackStore:
+    """
+    Feedback shared across the cohort, keyed by failure signature, with
+    lookup and hit counters for hit-rate statistics.
+    """
+
+    def __init__(self, directory=STORE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read(self, name, default=None):
+        try:
+            with open(self._path(name), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return default
+
+    def _write(self, name, data):
+        tmp_path = f"{self._path(name)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, self._path(name))
+
+    @contextmanager
+    def _locked(self):
+        """Hold an exclusive lock on the store, so counter updates are not lost."""
+        with open(self._path("store.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            yield
+
+    def lookup(self, signature):
+        """Return the stored feedback for signature, counting the lookup."""
+        with self._locked():
+            stats = self._read("stats.json", {"lookups": 0, "hits": 0})
+            stats["lookups"] += 1
+            entry = self._read(f"{signature}.json")
+            if entry:
+                stats["hits"] += 1
+                entry["hits"] += 1
+                self._write(f"{signature}.json", entry)
+            self._write("stats.json", stats)
+        return entry["feedback"] if entry else None
+
+    def store(self, signature, feedback, failing_tests):
+        with self._locked():
+            self._write(f"{signature}.json", {
+                "feedback": feedback,
+                "failing_tests": failing_tests,
+                "hits": 0,
+            })
+
+    def stats(self):
+        stats = self._read("stats.json", {"lookups": 0, "hits": 0})
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json") and name != "stats.json":
+                entry = self._read(name)
+                if entry:
+                    entries.append((entry["hits"], name[:-len(".json")], entry["failing_tests"]))
+        stats["signatures"] = len(entries)
+        stats["top"] = sorted(entries, reverse=True)[:10]
+        return stats
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] != "stats":
+        print("Usage: python -m taskgen feedback-stats")
+        sys.exit(1)
+
+    stats = FeedbackStore().stats()
+    hit_rate = stats["hits"] / stats["lookups"] if stats["lookups"] else 0.0
+    print(f"{stats['signatures']} stored signatures, {stats['lookups']} lookups, {stats['hits']} hits ({hit_rate:.0%} hit rate)")
+    for hits, signature, failing_tests in stats["top"]:
+        print(f"{hits:>5}  {signature[:12]}  {', '.join(failing_tests[:3])}")
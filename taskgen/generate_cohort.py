@@ -0,0 +1,221 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import itertools
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .budget import RunBudget
+from .pipeline import STAGE_NAMES, StageError, run_pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate one task variant per theme x language x seed combination."
+    )
+    parser.add_argument("matrix", help="JSON file with 'themes', 'languages' and 'seeds' lists")
+    parser.add_argument("--workdir", default="cohort", help="Directory for worktrees and the checkpoint")
+    parser.add_argument("--workers", type=int, default=4, help="Number of variants generated concurrently")
+    parser.add_argument("--rate", type=float, default=20.0, help="Maximum stage starts per minute across all workers")
+    parser.add_argument("--base-ref", default="HEAD", help="Ref every variant worktree starts from")
+    parser.add_argument("--token-budget", type=int, default=int(os.getenv("RUN_TOKEN_BUDGET", "0")) or None,
+                        help="Total prompt and output tokens each variant may use")
+    parser.add_argument("--time-budget", type=int, default=int(os.getenv("RUN_TIME_BUDGET", "0")) or None,
+                        help="Wall-clock seconds each variant may take")
+    args = parser.parse_args()
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        print("Error: OPENAI_API_KEY is not set.")
+        sys.exit(1)
+
+    try:
+        with open(args.matrix, "r") as f:
+            matrix = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"Error: Could not read matrix file {args.matrix}: {e}")
+        sys.exit(1)
+
+    variants = build_variants(matrix)
+    if not variants:
+        print("Error: The matrix does not contain any variants.")
+        sys.exit(1)
+
+    os.makedirs(args.workdir, exist_ok=True)
+    checkpoint = Checkpoint(os.path.join(args.workdir, "checkpoint.json"))
+    limiter = RateLimiter(args.rate)
+
+    pending = [v for v in variants if checkpoint.status(v["id"]) != "done"]
+    print(f"{len(variants)} variants in matrix, {len(variants) - len(pending)} already done, {len(pending)} to generate.")
+
+    started = time.monotonic()
+    done_count = 0
+    failed = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(generate_variant, api_key, variant, args, checkpoint, limiter): variant
+            for variant in pending
+        }
+        for future in as_completed(futures):
+            variant = futures[future]
+            try:
+                branch_name = future.result()
+                done_count += 1
+                print(f"Variant {variant['id']} done on branch {branch_name}.")
+            except Exception as e:
+                failed.append(variant["id"])
+                print(f"Variant {variant['id']} failed: {e}")
+            print_throughput(done_count, len(pending), started)
+
+    if failed:
+        print(f"{len(failed)} variants failed: {', '.join(failed)}. Rerun the same command to resume them.")
+        sys.exit(1)
+
+
+def build_variants(matrix):
+    """Expand the theme x language x seed matrix into a list of variants."""
+    themes = matrix.get("themes", [])
+    languages = matrix.get("languages", ["English"])
+    seeds = matrix.get("seeds", [0])
+
+    variants = []
+    for (theme_index, theme), language, seed in itertools.product(enumerate(themes), languages, seeds):
+        variant_id = f"t{theme_index}-{slugify(language)}-s{seed}"
+        variants.append({"id": variant_id, "theme": theme, "language": language, "seed": seed})
+    return variants
+
+
+def slugify(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def generate_variant(api_key, variant, args, checkpoint, limiter):
+    """
+    Run the whole pipeline for one variant in its own git worktree, resuming
+    after the last stage recorded in the checkpoint.
+    """
+    worktree = os.path.abspath(os.path.join(args.workdir, variant["id"]))
+    if not os.path.isdir(worktree):
+        subprocess.run(
+            ["git", "worktree", "add", "--detach", worktree, args.base_ref],
+            check=True,
+            stdout=subprocess.DEVNULL
+        )
+
+    state = checkpoint.get(variant["id"])
+    branch_name = state.get("branch_name") or f"task-cohort-{variant['id']}"
+    env = {
+        "TASK_THEME": variant["theme"],
+        "TASK_LANGUAGE": variant["language"],
+        "TASK_SEED": str(variant["seed"]),
+        "TASK_BRANCH_NAME": branch_name,
+    }
+
+    def before_stage(stage):
+        limiter.acquire()
+        print(f"[{variant['id']}] Running {stage}...")
+
+    def after_stage(stage, branch_name):
+        checkpoint.stage_done(variant["id"], stage, branch_name)
+
+    run_dir = os.path.join(args.workdir, "runs", variant["id"])
+    if (args.token_budget or args.time_budget) and RunBudget.for_run(run_dir) is None:
+        RunBudget.create(run_dir, args.token_budget, args.time_budget)
+
+    try:
+        branch_name = run_pipeline(
+            api_key,
+            worktree,
+            env=env,
+            branch_name=branch_name,
+            completed=state.get("stages", []),
+            before_stage=before_stage,
+            after_stage=after_stage,
+            run_dir=run_dir
+        )
+    except StageError as e:
+        checkpoint.failed(variant["id"], e.stage)
+        raise
+    return branch_name
+
+
+def print_throughput(done_count, total, started):
+    elapsed_hours = (time.monotonic() - started) / 3600
+    rate = done_count / elapsed_hours if elapsed_hours > 0 else 0.0
+    print(f"Progress: {done_count}/{total} variants, {rate:.1f} variants/hour.")
+
+
+class RateLimiter:
+    """Token bucket shared by all workers, refilled at rate_per_minute."""
+
+    def __init__(self, rate_per_minute, burst=1):
+        self.interval = 60.0 / rate_per_minute
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * self.interval
+            time.sleep(wait)
+
+
+class Checkpoint:
+    """
+    Per-variant progress stored as JSON. Every update rewrites the file
+    atomically so a crash never leaves a half-written checkpoint behind.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, "r") as f:
+                self.variants = json.load(f)
+        except FileNotFoundError:
+            self.variants = {}
+
+    def get(self, variant_id):
+        with self.lock:
+            return dict(self.variants.get(variant_id, {}))
+
+    def status(self, variant_id):
+        return self.get(variant_id).get("status")
+
+    def stage_done(self, variant_id, stage, branch_name):
+        with self.lock:
+            state = self.variants.setdefault(variant_id, {"stages": []})
+            if stage not in state["stages"]:
+                state["stages"].append(stage)
+            state["branch_name"] = branch_name
+            state["status"] = "done" if len(state["stages"]) == len(STAGE_NAMES) else "running"
+            self._save()
+
+    def failed(self, variant_id, stage):
+        with self.lock:
+            state = self.variants.setdefault(variant_id, {"stages": []})
+            state["status"] = "failed"
+            state["failed_stage"] = stage
+            self._save()
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.variants, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import sys
+import os
+
+from .completion import complete, create_client
+from .feedback_store import FeedbackStore, failure_signature, personalize
+from .github import github_context
+from .status_comment import update_status
+from .test_results import parse_test_results
+
+def main(pr_number, test_results_file):
+    # Extract only the failing tests, assertion values and relevant stack
+    # frames instead of pasting the whole build log into the prompt
+    report = parse_test_results(test_results_file)
+    test_results = report.render()
+
+    # Students failing the same tests in the same way get the stored hints
+    store = FeedbackStore()
+    signature = failure_signature(report)
+    feedback = store.lookup(signature) if signature else None
+    if feedback:
+        print("Reusing stored feedback for a known failure signature.")
+    else:
+        feedback = generate_feedback(test_results)
+        if signature:
+            store.store(signature, feedback, list(report.failures))
+
+    if os.getenv('FEEDBACK_PERSONALIZE', '').lower() in ('1', 'true', 'yes'):
+        feedback = personalize(feedback, report, os.getenv('PR_AUTHOR'))
+
+    post_feedback(pr_number, feedback)
+
+def generate_feedback(test_results):
+    # Prepare the prompt
+    prompt = (
+        f"The student's code failed the following tests:\n\n{test_results}\n\n"
+        "Provide constructive and concise feedback to help the student understand what went wrong and how to fix it."
+    )
+
+    # Initialize OpenAI client
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        print("Error: OPENAI_API_KEY is not set.")
+        sys.exit(1)
+
+    client = create_client(api_key)
+
+    # Call OpenAI API using the new format
+    try:
+        feedback = complete(
+            client,
+            stage="feedback",
+            messages=[
+                {
+                    "role": "system",
+                    "content": "You are a helpful instructor providing constructive feedback to a student.",
+                    "content": "You are instructive but to the point and concise with your help and do not reveal the whole answer to the students but provide hints so that they can get there."
+                },
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=500,
+            temperature=0.7,
+        )
+    except Exception as e:
+        print(f"Error generating feedback: {e}")
+        sys.exit(1)
+    return feedback
+
+def post_feedback(pr_number, feedback):
+    # Put the feedback in the PR's status comment; a result from an earlier
+    # passing run no longer applies
+    repo, gh_token = github_context()
+    update_status(repo, pr_number, gh_token, "feedback", feedback, clear=("result",))
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m taskgen feedback <pr_number> <test_results_file>")
+        sys.exit(1)
+    pr_number = sys.argv[1]
+    test_results_file = sys.argv[2]
+    main(pr_number, test_results_file)
@@ -1,8 +1,20 @@
 import os
 import sys
+import shutil
+import tempfile
+import queue
 import subprocess
 import re  # For regex operations
-from openai import OpenAI
+
+from .adversarial_solution import clean_up_non_code_content
+from .budget import plan_request, record_usage
+from .completion import MODEL, Attempt, Cancelled, chat_messages, continue_truncated, create_client, generate_with_retries, stage_deadline
+from .git import commit_and_push_changes
+from .java import check_and_add_missing_imports, clean_class_block
+from .rundir import record_exchange
+from .task import split_task_into_exercises
+
+SYSTEM_PROMPT = "You are an expert Java programmer and educator."
 
 def main(api_key, branch_name):
     if not api_key:
@@ -13,7 +25,7 @@ def main(api_key, branch_name):
         sys.exit(1)
 
     # Initialize the OpenAI client
-    client = OpenAI(api_key=api_key)
+    client = create_client(api_key)
 
     # Read the new task description
     new_task_path = os.path.join("tasks", "new_task.md")
@@ -29,8 +41,15 @@ def main(api_key, branch_name):
     # Combine all exercises into a single prompt
     prompt = build_prompt(task_description)
 
-    # Call OpenAI API to generate the solution code
-    response_content = generate_with_retries(client, prompt, max_retries=3)
+    # Call OpenAI API to generate the solution code, optionally racing several
+    # candidates and keeping the first one that passes local validation
+    candidates = int(os.getenv("SOLUTION_CANDIDATES", "1"))
+    if candidates > 1:
+        response_content = generate_speculatively(client, prompt, candidates)
+    else:
+        response_content = generate_with_retries(
+            client, chat_messages(prompt, SYSTEM_PROMPT), stage="generate-solution", description="solution code"
+        )
     if response_content is None:
         print("Error: Failed to generate solution code after multiple retries.")
         sys.exit(1)
@@ -43,25 +62,7 @@ def main(api_key, branch_name):
     write_generated_code_to_files(hidden_tasks_dir, response_content)
 
     # Commit and push changes
-    commit_and_push_changes(branch_name, hidden_tasks_dir)
-
-def split_task_into_exercises(task_content):
-    # Assuming each exercise starts with '#### Exercise'
-    exercises = []
-    lines = task_content.split('\n')
-    current_exercise = []
-    in_exercise = False
-    for line in lines:
-        if line.strip().startswith('#### Exercise'):
-            if current_exercise:
-                exercises.append('\n'.join(current_exercise))
-                current_exercise = []
-            in_exercise = True
-        if in_exercise:
-            current_exercise.append(line)
-    if current_exercise:
-        exercises.append('\n'.join(current_exercise))
-    return exercises
+    commit_and_push_changes(branch_name, hidden_tasks_dir, "Add generated solution", checkout=True)
 
 def build_prompt(task_description):
     # Inspirational code snippet for the solution
@@ -233,19 +234,41 @@ def write_generated_code_to_files(directory, code_content):
     Handles cases where leftover comments or initializations are present.
     Also ensures that import statements and public class declarations are captured.
     """
+    class_files, skipped_blocks = split_into_class_files(code_content)
+
+    for block in skipped_blocks:
+        print(f"Skipping block due to missing class name:\n{block[:50]}")
+
+    for class_name, cleaned_block in class_files:
+        # Write cleaned code to a file
+        file_name = f"{class_name}.java"
+        file_path = os.path.join(directory, file_name)
+
+        try:
+            with open(file_path, "w") as java_file:
+                java_file.write(cleaned_block)
+            print(f"Successfully wrote {file_name}")
+        except IOError as e:
+            print(f"Error writing file {file_name}: {e}")
+
+def split_into_class_files(code_content):
+    """
+    Split generated code into (class_name, cleaned_block) pairs, one per public class.
+    Also returns the non-empty blocks that had no class name.
+    """
     # Split the code content into separate class definitions
     class_blocks = re.split(r'(?:^|\n)(?=public\s+class\s)', code_content)
 
+    class_files = []
+    skipped_blocks = []
     for block in class_blocks:
         if not block.strip():
             continue  # Skip empty blocks
 
         # Extract class name
         class_name_match = re.search(r'public\s+class\s+(\w+)', block)
-        if class_name_match:
-            class_name = class_name_match.group(1)
-        else:
-            print(f"Skipping block due to missing class name:\n{block[:50]}")
+        if not class_name_match:
+            skipped_blocks.append(block)
             continue
 
         # Clean up the block, removing content after the last closing brace
@@ -254,105 +277,154 @@ def write_generated_code_to_files(directory, code_content):
         # Ensure the necessary imports are included
         cleaned_block = check_and_add_missing_imports(cleaned_block)
 
-        # Write cleaned code to a file
-        file_name = f"{class_name}.java"
-        file_path = os.path.join(directory, file_name)
+        class_files.append((class_name_match.group(1), cleaned_block))
 
-        try:
-            with open(file_path, "w") as java_file:
-                java_file.write(cleaned_block)
-            print(f"Successfully wrote {file_name}")
-        except IOError as e:
-            print(f"Error writing file {file_name}: {e}")
-
-def clean_class_block(block):
-    """Ensure the block only contains content until the last closing brace."""
-    # Find the position of the last closing brace '}'
-    last_closing_brace = block.rfind("}")
-    if last_closing_brace != -1:
-        # Truncate the block at the last closing brace
-        block = block[:last_closing_brace + 1]
-    return block
+    return class_files, skipped_blocks
 
-def check_and_add_missing_imports(block):
+def generate_speculatively(client, prompt, candidates):
     """
-    Check the class block for missing imports and add necessary imports based on the content.
+    Request several candidate solutions concurrently, validate them as they
+    arrive and return the first valid one. Candidates still streaming when a
+    winner is found are cancelled. When none is valid, the first candidate
+    to arrive is returned cleaned up, as the sequential path would have
+    used it; None only when every candidate failed.
     """
-    required_imports = {
-        "List": "import java.util.List;",
-        "ArrayList": "import java.util.ArrayList;",
-        "Map": "import java.util.Map;",
-        "HashMap": "import java.util.HashMap;",
-        "Scanner": "import java.util.Scanner;",
-        "Set": "import java.util.Set;",
-        "HashSet": "import java.util.HashSet;",
-        "Random": "import java.util.Random;"
-    }
-
-    # Extract existing imports from the block
-    existing_imports = re.findall(r'^\s*import .*;', block, re.MULTILINE)
-
-    # Add missing imports
-    imports_to_add = []
-    for class_name, import_statement in required_imports.items():
-        if class_name in block and import_statement not in existing_imports:
-            imports_to_add.append(import_statement)
-
-    # Prepend missing imports at the start of the block
-    if imports_to_add:
-        block = "\n".join(imports_to_add) + "\n\n" + block
+    messages = chat_messages(prompt, SYSTEM_PROMPT)
+    model, max_tokens, seconds_left = plan_request("generate-solution", messages, MODEL)
+    request = dict(
+        model=model,
+        messages=messages,
+        max_tokens=max_tokens,
+        timeout=stage_deadline("generate-solution") if seconds_left is None else min(stage_deadline("generate-solution"), seconds_left)
+    )
 
-    return block
+    results = queue.Queue()
+    attempts = [
+        Attempt(index, results, lambda cancelled, opened: stream_candidate(client, request, cancelled, opened))
+        for index in range(candidates)
+    ]
+    first = None
+    try:
+        for _ in range(candidates):
+            attempt, content, error = results.get()
+            index = attempt.name
+            if error is not None:
+                print(f"Error generating solution candidate {index + 1}: {error}")
+                continue
+            if content is None:
+                continue
+            if first is None:
+                first = (index, content)
+
+            problems = validate_solution(content)
+            if problems:
+                print(f"Discarding solution candidate {index + 1}: {'; '.join(problems)}")
+                continue
+
+            print(f"Using solution candidate {index + 1} of {candidates}.")
+            record_exchange(messages, content)
+            return content
+
+        if first is None:
+            return None
+        index, content = first
+        print(f"No solution candidate passed validation; using candidate {index + 1} cleaned up.")
+        record_exchange(messages, content)
+        return clean_up_non_code_content(content)
+    finally:
+        # Closing the losers' streams ends their reads right away, and stops
+        # the continuations of a candidate cut off at the length limit
+        for attempt in attempts:
+            attempt.cancel()
+
+def stream_candidate(client, request, cancelled, opened=None):
+    """
+    Stream one completion, giving up as soon as another candidate has won.
+    Every candidate is charged to the run budget, including abandoned ones.
+    A candidate cut off at the length limit is continued, not discarded.
+    """
+    stream = client.chat.completions.create(stream=True, **request)
+    if opened is not None:
+        opened(stream)
+    parts = []
+    finish_reason = None
+    try:
+        for chunk in stream:
+            if cancelled.is_set():
+                return None
+            if chunk.choices:
+                finish_reason = chunk.choices[0].finish_reason or finish_reason
+                if chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+    finally:
+        stream.close()
+        record_usage("generate-solution", request["model"], request["messages"], "".join(parts))
+    content = "".join(parts)
+    if finish_reason == "length":
+        try:
+            content = continue_truncated(
+                client, request["messages"], content, "generate-solution", request["model"],
+                max_tokens=request["max_tokens"], cancel=cancelled
+            )
+        except Cancelled:
+            return None
+    return content.strip()
 
-def generate_with_retries(client, prompt, max_retries=3):
-    for attempt in range(max_retries):
+def validate_solution(code_content):
+    """
+    Run cheap local checks on generated solution code and return a list of
+    problems; an empty list means the solution is usable.
+    """
+    problems = []
+    if "```" in code_content:
+        problems.append("contains markdown code fences")
+
+    class_files, _ = split_into_class_files(code_content)
+    if not class_files:
+        problems.append("no public class found")
+
+    for class_name, block in class_files:
+        code = strip_comments_and_literals(block)
+        if code.count("{") != code.count("}"):
+            problems.append(f"unbalanced braces in {class_name}")
+        if code.count("(") != code.count(")"):
+            problems.append(f"unbalanced parentheses in {class_name}")
+
+    if not problems and shutil.which("javac"):
+        problems.extend(compile_class_files(class_files))
+    return problems
+
+def strip_comments_and_literals(code):
+    """Remove comments, string and char literals so braces inside them are not counted."""
+    return re.sub(r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'', '', code, flags=re.DOTALL)
+
+def compile_class_files(class_files):
+    """Compile the classes with javac in a scratch directory and return any errors."""
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        paths = []
+        for class_name, block in class_files:
+            path = os.path.join(scratch_dir, f"{class_name}.java")
+            with open(path, "w") as java_file:
+                java_file.write(block)
+            paths.append(path)
         try:
-            response = client.chat.completions.create(
-                model="gpt-4o-2024-08-06",
-                messages=[
-                    {"role": "system", "content": "You are an expert Java programmer and educator."},
-                    {"role": "user", "content": prompt}
-                ]
+            result = subprocess.run(
+                ["javac", "-d", os.path.join(scratch_dir, "classes")] + paths,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                timeout=120
             )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"Error generating solution code: {e}")
-            if attempt < max_retries - 1:
-                print("Retrying...")
-    return None
-
-def commit_and_push_changes(branch_name, directory_path):
-    try:
-        # Ensure we're on the correct branch
-        subprocess.run(["git", "checkout", branch_name], check=True)
-
-        subprocess.run(["git", "config", "--global", "user.email", "actions@github.com"], check=True)
-        subprocess.run(["git", "config", "--global", "user.name", "github-actions"], check=True)
-
-        # Add the .hidden_tasks directory to git
-        subprocess.run(["git", "add", directory_path], check=True)
-
-        # Commit the changes
-        subprocess.run(["git", "commit", "-m", "Add generated solution"], check=True)
-
-        # Push the changes
-        subprocess.run(
-            ["git", "push", "--set-upstream", "origin", branch_name],
-            check=True,
-            env={
-                **os.environ,
-                "GIT_ASKPASS": "echo",
-                "GIT_USERNAME": "x-access-token",
-                "GIT_PASSWORD": os.getenv("GITHUB_TOKEN")
-            }
-        )
-    except subprocess.CalledProcessError as e:
-        print(f"Error committing and pushing changes: {e}")
-        sys.exit(1)
+        except subprocess.TimeoutExpired:
+            return ["javac timed out"]
+    if result.returncode != 0:
+        first_error = result.stdout.strip().splitlines()[0] if result.stdout.strip() else "unknown error"
+        return [f"does not compile: {first_error}"]
+    return []
 
 if __name__ == "__main__":
     if len(sys.argv) != 3:
-        print("Usage: python generate_solution.py <api_key> <branch_name>")
+        print("Usage: python -m taskgen generate-solution <api_key> <branch_name>")
         sys.exit(1)
 
     api_key = sys.argv[1]
@@ -0,0 +1,281 @@
+import os
+import re
+import sys
+import json
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from .completion import chat_messages, create_client, generate_with_retries
+from .git import commit_and_push_changes, create_branch
+from .task import EXERCISE_HEADER, split_task_into_exercises
+
+SYSTEM_PROMPT = (
+    "You are an experienced programming instructor creating detailed tasks for university-level students. "
+    "The tasks should be challenging, pedagogically valuable, and should include detailed descriptions with code snippets where necessary."
+)
+
+# "single" asks for the whole task in one completion; "outline" first asks for
+# a short shared outline and then writes the introduction and every exercise
+# concurrently against it
+MODE = os.getenv("TASK_DESCRIPTION_MODE", "single")
+
+MIN_EXERCISES = 6
+OUTLINE_MAX_TOKENS = 800
+SECTION_MAX_TOKENS = 1500
+
+EXERCISE_FOCUS = [
+    "Focus on theoretical aspects of the learning goals. Challenge students' understanding through conceptual questions and explanations without requiring coding.",
+    "Focus on theoretical aspects of the learning goals. Challenge students' understanding through conceptual questions and explanations without requiring coding.",
+    "Focus on combining and integrating the concepts into coding. Require students to write code that applies the concepts in practical scenarios.",
+    "Focus on combining and integrating the concepts into coding. Require students to write code that applies the concepts in practical scenarios.",
+]
+FINAL_FOCUS = (
+    "A challenging coding task that requires significant learning and coding effort to complete. "
+    "Make it step-by-step and build upon the previous exercises."
+)
+
+def main(api_key):
+    if not api_key:
+        print("Error: OpenAI API key is missing.")
+        sys.exit(1)
+
+    # Initialize the OpenAI client
+    client = create_client(api_key)
+
+    # Extract theme and language from environment variables
+    theme = os.getenv("TASK_THEME", "Create a basic Java application with the following requirements.")
+    language = os.getenv("TASK_LANGUAGE", "English")
+
+    # Cohort runs generate several variants per minute, so they pass their own
+    # branch name and a seed that makes each variant distinct and reproducible
+    seed = os.getenv("TASK_SEED")
+    seed = int(seed) if seed else None
+
+    # Extract learning goals
+    learning_goals = """
+    * Understanding the Java `Random` object
+    * Understanding the [ternary operator]
+    * Know the difference between a deep and a shallow copy
+    * Finding and fixing bugs
+    * Using an Iterator to modify a collection during iteration
+    * **Optional**: Using inheritance to avoid code duplication 
+    """
+
+    # Read the original task from file
+    original_task_path = os.path.join("tasks", "original_task.md")
+    if not os.path.exists(original_task_path):
+        print(f"Error: Original task file not found at {original_task_path}")
+        sys.exit(1)
+    with open(original_task_path, "r") as f:
+        original_task_content = f.read()
+
+    # Split the original task into chunks per exercise
+    exercise_chunks = split_task_into_exercises(original_task_content)
+
+    extra_args = {"seed": seed} if seed is not None else {}
+    if MODE == "outline":
+        response_content = generate_outlined(client, theme, language, learning_goals, exercise_chunks, extra_args)
+    else:
+        response_content = generate_single(client, theme, language, learning_goals, exercise_chunks, extra_args)
+    if response_content is None:
+        print("Error: Failed to generate task description after multiple retries.")
+        sys.exit(1)
+
+    # Create a new branch with a unique name
+    branch_name = os.getenv("TASK_BRANCH_NAME")
+    if not branch_name:
+        from pytz import timezone
+        stockholm_tz = timezone('Europe/Stockholm')
+        branch_name = f"task-{datetime.now(stockholm_tz).strftime('%Y%m%d%H%M')}"
+    create_branch(branch_name)
+
+    # Write the response content to a markdown file
+    task_file_path = os.path.join("tasks", "new_task.md")
+    with open(task_file_path, "w") as file:
+        file.write(response_content)
+
+    # Commit and push changes
+    commit_and_push_changes(branch_name, task_file_path, f"Add new task description: {branch_name}")
+
+    # Output the branch name for the next job
+    print(f"::set-output name=branch_name::{branch_name}")
+
+def generate_single(client, theme, language, learning_goals, exercise_chunks, extra_args):
+    """Generate the whole task description in one completion."""
+    # Build the messages for the OpenAI API
+    messages = [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": (
+                f"Create a new programming task in {language} with the following theme:\n\n"
+                f"**Theme**: {theme}\n\n"
+                f"The task must include and integrate the following learning goals:\n{learning_goals}\n\n"
+                "The task should include at least six exercises that gradually increase in difficulty. Each exercise should be well-detailed and include code snippets where necessary.\n\n"
+                "- **Exercises 1 & 2**: Focus on theoretical aspects of the learning goals. Challenge students' understanding through conceptual questions and explanations without requiring coding.\n\n"
+                "- **Exercises 3 & 4**: Focus on combining and integrating the concepts into coding. Require students to write code that applies the concepts in practical scenarios.\n\n"
+                "- **Exercises 5 & 6**: Are challenging coding tasks that require significant learning and coding effort to complete. These should be step-by-step tasks that build upon previous exercises.\n\n"
+                "Use the following exercises from the original task as inspiration for each exercise in the new task. Adapt them to fit the new theme and ensure they cover the learning goals.\n\n"
+            )
+        }
+    ]
+
+    # Add each exercise chunk as a separate message
+    for i, chunk in enumerate(exercise_chunks):
+        messages.append({
+            "role": "assistant",
+            "content": (
+                f"Here is exercise {i+1} from the original task for inspiration:\n\n{chunk}\n\n"
+                "Please adapt this exercise to fit the new theme and include it in the new task."
+            )
+        })
+
+    messages.append({
+        "role": "user",
+        "content": (
+            "Please provide the complete new task description, including all exercises, instructions, and any necessary details. "
+            "Include titles, subtitles, and emojis for aesthetics to make the description detailed, well-structured, and engaging. "
+            "Ensure the task is challenging and pedagogically valuable, following the structure specified."
+        )
+    })
+
+    # Call OpenAI API to generate the task description
+    return generate_with_retries(
+        client, messages, stage="generate-task-description", description="task description", **extra_args
+    )
+
+def generate_outlined(client, theme, language, learning_goals, exercise_chunks, extra_args):
+    """
+    Generate a short outline of the task first, then the introduction and
+    every exercise concurrently against it, and stitch them in order.
+    Falls back to a single completion when no usable outline comes back.
+    """
+    count = max(MIN_EXERCISES, len(exercise_chunks))
+    outline = generate_outline(client, theme, language, learning_goals, count, extra_args)
+    if outline is None:
+        print("No usable outline, generating the task description in one completion.")
+        return generate_single(client, theme, language, learning_goals, exercise_chunks, extra_args)
+
+    outline_text = json.dumps(outline, indent=2, ensure_ascii=False)
+    shared = (
+        f"You are writing one part of a programming task in {language}. Other parts are written at the same time "
+        "by other authors from the same outline, so use exactly the class names, method names and terms of the outline "
+        "and do not repeat what the other parts cover.\n\n"
+        f"### Outline\n{outline_text}\n\n"
+        f"### Learning goals\n{learning_goals}\n\n"
+    )
+    prompts = [
+        shared + (
+            "Write the title and the introduction of the task: the scenario, the classes students will work with "
+            "and what they will learn. Do not write any exercises. "
+            "Include a title, subtitles and emojis for aesthetics."
+        )
+    ]
+    for i, exercise in enumerate(outline["exercises"]):
+        focus = EXERCISE_FOCUS[i] if i < len(EXERCISE_FOCUS) else FINAL_FOCUS
+        inspiration = (
+            f"Use this exercise from the original task as inspiration and adapt it to the new theme:\n\n{exercise_chunks[i]}\n\n"
+            if i < len(exercise_chunks) else ""
+        )
+        prompts.append(shared + (
+            f"Write exercise {i + 1}: {exercise['title']}. Its goal: {exercise['goal']}\n\n"
+            f"{focus}\n\n{inspiration}"
+            f"Start with the heading '{EXERCISE_HEADER} {i + 1}: {exercise['title']}' and write only this exercise, "
+            "with detailed instructions and code snippets where necessary."
+        ))
+
+    with ThreadPoolExecutor(max_workers=len(prompts)) as executor:
+        sections = list(executor.map(
+            lambda prompt: generate_with_retries(
+                client,
+                chat_messages(prompt, system=SYSTEM_PROMPT),
+                stage="generate-task-description",
+                description="a task section",
+                max_tokens=SECTION_MAX_TOKENS,
+                **extra_args
+            ),
+            prompts
+        ))
+    if any(section is None for section in sections):
+        return None
+    return stitch_sections(sections[0], sections[1:], outline)
+
+
+def generate_outline(client, theme, language, learning_goals, count, extra_args):
+    """Ask for the shared outline as JSON; returns None when it is unusable."""
+    prompt = (
+        f"Plan a new programming task in {language} with the following theme:\n\n"
+        f"**Theme**: {theme}\n\n"
+        f"The task must include and integrate the following learning goals:\n{learning_goals}\n\n"
+        f"It has {count} exercises that gradually increase in difficulty: the first two are theoretical, "
+        "the next two integrate the concepts into code and the rest are challenging step-by-step coding tasks.\n\n"
+        "Reply with a JSON object with the keys "
+        '"title" (string), "scenario" (two sentences), '
+        '"classes" (list of {"name", "responsibility", "methods": list of method signatures}), '
+        '"terms" (list of domain terms to use consistently) and '
+        f'"exercises" (list of exactly {count} objects with "title" and "goal"). Keep it short.'
+    )
+    content = generate_with_retries(
+        client,
+        chat_messages(prompt, system=SYSTEM_PROMPT),
+        stage="generate-task-description",
+        description="task outline",
+        max_tokens=OUTLINE_MAX_TOKENS,
+        response_format={"type": "json_object"},
+        **extra_args
+    )
+    try:
+        outline = json.loads(content)
+        exercises = outline["exercises"]
+        if len(exercises) != count or not all(e.get("title") and e.get("goal") for e in exercises):
+            return None
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return None
+    outline.setdefault("classes", [])
+    return outline
+
+
+def stitch_sections(introduction, exercises, outline):
+    """
+    Join the introduction and the exercises in order, making the exercise
+    headings uniform and class names spelled as in the outline.
+    """
+    class_names = {
+        re.sub(r'[\W_]', '', c["name"]).lower(): c["name"]
+        for c in outline["classes"] if isinstance(c, dict) and c.get("name")
+    }
+
+    def normalize_names(text):
+        # Only capitalized identifiers, so variables such as inventoryManager stay
+        def replace(match):
+            return class_names.get(re.sub(r'_', '', match.group(0)).lower(), match.group(0))
+        return re.sub(r'\b[A-Z][A-Za-z0-9_]*\b', replace, text)
+
+    parts = [normalize_names(strip_exercise_headings(introduction))]
+    for i, (text, planned) in enumerate(zip(exercises, outline["exercises"])):
+        body = strip_exercise_headings(text, first_line_only=True).strip()
+        # Headings inside an exercise must not look like the start of another one
+        body = re.sub(r'^#{1,4}(?=\s)', '#####', body, flags=re.MULTILINE)
+        parts.append(f"{EXERCISE_HEADER} {i + 1}: {planned['title']}\n\n{normalize_names(body)}")
+    return "\n\n".join(part.strip() for part in parts) + "\n"
+
+
+def strip_exercise_headings(text, first_line_only=False):
+    """Drop exercise headings the model wrote itself; they are regenerated."""
+    text = text.strip()
+    if first_line_only:
+        first, _, rest = text.partition("\n")
+        return rest if re.match(r'^#+\s*Exercise\b', first, re.IGNORECASE) else text
+    return re.sub(r'^#+\s*Exercise\b.*\n?', '', text, flags=re.MULTILINE | re.IGNORECASE)
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Error: Missing required command line argument 'api_key'")
+        sys.exit(1)
+
+    api_key = sys.argv[1]
+
+    main(api_key)
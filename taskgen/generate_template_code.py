@@ -1,14 +1,15 @@
 import os
 import sys
-import subprocess
-from openai import OpenAI
+
+from .completion import chat_messages, create_client, generate_with_retries
+from .git import commit_and_push_changes
 
 def main(api_key, branch_name):
     if not api_key:
         print("Error: OpenAI API key is missing.")
         sys.exit(1)
 
-    client = OpenAI(api_key=api_key)
+    client = create_client(api_key)
 
     # Read the existing solution code from .hidden_tasks directory
     solution_dir = ".hidden_tasks"
@@ -46,7 +47,7 @@ def main(api_key, branch_name):
             print(f"Error writing file {filename}: {e}")
 
     # Commit and push changes
-    commit_and_push_changes(branch_name, gen_src_dir)
+    commit_and_push_changes(branch_name, gen_src_dir, "Add generated template code", recreate=True)
 
 def generate_template_with_openai(client, solution_content):
     """
@@ -63,27 +64,9 @@ def generate_template_with_openai(client, solution_content):
             "Remember to put the right code in the right java file and take consideration to the names of the java classes with condsideration to the file they are in."
     )
 
-    template = generate_with_retries(client, prompt, max_retries=3)
+    template = generate_with_retries(client, chat_messages(prompt), stage="generate-template-code")
     return template
 
-def generate_with_retries(client, prompt, max_retries=3):
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-2024-08-06",
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            print(f"Error generating response: {e}")
-            if attempt < max_retries - 1:
-                print("Retrying...")
-            else:
-                return None
-
 def generate_template_fallback(solution_content):
     """
     Fallback method to manually generate a template by removing method bodies.
@@ -111,39 +94,9 @@ def generate_template_fallback(solution_content):
 
     return "\n".join(template_lines)
 
-def commit_and_push_changes(branch_name, directory_path):
-    if not branch_name:
-        print("Error: Branch name is empty.")
-        sys.exit(1)
-
-    try:
-        # Configure Git user
-        subprocess.run(["git", "config", "--global", "user.email", "actions@github.com"], check=True)
-        subprocess.run(["git", "config", "--global", "user.name", "github-actions"], check=True)
-
-        # Fetch the latest changes from the remote
-        subprocess.run(["git", "fetch", "origin"], check=True)
-
-        # Check out the branch or create it if it doesn't exist
-        subprocess.run(["git", "checkout", "-B", branch_name], check=True)
-
-        # Stage changes and commit
-        subprocess.run(["git", "add", directory_path], check=True)
-        subprocess.run(["git", "commit", "-m", "Add generated template code"], check=True)
-
-        # Push the changes
-        subprocess.run(
-            ["git", "push", "--set-upstream", "origin", branch_name],
-            check=True,
-            env=dict(os.environ, GIT_ASKPASS='echo', GIT_USERNAME='x-access-token', GIT_PASSWORD=os.getenv('GITHUB_TOKEN'))
-        )
-    except subprocess.CalledProcessError as e:
-        print(f"Error committing and pushing changes: {e}")
-        sys.exit(1)
-
 if __name__ == "__main__":
     if len(sys.argv) != 3:
-        print("Usage: python generate_template_code.py <api_key> <branch_name>")
+        print("Usage: python -m taskgen generate-template-code <api_key> <branch_name>")
         sys.exit(1)
 
     api_key = sys.argv[1]
@@ -0,0 +1,195 @@
+import os
+import re
+import sys
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .artifact_store import read_artifact_directory
+from .completion import chat_messages, create_client, generate_with_retries
+from .git import GitObjectReader, commit_and_push_changes, current_branch, resolve_branch
+from .java import api_surface
+
+# Example tests to inspire the model (not to be directly copied)
+EXAMPLE_TEST = """
+import org.junit.Test;
+
+import static org.junit.Assert.assertArrayEquals;
+import static org.junit.Assert.assertEquals;
+
+/**
+* Test cases for the Arrays class
+* NOTE: We do not require the students to handle edge cases such as
+* empty arrays, so these cases are not tested.
+*/
+public class ArraysTest {
+    private final int[] intArrayWithPositiveNumbers = new int[] {1, 2, 3, 4, 5, 0};
+
+    @Test
+    public void intAveragePositiveNumbersGivesExpectedResult() {
+        int expected = java.util.Arrays.stream(intArrayWithPositiveNumbers).sum() /
+                    intArrayWithPositiveNumbers.length;
+        assertEquals(expected, Arrays.average(intArrayWithPositiveNumbers));
+    }
+
+    @Test
+    public void reverseDoesNotModifyOriginalArray() {
+        int[] original = java.util.Arrays.copyOf(intArrayWithPositiveNumbers,
+                                                intArrayWithPositiveNumbers.length);
+        Arrays.reverse(intArrayWithPositiveNumbers);
+        assertArrayEquals(original, intArrayWithPositiveNumbers);
+    }
+}
+"""
+
+# Output cap of the request for one class; each covers a fraction of the task
+CLASS_MAX_TOKENS = 3000
+MAX_WORKERS = 8
+
+
+def main(api_key, branch_name):
+    if not api_key:
+        print("Error: OpenAI API key is missing.")
+        sys.exit(1)
+
+    client = create_client(api_key)
+
+    try:
+        solution_files = read_solution(branch_name)
+    except subprocess.CalledProcessError as e:
+        print(f"Error reading branch {branch_name}: {e}")
+        sys.exit(1)
+
+    if solution_files is None:
+        print("Error: Solution files not found in .hidden_tasks directory.")
+        sys.exit(1)
+
+    solution_files = {filename[:-len(".java")]: code for filename, code in solution_files.items()}
+    if not solution_files:
+        print("Error: No Java solution files found in .hidden_tasks.")
+        sys.exit(1)
+
+    # The tests only need what a caller of each class sees, not its bodies
+    surfaces = {name: api_surface(code) for name, code in solution_files.items()}
+
+    # One request per class, all in flight at once
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(len(surfaces), MAX_WORKERS)) as executor:
+        futures = {
+            executor.submit(
+                generate_with_retries,
+                client,
+                chat_messages(class_prompt(name, surfaces)),
+                stage="generate-tests",
+                description=f"the tests for {name}",
+                max_tokens=CLASS_MAX_TOKENS,
+            ): name
+            for name in surfaces
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    failed = [name for name, content in results.items() if content is None]
+    if failed:
+        print(f"Error: Failed to generate the tests for {', '.join(sorted(failed))} after multiple retries.")
+        sys.exit(1)
+
+    # Write the generated tests to appropriate Java files in the gen_test directory
+    gen_test_dir = os.path.join("gen_test")
+    for name in sorted(results):
+        write_generated_tests_to_files(gen_test_dir, results[name])
+
+    # Commit and push changes
+    commit_and_push_changes(branch_name, gen_test_dir, "Add generated tests", checkout=current_branch() != branch_name)
+
+def read_solution(branch_name):
+    """
+    Return {file name: code} of .hidden_tasks on the branch, or None. The
+    working tree is used when it is on the branch, since earlier stages of a
+    local run leave their output uncommitted; otherwise the files are read
+    straight from the object database, without a checkout.
+    """
+    if current_branch() == branch_name and os.path.isdir(".hidden_tasks"):
+        solution_files = {}
+        for filename in sorted(os.listdir(".hidden_tasks")):
+            if filename.endswith(".java"):
+                with open(os.path.join(".hidden_tasks", filename), "r") as file:
+                    solution_files[filename] = file.read()
+        return solution_files
+    with GitObjectReader() as reader:
+        return read_artifact_directory(reader, resolve_branch(branch_name), ".hidden_tasks", ".java")
+
+def class_prompt(name, surfaces):
+    """Prompt for the tests of one class, given the API surface of every class."""
+    others = "\n".join(surface for other, surface in surfaces.items() if other != name)
+    prompt = (
+        f"Given the following public API of the Java class {name}, generate a set of high-quality unit tests for it "
+        f"in a single test class named {name}Test. "
+        f"Ensure the tests are thorough, robust, and cover all edge cases, including invalid inputs, boundary conditions, and performance considerations. "
+        f"Base the expected results on the documented behaviour and ensure the tests use the correct imports.\n\n"
+        f"### {name}\n{surfaces[name]}\n"
+    )
+    if others:
+        prompt += f"### Other classes of the task (do not test these)\n{others}\n"
+    prompt += (
+        f"### Example Test (for inspiration only)\n{EXAMPLE_TEST}\n\n"
+        "IMPORTANT: The response must be plain Java code with no markdown formatting or ```java blocks. Ensure that the response is ready to be saved directly as a .java file."
+        "Make sure all the right imports are always included."
+    )
+    return prompt
+
+def write_generated_tests_to_files(directory, code_content):
+    """
+    Write generated Java tests to separate files based on class names.
+    Ensures that import statements and public class declarations are correctly handled.
+    """
+    # Split the code into blocks starting with 'public class' or similar
+    file_blocks = re.split(r'(?=public\s+class\s+\w+\s*{)', code_content)
+
+    for block in file_blocks:
+        if not block.strip():
+            continue  # Skip empty blocks
+
+        # Extract class name
+        class_name_match = re.search(r'public\s+class\s+([A-Za-z_]\w*)\s*{', block)
+        if class_name_match:
+            class_name = class_name_match.group(1)
+        else:
+            print(f"Skipping block due to missing class name in block: {block[:50]}")
+            continue
+
+        # Ensure the block has matching braces
+        if block.count('{') != block.count('}'):
+            print(f"Skipping block due to unmatched braces in class {class_name}.")
+            continue
+
+        # Construct the file content
+        package_declaration = "package test;\n\n"
+        imports = (
+            "import org.junit.Before;\n"
+            "import org.junit.Test;\n"
+            "import static org.junit.Assert.*;\n\n"
+        )
+        file_content = package_declaration + imports + block
+
+        file_name = f"{class_name}.java"
+        file_path = os.path.join(directory, file_name)
+
+        # Ensure the directory exists
+        os.makedirs(directory, exist_ok=True)
+
+        try:
+            with open(file_path, "w") as java_file:
+                java_file.write(file_content)
+            print(f"Successfully wrote {file_name}")
+        except IOError as e:
+            print(f"Error writing file {file_name}: {e}")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Error: Missing required command line arguments 'api_key' and 'branch_name'")
+        sys.exit(1)
+
+    api_key = sys.argv[1]
+    branch_name = sys.argv[2]
+
+    main(api_key, branch_name)
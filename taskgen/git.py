@@ -0,0 +1,169 @@
+import os
+import sys
+import threading
+import subprocess
+
+
+def push_env():
+    """Environment that lets git push authenticate with the workflow token."""
+    return dict(os.environ, GIT_ASKPASS='echo', GIT_USERNAME='x-access-token', GIT_PASSWORD=os.getenv('GITHUB_TOKEN'))
+
+
+def configure_identity():
+    subprocess.run(["git", "config", "--global", "user.email", "actions@github.com"], check=True)
+    subprocess.run(["git", "config", "--global", "user.name", "github-actions"], check=True)
+
+
+def create_branch(branch_name):
+    try:
+        subprocess.run(["git", "checkout", "-b", branch_name], check=True)
+        subprocess.run(["git", "push", "-u", "origin", branch_name], check=True, env=push_env())
+    except subprocess.CalledProcessError as e:
+        print(f"Error creating branch: {e}")
+        sys.exit(1)
+
+
+def commit_and_push_changes(branch_name, path, message, checkout=False, recreate=False):
+    """
+    Commit path on branch_name and push it, exiting on failure. With checkout
+    the branch is checked out first; with recreate it is fetched and reset
+    onto the current commit (git checkout -B) instead. When the artifact
+    store is enabled, path goes into the store and only the manifest is
+    committed.
+    """
+    from . import artifact_store
+
+    if not branch_name:
+        print("Error: Branch name is empty.")
+        sys.exit(1)
+
+    try:
+        configure_identity()
+        if recreate:
+            subprocess.run(["git", "fetch", "origin"], check=True)
+            subprocess.run(["git", "checkout", "-B", branch_name], check=True)
+        elif checkout:
+            subprocess.run(["git", "checkout", branch_name], check=True)
+
+        if artifact_store.enabled():
+            artifact_store.stage_manifest(path, env=push_env())
+        else:
+            subprocess.run(["git", "add", path], check=True)
+        subprocess.run(["git", "commit", "-m", message], check=True)
+        subprocess.run(["git", "push", "--set-upstream", "origin", branch_name], check=True, env=push_env())
+    except subprocess.CalledProcessError as e:
+        print(f"Error committing and pushing changes: {e}")
+        sys.exit(1)
+
+
+class GitObjectReader:
+    """
+    Reads files at any ref through one long-running `git cat-file --batch`
+    process, without checking anything out. Safe to share between threads;
+    requests are answered one at a time in the order they arrive.
+    """
+
+    def __init__(self, repo="."):
+        self.repo = repo
+        self.lock = threading.Lock()
+        self.process = subprocess.Popen(
+            ["git", "-C", repo, "cat-file", "--batch"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.process.poll() is None:
+            self.process.stdin.close()
+            self.process.wait()
+
+    def object(self, spec):
+        """Return (type, content) of an object name such as 'main:src/A.java', or None if it does not exist."""
+        with self.lock:
+            self.process.stdin.write(spec.encode("utf-8") + b"\n")
+            self.process.stdin.flush()
+            header = self.process.stdout.readline().split()
+            if len(header) != 3:
+                return None  # "<spec> missing" or "ambiguous"
+            _, object_type, size = header
+            content = self.process.stdout.read(int(size))
+            self.process.stdout.read(1)  # newline after the content
+        return object_type.decode("ascii"), content
+
+    def read(self, ref, path):
+        """Content of path at ref as bytes, or None when there is no such file."""
+        found = self.object(f"{ref}:{path}")
+        return found[1] if found and found[0] == "blob" else None
+
+    def list(self, ref, directory):
+        """Return {name: type} of the entries of directory at ref, or None when it does not exist."""
+        directory = tree_path(directory)
+        found = self.object(f"{ref}:{directory}")
+        if not found or found[0] != "tree":
+            return None
+        # Tree entries are "<mode> <name>\\0<binary object id>"; the id length
+        # depends on the repository's hash function
+        entries = {}
+        content = found[1]
+        oid_length = len(self.resolve(ref)) // 2
+        position = 0
+        while position < len(content):
+            separator = content.index(b"\0", position)
+            mode, name = content[position:separator].split(b" ", 1)
+            entries[name.decode("utf-8")] = "tree" if mode == b"40000" else "blob"
+            position = separator + 1 + oid_length
+        return entries
+
+    def resolve(self, ref):
+        """Object id ref points to; raises ValueError when it does not exist."""
+        with self.lock:
+            self.process.stdin.write(ref.encode("utf-8") + b"\n")
+            self.process.stdin.flush()
+            header = self.process.stdout.readline().split()
+            if len(header) != 3:
+                raise ValueError(f"Unknown ref {ref}")
+            self.process.stdout.read(int(header[2]) + 1)
+        return header[0].decode("ascii")
+
+    def read_directory(self, ref, directory, suffix=""):
+        """Return {file name: text} of the files directly in directory at ref, or None when it does not exist."""
+        entries = self.list(ref, directory)
+        if entries is None:
+            return None
+        prefix = tree_path(directory) + "/" if tree_path(directory) else ""
+        return {
+            name: self.read(ref, f"{prefix}{name}").decode("utf-8")
+            for name, kind in sorted(entries.items())
+            if kind == "blob" and name.endswith(suffix)
+        }
+
+
+def tree_path(directory):
+    """directory as cat-file expects it after 'ref:', with '' for the root."""
+    directory = directory.strip("/")
+    if directory.startswith("./"):
+        directory = directory[2:]
+    return "" if directory == "." else directory
+
+
+def resolve_branch(branch_name):
+    """
+    A ref for branch_name that exists locally: the branch itself, its
+    remote-tracking branch, or FETCH_HEAD after fetching it from origin.
+    """
+    for ref in (f"refs/heads/{branch_name}", f"refs/remotes/origin/{branch_name}"):
+        if subprocess.run(["git", "rev-parse", "--verify", "--quiet", ref], stdout=subprocess.DEVNULL).returncode == 0:
+            return ref
+    subprocess.run(["git", "fetch", "--quiet", "origin", branch_name], check=True)
+    return subprocess.run(["git", "rev-parse", "FETCH_HEAD"], check=True, stdout=subprocess.PIPE, text=True).stdout.strip()
+
+
+def current_branch():
+    result = subprocess.run(["git", "rev-parse", "--abbrev-ref", "HEAD"], stdout=subprocess.PIPE, text=True)
+    return result.stdout.strip() if result.returncode == 0 else None
@@ -0,0 +1,108 @@
+import os
+import sys
+
+# Set by GitHub Actions; point it at a stand-in service to run locally
+API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+SERVER_URL = os.getenv("GITHUB_SERVER_URL", "https://github.com").rstrip("/")
+
+
+class GitHubError(RuntimeError):
+    """Raised when the GitHub API rejects a request."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def github_context():
+    """Return (repository, token) from the workflow environment, exiting if either is missing."""
+    gh_token = os.getenv('GH_TOKEN') or os.getenv('GITHUB_TOKEN')
+    if not gh_token:
+        print("Error: GH_TOKEN or GITHUB_TOKEN is not set.")
+        sys.exit(1)
+
+    repo = os.getenv('GITHUB_REPOSITORY')
+    if not repo:
+        print("Error: GITHUB_REPOSITORY is not set.")
+        sys.exit(1)
+    return repo, gh_token
+
+
+def api_headers(gh_token):
+    return {
+        'Authorization': f'token {gh_token}',
+        'Accept': 'application/vnd.github.v3+json'
+    }
+
+
+def create_comment(repo, pr_number, gh_token, body, session=None):
+    """Comment body on the pull request, raising GitHubError on failure."""
+    if session is None:
+        import requests
+        session = requests
+
+    comment_url = f"{API_URL}/repos/{repo}/issues/{pr_number}/comments"
+    r = session.post(comment_url, json={'body': body}, headers=api_headers(gh_token))
+    if r.status_code != 201:
+        raise GitHubError(f"{r.status_code} {r.text}", r.status_code)
+    return r.json()
+
+
+def list_comments(repo, pr_number, gh_token, session=None):
+    """Every comment on the pull request, oldest first, raising GitHubError on failure."""
+    if session is None:
+        import requests
+        session = requests
+
+    comments = []
+    page = 1
+    while True:
+        r = session.get(
+            f"{API_URL}/repos/{repo}/issues/{pr_number}/comments",
+            params={'per_page': 100, 'page': page},
+            headers=api_headers(gh_token)
+        )
+        if r.status_code != 200:
+            raise GitHubError(f"{r.status_code} {r.text}", r.status_code)
+        batch = r.json()
+        comments.extend(batch)
+        if len(batch) < 100:
+            return comments
+        page += 1
+
+
+def update_comment(repo, comment_id, gh_token, body, session=None):
+    """
+    Replace the body of a comment, raising GitHubError on failure; a
+    comment that no longer exists raises with status 404.
+    """
+    if session is None:
+        import requests
+        session = requests
+
+    r = session.patch(f"{API_URL}/repos/{repo}/issues/comments/{comment_id}", json={'body': body}, headers=api_headers(gh_token))
+    if r.status_code != 200:
+        raise GitHubError(f"{r.status_code} {r.text}", r.status_code)
+    return r.json()
+
+
+def get_comment(repo, comment_id, gh_token, session=None, etag=None):
+    """
+    (comment, ETag) of the comment with the given id, raising GitHubError on
+    failure; a comment that no longer exists raises with status 404. With
+    the ETag of an earlier read, an unchanged comment comes back as (None,
+    etag) without counting against the rate limit.
+    """
+    if session is None:
+        import requests
+        session = requests
+
+    headers = api_headers(gh_token)
+    if etag:
+        headers['If-None-Match'] = etag
+    r = session.get(f"{API_URL}/repos/{repo}/issues/comments/{comment_id}", headers=headers)
+    if r.status_code == 304:
+        return None, etag
+    if r.status_code != 200:
+        raise GitHubError(f"{r.status_code} {r.text}", r.status_code)
+    return r.json(), r.headers.get('ETag')
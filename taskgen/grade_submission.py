@@ -1,14 +1,15 @@
 import os
 import sys
-import openai
-import requests
+
+from .completion import chat_messages, complete, create_client
+from .status_comment import update_status
 
 def main(api_key, pull_request_number):
     if not api_key:
         print("Error: OpenAI API key is missing.")
         sys.exit(1)
 
-    openai.api_key = api_key
+    client = create_client(api_key)
 
     # Read the student's code from the task template location
     try:
@@ -33,39 +34,29 @@ def main(api_key, pull_request_number):
               f"### Student's Code\n```java\n{student_code}\n```\n\n"
               f"### Solution Code\n```java\n{solution_code}\n```\n")
 
-    # Call OpenAI API to evaluate the student's code
+    # Ask the model to evaluate the student's code
     try:
-        response = openai.Completion.create(
-            model="gpt-4o-2024-08-06",
-            prompt=prompt,
+        feedback = complete(
+            client,
+            chat_messages(prompt, "You are a Java programming instructor grading a student's code."),
+            stage="grade-submission",
             max_tokens=500
         )
-        feedback = response.choices[0].text.strip()
     except Exception as e:
         print(f"Error generating feedback: {e}")
         sys.exit(1)
 
-    # Post the feedback as a comment on the pull request
+    # Put the feedback in the pull request's status comment
     repo_name = os.getenv('GITHUB_REPOSITORY')
     github_token = os.getenv('GITHUB_TOKEN')
-    headers = {
-        "Authorization": f"token {github_token}",
-        "Accept": "application/vnd.github.v3+json"
-    }
-    comment_url = f"https://api.github.com/repos/{repo_name}/issues/{pull_request_number}/comments"
-    comment_body = {
-        "body": feedback
-    }
-    response = requests.post(comment_url, json=comment_body, headers=headers)
-    if response.status_code != 201:
-        print(f"Error posting comment: {response.status_code} {response.text}")
-        sys.exit(1)
+    update_status(repo_name, pull_request_number, github_token, "grade", feedback)
 
-if len(sys.argv) != 3:
-    print("Error: Missing required command line arguments 'api_key' and 'pull_request_number'")
-    sys.exit(1)
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Error: Missing required command line arguments 'api_key' and 'pull_request_number'")
+        sys.exit(1)
 
-api_key = sys.argv[1]
-pull_request_number = sys.argv[2]
+    api_key = sys.argv[1]
+    pull_request_number = sys.argv[2]
 
-main(api_key, pull_request_number)
+    main(api_key, pull_request_number)
@@ -0,0 +1,636 @@
+import os
+import re
+import sys
+import json
+import base64
+import secrets
+import time
+import queue
+import shutil
+import signal
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+
+ASSESSMENT_SHEET = os.path.join(".github", "assessment_sheet.yaml")
+
+# Long-lived JVM that compiles and tests one submission per stdin line. It is
+# started once per worker against the JUnit classpath and kept warm, so each
+# job pays neither JVM startup nor compiler warm-up. A job line carries the
+# job id, a nonce, the test classes and the base64 sources; the sources are
+# compiled and loaded in memory, so a job never has files another job could
+# read. Results go to a channel of their own (the file named by the first
+# argument, a pipe the harness reads) tagged with the job's nonce. Student
+# code never sees the nonce: it may write to the channel, but it cannot
+# forge a result the harness accepts. Everything it prints is dropped.
+WORKER_SOURCE = r"""
+import java.nio.charset.StandardCharsets;
+
+public class GradingWorker {
+    public static void main(String[] args) throws Exception {
+        java.io.PrintStream channel = new java.io.PrintStream(new java.io.FileOutputStream(args[0]), false, "UTF-8");
+        java.io.BufferedReader in = new java.io.BufferedReader(new java.io.InputStreamReader(System.in, StandardCharsets.UTF_8));
+        System.setIn(new java.io.ByteArrayInputStream(new byte[0]));
+        javax.tools.JavaCompiler compiler = javax.tools.ToolProvider.getSystemJavaCompiler();
+        javax.tools.StandardJavaFileManager files = compiler.getStandardFileManager(null, null, StandardCharsets.UTF_8);
+        String classpath = System.getProperty("java.class.path");
+
+        // Warm up the compiler and JUnit before accepting jobs
+        java.util.Map<String, String> warmup = new java.util.HashMap<String, String>();
+        warmup.put("Warmup", "public class Warmup { int x() { return 1; } }");
+        compile(compiler, files, classpath, warmup, new java.io.StringWriter());
+        new org.junit.runner.JUnitCore().run(new Class<?>[0]);
+        channel.println("READY");
+        channel.flush();
+
+        String line;
+        while ((line = in.readLine()) != null) {
+            String[] fields = line.split("\t", -1);
+            if (fields.length < 3) {
+                continue;
+            }
+            java.util.Map<String, String> sources = new java.util.LinkedHashMap<String, String>();
+            for (int i = 3; i < fields.length; i++) {
+                int separator = fields[i].indexOf('=');
+                sources.put(fields[i].substring(0, separator),
+                    new String(java.util.Base64.getDecoder().decode(fields[i].substring(separator + 1)), StandardCharsets.UTF_8));
+            }
+            String result = runJob(compiler, files, classpath, fields[0], sources, fields[2]);
+            channel.println("RESULT " + fields[1] + " " + result);
+            channel.flush();
+        }
+    }
+
+    static String runJob(javax.tools.JavaCompiler compiler, javax.tools.StandardJavaFileManager files, String classpath,
+                         String id, java.util.Map<String, String> sources, String testNames) {
+        StringBuilder json = new StringBuilder("{\"job\": ").append(quote(id));
+        java.util.Set<Thread> threadsBefore = Thread.getAllStackTraces().keySet();
+        try {
+            java.io.StringWriter diagnostics = new java.io.StringWriter();
+            java.util.Map<String, ClassOutput> classes = compile(compiler, files, classpath, sources, diagnostics);
+            if (classes == null) {
+                return json.append(", \"compiled\": false, \"error\": ")
+                    .append(quote(truncate(diagnostics.toString(), 2000))).append("}").toString();
+            }
+
+            MemoryLoader loader = new MemoryLoader(classes, GradingWorker.class.getClassLoader());
+            java.util.List<Class<?>> testClasses = new java.util.ArrayList<Class<?>>();
+            for (String name : testNames.split(",")) {
+                if (!name.isEmpty()) {
+                    testClasses.add(loader.loadClass(name));
+                }
+            }
+            org.junit.runner.Result result = new org.junit.runner.JUnitCore().run(testClasses.toArray(new Class<?>[0]));
+            json.append(", \"compiled\": true, \"tests\": ").append(result.getRunCount())
+                .append(", \"failures\": ").append(result.getFailureCount())
+                .append(", \"failed\": [");
+            boolean first = true;
+            for (org.junit.runner.notification.Failure failure : result.getFailures()) {
+                json.append(first ? "" : ", ").append("{\"test\": ").append(quote(failure.getDescription().getDisplayName()))
+                    .append(", \"message\": ").append(quote(truncate(String.valueOf(failure.getMessage()), 500))).append("}");
+                first = false;
+            }
+            json.append("]");
+        } catch (Throwable e) {
+            json.append(", \"compiled\": true, \"error\": ").append(quote(truncate(e.toString(), 2000)));
+        }
+        // Threads the submission left running could tamper with later jobs,
+        // so the harness replaces a worker that has any
+        int leaked = 0;
+        for (Thread thread : Thread.getAllStackTraces().keySet()) {
+            if (!threadsBefore.contains(thread) && thread.isAlive()) {
+                leaked++;
+            }
+        }
+        return json.append(", \"leaked_threads\": ").append(leaked).append("}").toString();
+    }
+
+    static java.util.Map<String, ClassOutput> compile(javax.tools.JavaCompiler compiler, javax.tools.StandardJavaFileManager files,
+                                                       String classpath, java.util.Map<String, String> sources, java.io.Writer diagnostics) {
+        final java.util.Map<String, ClassOutput> classes = new java.util.HashMap<String, ClassOutput>();
+        javax.tools.JavaFileManager memory = new javax.tools.ForwardingJavaFileManager<javax.tools.StandardJavaFileManager>(files) {
+            @Override
+            public javax.tools.JavaFileObject getJavaFileForOutput(javax.tools.JavaFileManager.Location location, String className,
+                                                                   javax.tools.JavaFileObject.Kind kind, javax.tools.FileObject sibling) {
+                ClassOutput output = new ClassOutput(className);
+                classes.put(className, output);
+                return output;
+            }
+        };
+        java.util.List<javax.tools.JavaFileObject> units = new java.util.ArrayList<javax.tools.JavaFileObject>();
+        for (java.util.Map.Entry<String, String> source : sources.entrySet()) {
+            units.add(new Source(source.getKey(), source.getValue()));
+        }
+        Boolean compiled = compiler.getTask(diagnostics, memory, null,
+            java.util.Arrays.asList("-nowarn", "-encoding", "UTF-8", "-cp", classpath), null, units).call();
+        return Boolean.TRUE.equals(compiled) ? classes : null;
+    }
+
+    static class Source extends javax.tools.SimpleJavaFileObject {
+        final String code;
+
+        Source(String name, String code) {
+            super(java.net.URI.create("string:///" + name + ".java"), javax.tools.JavaFileObject.Kind.SOURCE);
+            this.code = code;
+        }
+
+        @Override
+        public CharSequence getCharContent(boolean ignoreEncodingErrors) {
+            return code;
+        }
+    }
+
+    static class ClassOutput extends javax.tools.SimpleJavaFileObject {
+        final java.io.ByteArrayOutputStream bytes = new java.io.ByteArrayOutputStream();
+
+        ClassOutput(String className) {
+            super(java.net.URI.create("bytes:///" + className.replace('.', '/') + ".class"), javax.tools.JavaFileObject.Kind.CLASS);
+        }
+
+        @Override
+        public java.io.OutputStream openOutputStream() {
+            return bytes;
+        }
+    }
+
+    static class MemoryLoader extends ClassLoader {
+        final java.util.Map<String, ClassOutput> classes;
+
+        MemoryLoader(java.util.Map<String, ClassOutput> classes, ClassLoader parent) {
+            super(parent);
+            this.classes = classes;
+        }
+
+        @Override
+        protected Class<?> findClass(String name) throws ClassNotFoundException {
+            ClassOutput output = classes.get(name);
+            if (output == null) {
+                throw new ClassNotFoundException(name);
+            }
+            byte[] bytes = output.bytes.toByteArray();
+            return defineClass(name, bytes, 0, bytes.length);
+        }
+    }
+
+    static String truncate(String text, int length) {
+        return text.length() > length ? text.substring(0, length) : text;
+    }
+
+    static String quote(String text) {
+        StringBuilder builder = new StringBuilder("\"");
+        for (char c : text.toCharArray()) {
+            if (c == '"' || c == '\\') {
+                builder.append('\\').append(c);
+            } else if (c < 0x20) {
+                builder.append(String.format("\\u%04x", (int) c));
+            } else {
+                builder.append(c);
+            }
+        }
+        return builder.append("\"").toString();
+    }
+}
+"""
+
+# "auto" runs the workers in their own user, mount and network namespaces
+# when the system allows it, "required" refuses to grade without them and
+# "off" never uses them
+GRADING_SANDBOX = os.getenv("GRADING_SANDBOX", "auto")
+
+# Covers the directories given before "--" with empty file systems, then
+# starts the worker; run inside the new namespaces
+SANDBOX_SCRIPT = 'while [ "$1" != -- ]; do mount -t tmpfs -o size=64k none "$1" || exit 1; shift; done; shift; exec "$@"'
+
+
+def compile_worker(classpath, directory):
+    source_path = os.path.join(directory, "GradingWorker.java")
+    with open(source_path, "w") as f:
+        f.write(WORKER_SOURCE)
+    subprocess.run(
+        ["javac", "-nowarn", "-d", directory, "-cp", classpath, source_path],
+        check=True
+    )
+
+
+_namespaces_available = None
+
+
+def namespaces_available():
+    """Whether this user may create user, mount and network namespaces."""
+    global _namespaces_available
+    if _namespaces_available is None:
+        _namespaces_available = bool(shutil.which("unshare")) and subprocess.run(
+            ["unshare", "--user", "--map-root-user", "--mount", "--net", "true"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        ).returncode == 0
+        if not _namespaces_available and GRADING_SANDBOX == "auto":
+            print("Warning: user namespaces are not available, submissions are graded without a sandbox.")
+    return _namespaces_available
+
+
+def sandboxed(command, hidden):
+    """
+    Wrap command so it runs without network and with the hidden directories
+    covered up, so a submission can read neither the others nor the
+    solution. Returns command unchanged when namespaces are unavailable and
+    GRADING_SANDBOX allows that.
+    """
+    if GRADING_SANDBOX == "off":
+        return command
+    if not namespaces_available():
+        if GRADING_SANDBOX == "required":
+            raise RuntimeError("GRADING_SANDBOX=required, but user namespaces are not available.")
+        return command
+    return ["unshare", "--user", "--map-root-user", "--mount", "--net", "sh", "-c", SANDBOX_SCRIPT, "sandbox", *hidden, "--", *command]
+
+
+# The only variables a JVM running student code gets; anything else, such as
+# API keys and tokens, could be read with System.getenv and reported back
+# in a failure message
+JVM_ENVIRONMENT = ("PATH", "JAVA_HOME", "LANG")
+
+
+def jvm_environment():
+    return {name: os.environ[name] for name in JVM_ENVIRONMENT if name in os.environ}
+
+
+def is_within(path, directory):
+    path, directory = os.path.abspath(path), os.path.abspath(directory)
+    return os.path.commonpath([path, directory]) == directory
+
+
+def process_cpu_seconds(pid):
+    """User plus system CPU time of a process from /proc, or None if unavailable."""
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class Worker:
+    """One warm JVM process that runs grading jobs sequentially."""
+
+    def __init__(self, classpath, memory_mb, cpu_seconds_total, directory, hidden=()):
+        def apply_limits():
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds_total, cpu_seconds_total + 5))
+            resource.setrlimit(resource.RLIMIT_FSIZE, (64 * 1024 * 1024, 64 * 1024 * 1024))
+
+        # Results come back on a pipe of their own; stdout only carries what
+        # the student code prints and is discarded
+        read_fd, write_fd = os.pipe()
+        try:
+            self.process = subprocess.Popen(
+                sandboxed(worker_command(classpath, memory_mb, f"/proc/self/fd/{write_fd}"), hidden),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                cwd=directory,
+                env=jvm_environment(),
+                pass_fds=(write_fd,),
+                preexec_fn=apply_limits,
+                start_new_session=True
+            )
+        except BaseException:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+        self.jobs_run = 0
+        self.lines = queue.Queue()
+        threading.Thread(target=self._read_lines, args=(read_fd,), daemon=True).start()
+        if self._next_line(timeout=60) != "READY":
+            self.kill()
+            raise RuntimeError("Grading worker did not start.")
+
+    def _read_lines(self, read_fd):
+        with open(read_fd, "r", encoding="utf-8", errors="replace") as channel:
+            for line in channel:
+                self.lines.put(line.rstrip("\n"))
+        self.lines.put(None)
+
+    def _next_line(self, timeout):
+        try:
+            return self.lines.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def run(self, job_id, sources, test_classes, timeout, cpu_limit):
+        """
+        Run one job on {file name: source} and return its result dict. Kills
+        the worker when the job exceeds its wall-clock or CPU limit, or leaves
+        threads running; the caller must then replace it.
+        """
+        self.jobs_run += 1
+        job_id = re.sub(r'\s', ' ', job_id)
+        nonce = secrets.token_hex(16)
+        files = [
+            f"{name[:-len('.java')]}={base64.b64encode(content.encode('utf-8')).decode('ascii')}"
+            for name, content in sources.items()
+        ]
+        cpu_start = process_cpu_seconds(self.process.pid)
+        try:
+            self.process.stdin.write("\t".join([job_id, nonce, ",".join(test_classes)] + files) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            return {"job": job_id, "compiled": True, "error": "worker exited before the job"}
+
+        prefix = f"RESULT {nonce} "
+        deadline = time.monotonic() + timeout
+        while True:
+            line = self._next_line(timeout=0.5)
+            # Anything without this job's nonce was not written by the worker
+            # for this job: a submission writing to the channel, or a leftover
+            if line is not None and line.startswith(prefix):
+                return self._result(job_id, line[len(prefix):])
+            if self.process.poll() is not None:
+                return {"job": job_id, "compiled": True, "error": "worker exited during the job"}
+            cpu_now = process_cpu_seconds(self.process.pid)
+            if cpu_start is not None and cpu_now is not None and cpu_now - cpu_start > cpu_limit:
+                self.kill()
+                return {"job": job_id, "compiled": True, "error": f"exceeded the {cpu_limit}s CPU limit"}
+            if time.monotonic() > deadline:
+                self.kill()
+                return {"job": job_id, "compiled": True, "error": f"exceeded the {timeout}s time limit"}
+
+    def _result(self, job_id, payload):
+        try:
+            result = json.loads(payload)
+        except json.JSONDecodeError:
+            # Output of the submission interleaved with the result
+            self.kill()
+            return {"job": job_id, "compiled": True, "error": "the worker sent a garbled result"}
+        if not isinstance(result, dict) or result.get("job") != job_id:
+            self.kill()
+            return {"job": job_id, "compiled": True, "error": "the worker sent a result for another job"}
+        if result.pop("leaked_threads", 0):
+            self.kill()
+        return result
+
+    @property
+    def alive(self):
+        return self.process.poll() is None
+
+    def close(self):
+        if self.alive:
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.kill()
+
+    def kill(self):
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self.process.wait()
+
+
+def worker_command(classpath, memory_mb, channel):
+    return ["java", f"-Xmx{memory_mb}m", "-XX:+UseSerialGC", "-cp", classpath, "GradingWorker", channel]
+
+
+class GradingPool:
+    """
+    A fixed number of warm JVM workers. Workers are replaced when a job kills
+    them and recycled after recycle_after jobs to shed leaked state.
+    """
+
+    def __init__(self, junit_classpath, workers=4, recycle_after=20, job_timeout=60,
+                 cpu_limit=60, memory_mb=512):
+        self.scratch_dir = tempfile.mkdtemp(prefix="grading-")
+        self.worker_dir = os.path.join(self.scratch_dir, "worker")
+        os.makedirs(self.worker_dir)
+        compile_worker(junit_classpath, self.worker_dir)
+        # The JUnit jars are copied next to the worker, so the sandbox can
+        # hide the directories they came from
+        lib_dir = os.path.join(self.scratch_dir, "lib")
+        os.makedirs(lib_dir)
+        entries = [self.worker_dir]
+        for index, entry in enumerate(filter(None, junit_classpath.split(os.pathsep))):
+            copy = os.path.join(lib_dir, f"{index}-{os.path.basename(entry.rstrip(os.sep))}")
+            if os.path.isdir(entry):
+                shutil.copytree(entry, copy)
+            elif os.path.isfile(entry):
+                shutil.copy2(entry, copy)
+            else:
+                continue
+            entries.append(copy)
+        self.classpath = os.pathsep.join(entries)
+        self.hidden = []
+        self.workers = workers
+        self.recycle_after = recycle_after
+        self.job_timeout = job_timeout
+        self.cpu_limit = cpu_limit
+        self.memory_mb = memory_mb
+        self.recycled = 0
+
+    def _new_worker(self):
+        return Worker(self.classpath, self.memory_mb, self.cpu_limit * self.recycle_after + 60, self.worker_dir, self.hidden)
+
+    def hide(self, paths):
+        """
+        Directories the workers must not see: the working directory with the
+        solution, and wherever the submissions and tests are read from.
+        """
+        hidden = []
+        for path in sorted({os.path.abspath(path) for path in paths}, key=len):
+            if os.path.isdir(path) and not is_within(self.scratch_dir, path) and not any(is_within(path, h) for h in hidden):
+                hidden.append(path)
+        self.hidden = hidden
+
+    def grade_all(self, submissions, test_dir, on_result=None):
+        """Grade {name: source_dir} against the tests in test_dir; returns {name: result}."""
+        test_files = prepare_tests(test_dir)
+        self.hide([os.getcwd(), test_dir] + [os.path.dirname(os.path.abspath(d)) for d in submissions.values()])
+        jobs = queue.Queue()
+        for name, source_dir in submissions.items():
+            jobs.put((name, source_dir))
+
+        results = {}
+        lock = threading.Lock()
+
+        def work():
+            worker = None
+            try:
+                while True:
+                    try:
+                        name, source_dir = jobs.get_nowait()
+                    except queue.Empty:
+                        return
+                    if worker is None or not worker.alive or worker.jobs_run >= self.recycle_after:
+                        if worker is not None:
+                            worker.close()
+                            with lock:
+                                self.recycled += 1
+                        worker = self._new_worker()
+
+                    sources = job_sources(source_dir, test_files)
+                    result = worker.run(name, sources, sorted(test_files), self.job_timeout, self.cpu_limit)
+                    result["documentation"] = documentation_coverage(source_dir)
+                    with lock:
+                        results[name] = result
+                        if on_result:
+                            on_result(name, result)
+            finally:
+                if worker is not None:
+                    worker.close()
+
+        threads = [threading.Thread(target=work) for _ in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def close(self):
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+def prepare_tests(test_dir):
+    """
+    Return {test class name: source} for the JUnit classes in test_dir. The
+    generated tests declare 'package test;' while the solutions live in the
+    default package, so the declaration is dropped to let them compile together.
+    """
+    tests = {}
+    for file in sorted(os.listdir(test_dir)):
+        if file.endswith(".java"):
+            with open(os.path.join(test_dir, file), "r") as f:
+                content = f.read()
+            if "@Test" in content:
+                tests[file[:-len(".java")]] = re.sub(r'^\s*package\s+[\w.]+\s*;', '', content, count=1, flags=re.MULTILINE)
+    return tests
+
+
+def job_sources(source_dir, test_files):
+    """{file name: source} of one job: the submission's Java files and the tests, which win on a name clash."""
+    sources = {}
+    for root, _, files in os.walk(source_dir):
+        for file in files:
+            if file.endswith(".java") and file[:-len(".java")] not in test_files:
+                with open(os.path.join(root, file), "r", errors="replace") as f:
+                    sources[file] = f.read()
+    for name, content in test_files.items():
+        sources[f"{name}.java"] = content
+    return sources
+
+
+def documentation_coverage(source_dir):
+    """Fraction of public methods and classes preceded by a Javadoc comment."""
+    documented = total = 0
+    declaration = re.compile(r'(/\*\*(?:(?!\*/).)*\*/\s*)?(?:@\w+\s*)*public\s[^;=]*?[({]', re.DOTALL)
+    for root, _, files in os.walk(source_dir):
+        for file in files:
+            if file.endswith(".java"):
+                with open(os.path.join(root, file), "r") as f:
+                    for match in declaration.finditer(f.read()):
+                        total += 1
+                        documented += 1 if match.group(1) else 0
+    return documented / total if total else 0.0
+
+
+def load_criteria(path=ASSESSMENT_SHEET):
+    import yaml
+    with open(path, "r") as f:
+        return yaml.safe_load(f)["criteria"]
+
+
+def weighted_score(result, criteria, efficiency=None):
+    """
+    Combine the measured criteria with the assessment sheet weights. Criteria
+    that cannot be measured locally are left out and the remaining weights
+    renormalised; they are listed under 'unscored'.
+    """
+    measured = {"Documentation": result.get("documentation")}
+    if result.get("tests"):
+        measured["Correctness"] = 0.0 if result.get("error") else (result["tests"] - result["failures"]) / result["tests"]
+    elif not result.get("compiled", True) or result.get("error"):
+        measured["Correctness"] = 0.0
+    if efficiency is not None:
+        measured["Efficiency"] = efficiency
+
+    total_weight = score = 0.0
+    breakdown = {}
+    unscored = []
+    for criterion in criteria:
+        value = measured.get(criterion["name"])
+        if value is None:
+            unscored.append(criterion["name"])
+            continue
+        breakdown[criterion["name"]] = round(value, 3)
+        total_weight += criterion["weight"]
+        score += criterion["weight"] * value
+    return {
+        "score": round(score / total_weight, 3) if total_weight else None,
+        "criteria": breakdown,
+        "unscored": unscored,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the generated tests against many submissions on warm JVM workers.")
+    parser.add_argument("submissions", help="Directory with one subdirectory of Java sources per student")
+    parser.add_argument("--tests", default="gen_test", help="Directory with the JUnit test classes")
+    parser.add_argument("--junit", required=True, help="Classpath with JUnit 4 and Hamcrest jars")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--recycle-after", type=int, default=20, help="Replace a worker after this many jobs")
+    parser.add_argument("--job-timeout", type=int, default=60, help="Wall-clock seconds per submission")
+    parser.add_argument("--cpu-limit", type=int, default=60, help="CPU seconds per submission")
+    parser.add_argument("--memory-mb", type=int, default=512, help="Heap size of each worker JVM")
+    parser.add_argument("--efficiency-dir", help="Directory with <student>.json reports from python -m taskgen benchmark")
+    parser.add_argument("--output", default="grades.json")
+    args = parser.parse_args()
+
+    if not shutil.which("javac") or not shutil.which("java"):
+        print("Error: javac and java must be on the PATH.")
+        sys.exit(1)
+
+    submissions = {
+        name: os.path.join(args.submissions, name)
+        for name in sorted(os.listdir(args.submissions))
+        if os.path.isdir(os.path.join(args.submissions, name))
+    }
+    if not submissions:
+        print(f"Error: No submissions found in {args.submissions}.")
+        sys.exit(1)
+
+    criteria = load_criteria()
+    started = time.monotonic()
+
+    def report(name, result):
+        outcome = result.get("error") or f"{result.get('tests', 0) - result.get('failures', 0)}/{result.get('tests', 0)} tests passed"
+        print(f"{name}: {outcome.splitlines()[0] if outcome else ''}")
+
+    pool = GradingPool(args.junit, args.workers, args.recycle_after, args.job_timeout, args.cpu_limit, args.memory_mb)
+    try:
+        results = pool.grade_all(submissions, args.tests, on_result=report)
+    finally:
+        pool.close()
+
+    for name, result in results.items():
+        efficiency = None
+        if args.efficiency_dir:
+            try:
+                with open(os.path.join(args.efficiency_dir, f"{name}.json"), "r") as f:
+                    efficiency = json.load(f).get("efficiency_score")
+            except FileNotFoundError:
+                pass
+        result["assessment"] = weighted_score(result, criteria, efficiency)
+
+    elapsed = time.monotonic() - started
+    print(f"\nGraded {len(results)} submissions in {elapsed:.1f}s "
+          f"({len(results) / elapsed * 60:.1f}/min, {pool.recycled} worker recycles).")
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import re
+
+# Classes the generated code tends to use without importing them
+REQUIRED_IMPORTS = {
+    "List": "import java.util.List;",
+    "ArrayList": "import java.util.ArrayList;",
+    "Map": "import java.util.Map;",
+    "HashMap": "import java.util.HashMap;",
+    "Scanner": "import java.util.Scanner;",
+    "Set": "import java.util.Set;",
+    "HashSet": "import java.util.HashSet;",
+    "Collections": "import java.util.Collections;",
+    "Random": "import java.util.Random;"
+}
+
+
+def check_and_add_missing_imports(code):
+    """
+    Check the code for missing imports based on the usage of common Java classes
+    and add necessary imports if missing.
+    """
+    existing_imports = re.findall(r'^\s*import .*;', code, re.MULTILINE)
+
+    imports_to_add = []
+    for class_name, import_statement in REQUIRED_IMPORTS.items():
+        if class_name in code and import_statement not in existing_imports:
+            imports_to_add.append(import_statement)
+
+    if imports_to_add:
+        code = "\n".join(imports_to_add) + "\n\n" + code
+    return code
+
+
+def clean_up_imports(code):
+    """Remove duplicate imports, keeping one copy of each at the top."""
+    imports = re.findall(r'^\s*import .*;$', code, re.MULTILINE)
+    unique_imports = list(dict.fromkeys(imports))
+    for imp in imports:
+        code = code.replace(imp, '', 1)
+    return '\n'.join(unique_imports) + '\n' + code
+
+
+def clean_class_block(block, strip_preamble=False):
+    """
+    Ensure the block only contains content until the last closing brace and,
+    with strip_preamble, nothing before the first class declaration.
+    """
+    last_closing_brace = block.rfind("}")
+    if last_closing_brace != -1:
+        block = block[:last_closing_brace + 1]
+    if strip_preamble:
+        block = re.sub(r'.*?(class\s)', r'class ', block, count=1, flags=re.DOTALL)
+    return block
+
+
+COMMENTS_AND_LITERALS = re.compile(r'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'', re.DOTALL)
+
+# Identifier followed by a parameter list and a body: a method or constructor
+METHOD_HEADER = re.compile(r'\b([A-Za-z_]\w*)\s*\(([^()]*)\)\s*(?:throws\s+[\w.,\s]+)?\{')
+NOT_METHODS = {"if", "for", "while", "switch", "catch", "synchronized", "return", "new", "else", "do", "try"}
+
+
+def mask_comments_and_literals(code):
+    """
+    Blank out comments, string and char literals, keeping every other
+    character at its position, so offsets found in the mask apply to code.
+    """
+    return COMMENTS_AND_LITERALS.sub(lambda m: re.sub(r'[^\n]', ' ', m.group(0)), code)
+
+
+def matching_brace(masked, open_index):
+    """Index of the brace closing the one at open_index, or -1 if unbalanced."""
+    depth = 0
+    for index in range(open_index, len(masked)):
+        if masked[index] == "{":
+            depth += 1
+        elif masked[index] == "}":
+            depth -= 1
+            if depth == 0:
+                return index
+    return -1
+
+
+def method_spans(code):
+    """
+    Return (name, parameters, start, end) for each method and constructor in
+    code, where start..end covers the header through the closing brace.
+    """
+    masked = mask_comments_and_literals(code)
+    spans = []
+    for match in METHOD_HEADER.finditer(masked):
+        if match.group(1) in NOT_METHODS:
+            continue
+        end = matching_brace(masked, match.end() - 1)
+        if end != -1:
+            spans.append((match.group(1), " ".join(match.group(2).split()), match.start(), end + 1))
+    return spans
+
+
+PRIVATE_FIELD = re.compile(r'^[ \t]*private\s[^(){};=]*(?:=[^;]*)?;[ \t]*\n?', re.MULTILINE)
+
+
+def api_surface(code):
+    """
+    Reduce a class to what its callers see: declarations, Javadoc and the
+    signatures of non-private methods and constructors. Method bodies,
+    private members and the package line are removed.
+    """
+    masked = mask_comments_and_literals(code)
+    cuts = []
+    for name, parameters, start, end in method_spans(code):
+        if cuts and start < cuts[-1][1]:
+            continue  # inside a method that is already cut
+        boundary = max(masked.rfind(char, 0, start) for char in ";{}")
+        if re.search(r'\bprivate\b', masked[boundary + 1:start]):
+            cuts.append((boundary + 1, end, ""))
+        else:
+            cuts.append((masked.index("{", start), end, ";"))
+
+    surface = []
+    position = 0
+    for start, end, replacement in cuts:
+        surface.append(code[position:start].rstrip() + replacement)
+        position = end
+    surface.append(code[position:])
+    surface = PRIVATE_FIELD.sub("", "".join(surface))
+    surface = re.sub(r'^\s*package\s+[\w.]+\s*;\s*\n', '', surface, flags=re.MULTILINE)
+    return re.sub(r'\n\s*\n(\s*\n)+', '\n\n', surface).strip() + "\n"
@@ -0,0 +1,243 @@
+import io
+import os
+import sys
+import json
+import time
+import random
+import timeit
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+
+from .adversarial_solution import clean_up_non_code_content
+from .adversarial_tests import clean_up_test_code
+from .generate_solution import write_generated_code_to_files
+from .generate_template_code import generate_template_fallback
+from .java import clean_class_block, clean_up_imports
+from .task import split_task_into_exercises
+
+BASELINE_FILE = os.getenv("MICROBENCH_BASELINE", os.path.join(os.path.dirname(__file__), "microbench_baseline.json"))
+
+# Input sizes in bytes, from a short answer up to a runaway model output
+DEFAULT_SIZES = [1_000, 64_000, 1_000_000, 4_000_000]
+
+# A case regresses when it is this much slower, or uses this much more
+# memory at its peak, than the baseline
+TIME_TOLERANCE = 1.5
+MEMORY_TOLERANCE = 1.25
+
+# Each timing is the best of up to REPEATS measurements, each long enough to
+# rise above timer noise; slow cases stop repeating after REPEAT_SECONDS
+REPEATS = 3
+REPEAT_SECONDS = 2.0
+
+SEED = 42
+
+IMPORTS = [
+    "import java.util.List;", "import java.util.ArrayList;", "import java.util.Map;",
+    "import java.util.HashMap;", "import java.util.Set;", "import java.util.HashSet;",
+    "import org.junit.Test;", "import org.junit.Before;", "import static org.junit.Assert.*;",
+]
+
+
+def java_class(rng, name, methods):
+    """A plausible generated class: imports, Javadoc, fields and small methods."""
+    lines = rng.sample(IMPORTS[:6], 3) + ["", "/**", f" * {name} keeps track of its items.", " */", f"public class {name} {{"]
+    lines.append("    private final List<Integer> items = new ArrayList<>();")
+    for index in range(methods):
+        lines += [
+            "",
+            f"    /** Returns the {index}th derived value. */",
+            f"    public int value{index}(int factor) {{",
+            f"        int total = {rng.randint(0, 99)};",
+            "        for (int item : items) {",
+            f"            total += item * factor + {index};",
+            "        }",
+            f'        String label = "value {index} of {name}";',
+            "        return total;",
+            "    }",
+        ]
+    lines.append("}")
+    return "\n".join(lines)
+
+
+def solution_output(rng, size):
+    """A model answer with several classes, chatter between them and code fences."""
+    parts = []
+    while sum(len(part) for part in parts) < size:
+        name = f"Item{len(parts)}"
+        parts.append(f"Here's the {name} class:\n```java\n{java_class(rng, name, rng.randint(4, 12))}\n```\nSave this as {name}.java.\n")
+    return "\n".join(parts)
+
+
+def test_output(rng, size):
+    """A generated test file with the repeated imports models tend to emit per class."""
+    parts = []
+    while sum(len(part) for part in parts) < size:
+        name = f"Item{len(parts)}Test"
+        tests = "\n".join(
+            f"    @Test\n    public void testValue{index}() {{\n        assertEquals({index}, item.value{index}(1));\n    }}\n"
+            for index in range(rng.randint(4, 12))
+        )
+        parts.append("\n".join(rng.sample(IMPORTS, 6)) + f"\n\n{name}.java:\n```java\npublic class {name} {{\n{tests}}}\n```\n")
+    return "\n".join(parts)
+
+
+def task_description(rng, size):
+    parts = ["# Task\n\nIntroduction to the task.\n"]
+    while sum(len(part) for part in parts) < size:
+        sentences = " ".join(f"Sentence {index} explains a requirement." for index in range(rng.randint(5, 30)))
+        parts.append(f"#### Exercise {len(parts)}: Part\n\n{sentences}\n\n- Point one\n- Point two\n")
+    return "\n".join(parts)
+
+
+def class_block(rng, size):
+    """One class followed by trailing text, as a block split out of a model answer."""
+    code = solution_output(rng, size)
+    return "Preamble text.\n" + code[:size] + "\nTrailing explanation that is not code."
+
+
+def write_files(code):
+    with tempfile.TemporaryDirectory() as directory, redirect_stdout(io.StringIO()):
+        write_generated_code_to_files(directory, code)
+
+
+# name: (function, input generator)
+CASES = {
+    "split_task_into_exercises": (split_task_into_exercises, task_description),
+    "write_generated_code_to_files": (write_files, solution_output),
+    "clean_class_block": (lambda block: clean_class_block(block, strip_preamble=True), class_block),
+    "clean_up_non_code_content": (clean_up_non_code_content, solution_output),
+    "clean_up_test_code": (clean_up_test_code, test_output),
+    "clean_up_imports": (clean_up_imports, test_output),
+    "generate_template_fallback": (generate_template_fallback, solution_output),
+}
+
+
+def calibrate():
+    """
+    Seconds a fixed pure-Python workload takes on this machine, so a baseline
+    recorded elsewhere can be scaled to it.
+    """
+    best = None
+    for _ in range(5):
+        started = time.perf_counter()
+        text = "".join(str(index) for index in range(200_000))
+        sorted(text.split("7"))
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure(function, data):
+    """(best seconds, peak bytes allocated) of function(data)."""
+    timer = timeit.Timer(lambda: function(data))
+    number, seconds = timer.autorange()
+    times = [seconds / number]
+    while len(times) < REPEATS and sum(times) * number < REPEAT_SECONDS:
+        times.append(timer.timeit(number) / number)
+    best = min(times)
+
+    tracemalloc.start()
+    try:
+        function(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def run(cases, sizes):
+    """{case: {size: {"seconds", "peak_bytes"}}} of the given cases and sizes."""
+    results = {}
+    for name in cases:
+        function, generate = CASES[name]
+        for size in sizes:
+            data = generate(random.Random(SEED), size)
+            seconds, peak = measure(function, data)
+            results.setdefault(name, {})[str(size)] = {"seconds": seconds, "peak_bytes": peak}
+            print(f"{name:<32}{format_size(size):>8}{seconds * 1000:>11.2f}ms{format_size(peak):>10}{size / seconds / 1e6:>10.1f}MB/s")
+    return results
+
+
+def compare(results, baseline, scale):
+    """Regressions of results against the baseline, with baseline times multiplied by scale."""
+    regressions = []
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            reference = baseline.get(name, {}).get(size)
+            if not reference:
+                continue
+            limit = reference["seconds"] * scale * TIME_TOLERANCE
+            if result["seconds"] > limit:
+                regressions.append(
+                    f"{name} at {format_size(int(size))}: {result['seconds'] * 1000:.2f}ms, "
+                    f"baseline {reference['seconds'] * scale * 1000:.2f}ms"
+                )
+            if result["peak_bytes"] > reference["peak_bytes"] * MEMORY_TOLERANCE:
+                regressions.append(
+                    f"{name} at {format_size(int(size))}: peak {format_size(result['peak_bytes'])}, "
+                    f"baseline {format_size(reference['peak_bytes'])}"
+                )
+    return regressions
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1000 or unit == "MB":
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the text-processing steps on synthetic model output and compare them to a baseline.")
+    parser.add_argument("cases", nargs="*", help=f"Cases to run (default: all of {', '.join(CASES)})")
+    parser.add_argument("--sizes", type=lambda value: [int(size) for size in value.split(",")], default=DEFAULT_SIZES,
+                        help="Comma-separated input sizes in bytes")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save", action="store_true", help="Store the results as the new baseline")
+    args = parser.parse_args()
+
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        print(f"Error: Unknown cases: {', '.join(unknown)}")
+        sys.exit(1)
+
+    calibration = calibrate()
+    print(f"{'case':<32}{'input':>8}{'time':>13}{'peak':>10}{'throughput':>14}")
+    results = run(args.cases or list(CASES), args.sizes)
+
+    if args.save:
+        try:
+            with open(args.baseline, "r") as f:
+                baseline = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            baseline = {"calibration": calibration, "cases": {}}
+        # Keep times comparable to the calibration the baseline was recorded with
+        scale = baseline["calibration"] / calibration
+        for name, sizes in results.items():
+            for size, result in sizes.items():
+                baseline["cases"].setdefault(name, {})[size] = dict(result, seconds=result["seconds"] * scale)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"Saved the baseline to {args.baseline}.")
+        return
+
+    try:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        print(f"No baseline at {args.baseline}; store one with --save.")
+        return
+
+    regressions = compare(results, baseline["cases"], calibration / baseline["calibration"])
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    if regressions:
+        sys.exit(1)
+    print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
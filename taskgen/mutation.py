@@ -0,0 +1,336 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import tempfile
+
+from .grading_pool import GradingPool
+from .java import mask_comments_and_literals, method_spans
+
+CACHE_DIR = os.getenv("MUTATION_CACHE_DIR", ".mutation_cache")
+
+# (name, pattern in the masked source, replacement for the matched text).
+# Binary operators are only mutated when surrounded by whitespace, which keeps
+# generics such as List<String> and unary minus out of the way.
+MUTATION_OPERATORS = [
+    ("relational", re.compile(r'(?<=\s)(<=|>=|<|>)(?=\s)'),
+     {"<": "<=", "<=": "<", ">": ">=", ">=": ">"}),
+    ("equality", re.compile(r'(?<=\s)(==|!=)(?=\s)'),
+     {"==": "!=", "!=": "=="}),
+    ("arithmetic", re.compile(r'(?<=\s)([-+*/%])(?=\s)'),
+     {"+": "-", "-": "+", "*": "/", "/": "*", "%": "*"}),
+    ("logical", re.compile(r'(?<=\s)(&&|\|\|)(?=\s)'),
+     {"&&": "||", "||": "&&"}),
+    ("increment", re.compile(r'(\+\+|--)'),
+     {"++": "--", "--": "++"}),
+    ("off-by-one", re.compile(r'(?<![\w.])(\d+)(?![\w.])'),
+     None),
+    ("boolean-return", re.compile(r'\breturn\s+(true|false)\s*;'),
+     {"true": "false", "false": "true"}),
+    ("removed-call", re.compile(r'(?:^|(?<=[{;)])|(?<=\belse))[ \t]*(\w[\w.]*\.remove\([^;\n]*\)\s*;)', re.MULTILINE),
+     None),
+]
+
+
+class Mutant:
+    def __init__(self, file, method, offset, line, operator, start, end, original, replacement):
+        self.file = file
+        self.method = method
+        self.offset = offset
+        self.line = line
+        self.operator = operator
+        self.start = start
+        self.end = end
+        self.original = original
+        self.replacement = replacement
+
+    @property
+    def id(self):
+        # Positioned within the method rather than the file, so an edit to
+        # one method leaves the ids, and cached results, of the others alone
+        return f"{self.file}:{self.method}:{self.offset}:{self.operator}:{self.replacement}"
+
+    def apply(self, code):
+        return code[:self.start] + self.replacement + code[self.end:]
+
+    def to_dict(self):
+        return {
+            "file": self.file,
+            "method": self.method,
+            "line": self.line,
+            "operator": self.operator,
+            "original": self.original,
+            "replacement": self.replacement,
+        }
+
+
+def generate_mutants(file, code):
+    """
+    Return (mutants, method hashes) for one source file. Only code inside
+    method bodies is mutated; each mutant records its innermost method and
+    its offset from the start of that method.
+    """
+    masked = mask_comments_and_literals(code)
+    spans = method_spans(code)
+    method_hashes = {}
+    for name, parameters, start, end in spans:
+        method_hashes[f"{name}({parameters})"] = hashlib.sha256(code[start:end].encode("utf-8")).hexdigest()
+
+    def enclosing_method(position):
+        inside = [(end - start, f"{name}({parameters})", start) for name, parameters, start, end in spans if start <= position < end]
+        return min(inside)[1:] if inside else (None, None)
+
+    mutants = []
+    for operator, pattern, replacements in MUTATION_OPERATORS:
+        for match in pattern.finditer(masked):
+            start, end = match.span(1)
+            method, method_start = enclosing_method(start)
+            if method is None:
+                continue
+            original = code[start:end]
+            if operator == "off-by-one":
+                replacement = str(int(original) + 1)
+            elif operator == "removed-call":
+                replacement = ";"
+            else:
+                replacement = replacements[original]
+            line = code.count("\n", 0, start) + 1
+            mutants.append(Mutant(file, method, start - method_start, line, operator, start, end, original, replacement))
+    return mutants, method_hashes
+
+
+CALL = re.compile(r'\b([A-Za-z_]\w*)\s*\(')
+
+
+def context_hashes(sources):
+    """
+    {(file, method): hash} of what a method's mutants depend on besides the
+    method itself: the solution outside method bodies (fields, initialisers,
+    declarations) and every method it calls, directly or through others,
+    matched by name.
+    """
+    methods = {}
+    skeleton = hashlib.sha256()
+    for file, code in sorted(sources.items()):
+        masked = mask_comments_and_literals(code)
+        spans = method_spans(code)
+        outermost = [
+            span for span in spans
+            if not any(other != span and other[2] <= span[2] and span[3] <= other[3] for other in spans)
+        ]
+        skeleton.update(file.encode("utf-8"))
+        position = 0
+        for _, _, start, end in sorted(outermost, key=lambda span: span[2]):
+            skeleton.update(code[position:start].encode("utf-8"))
+            position = end
+        skeleton.update(code[position:].encode("utf-8"))
+        for name, parameters, start, end in spans:
+            methods[(file, f"{name}({parameters})")] = (
+                name, hashlib.sha256(code[start:end].encode("utf-8")).hexdigest(), set(CALL.findall(masked[start:end]))
+            )
+
+    by_name = {}
+    for key, (name, _, _) in methods.items():
+        by_name.setdefault(name, []).append(key)
+    hashes = {}
+    for key in methods:
+        reached, pending = {key}, [key]
+        while pending:
+            for called in methods[pending.pop()][2]:
+                for callee in by_name.get(called, []):
+                    if callee not in reached:
+                        reached.add(callee)
+                        pending.append(callee)
+        digest = hashlib.sha256(skeleton.digest())
+        for callee in sorted(reached - {key}):
+            digest.update(methods[callee][1].encode("utf-8"))
+        hashes[key] = digest.hexdigest()
+    return hashes
+
+
+def hash_directory(directory):
+    digest = hashlib.sha256()
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".java"):
+            digest.update(name.encode("utf-8"))
+            with open(os.path.join(directory, name), "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()
+
+
+class MutationCache:
+    """
+    Outcomes of earlier mutant runs. A result is reused while the mutated
+    method, what it depends on (see context_hashes) and the test suite are
+    unchanged, so after an edit only mutants in changed methods and their
+    callers run again.
+    """
+
+    def __init__(self, directory=CACHE_DIR):
+        self.path = os.path.join(directory, "results.json")
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.path, "r") as f:
+                self.results = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.results = {}
+
+    @staticmethod
+    def key(mutant, method_hash, context_hash, tests_hash):
+        return hashlib.sha256(f"{mutant.id}|{method_hash}|{context_hash}|{tests_hash}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        return self.results.get(key)
+
+    def put(self, key, status):
+        self.results[key] = status
+
+    def save(self):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.results, f)
+        os.replace(tmp_path, self.path)
+
+
+def classify(result):
+    """Map a grading result to killed, survived, timed-out or stillborn (does not compile)."""
+    if result.get("compiled") is False:
+        return "stillborn"
+    error = result.get("error") or ""
+    if "time limit" in error or "CPU limit" in error:
+        return "timed-out"
+    if error or result.get("failures"):
+        return "killed"
+    return "survived"
+
+
+def run_mutation_testing(solution_dir, test_dir, junit_classpath, workers=4, job_timeout=20, cache=None):
+    """
+    Mutate every solution file, run the tests against each mutant on the
+    grading pool and return a report with the mutation score. Raises
+    RuntimeError when the tests do not pass on the unmutated solution.
+    """
+    sources = {}
+    for name in sorted(os.listdir(solution_dir)):
+        if name.endswith(".java"):
+            with open(os.path.join(solution_dir, name), "r") as f:
+                sources[name] = f.read()
+
+    tests_hash = hash_directory(test_dir)
+    contexts = context_hashes(sources)
+    mutants = []
+    for file, code in sources.items():
+        file_mutants, method_hashes = generate_mutants(file, code)
+        mutants.extend((mutant, method_hashes[mutant.method], contexts[(file, mutant.method)]) for mutant in file_mutants)
+
+    statuses = {}
+    pending = {}
+    for mutant, method_hash, context_hash in mutants:
+        key = MutationCache.key(mutant, method_hash, context_hash, tests_hash)
+        cached = cache.get(key) if cache else None
+        if cached:
+            statuses[mutant.id] = cached
+        else:
+            pending[mutant.id] = (mutant, key)
+
+    scratch_dir = tempfile.mkdtemp(prefix="mutants-")
+    pool = GradingPool(junit_classpath, workers=workers, job_timeout=job_timeout, cpu_limit=job_timeout)
+    try:
+        baseline = pool.grade_all({"original": solution_dir}, test_dir)["original"]
+        if classify(baseline) != "survived":
+            failing = ", ".join(f["test"] for f in baseline.get("failed", [])) or baseline.get("error", "")
+            raise RuntimeError(f"The tests do not pass on the unmutated solution: {failing}")
+
+        submissions = {}
+        for index, (mutant_id, (mutant, _)) in enumerate(pending.items()):
+            mutant_dir = os.path.join(scratch_dir, f"m{index}")
+            os.makedirs(mutant_dir)
+            for file, code in sources.items():
+                with open(os.path.join(mutant_dir, file), "w") as f:
+                    f.write(mutant.apply(code) if file == mutant.file else code)
+            submissions[mutant_id] = mutant_dir
+
+        for mutant_id, result in pool.grade_all(submissions, test_dir).items():
+            statuses[mutant_id] = classify(result)
+            if cache:
+                cache.put(pending[mutant_id][1], statuses[mutant_id])
+    finally:
+        pool.close()
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+        if cache:
+            cache.save()
+
+    counts = {status: 0 for status in ("killed", "timed-out", "survived", "stillborn")}
+    survivors = []
+    for mutant, _, _ in mutants:
+        status = statuses[mutant.id]
+        counts[status] += 1
+        if status == "survived":
+            survivors.append(mutant.to_dict())
+
+    # Timeouts count as kills: the tests noticed the mutant never finishing
+    viable = counts["killed"] + counts["timed-out"] + counts["survived"]
+    return {
+        "score": round((counts["killed"] + counts["timed-out"]) / viable, 3) if viable else None,
+        "counts": counts,
+        "mutants": len(mutants),
+        "rerun": len(pending),
+        "survivors": survivors,
+    }
+
+
+def print_report(report):
+    counts = report["counts"]
+    print(f"{report['mutants']} mutants ({report['rerun']} run, {report['mutants'] - report['rerun']} reused from cache): "
+          f"{counts['killed']} killed, {counts['timed-out']} timed out, {counts['survived']} survived, "
+          f"{counts['stillborn']} did not compile.")
+    score = report["score"]
+    print(f"Mutation score: {score:.0%}" if score is not None else "Mutation score: n/a")
+    for survivor in report["survivors"][:20]:
+        print(f"  survived: {survivor['file']}:{survivor['line']} {survivor['method']} "
+              f"{survivor['operator']} {survivor['original']!r} -> {survivor['replacement']!r}")
+    if len(report["survivors"]) > 20:
+        print(f"  ... and {len(report['survivors']) - 20} more")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how many mutants of the solution the generated tests catch.")
+    parser.add_argument("--solution", default=".hidden_tasks", help="Directory with the solution classes")
+    parser.add_argument("--tests", default="gen_test", help="Directory with the JUnit test classes")
+    parser.add_argument("--junit", required=True, help="Classpath with JUnit 4 and Hamcrest jars")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--job-timeout", type=int, default=20, help="Seconds before a mutant counts as timed out")
+    parser.add_argument("--min-score", type=float, help="Exit with status 2 when the score is below this fraction")
+    parser.add_argument("--no-cache", action="store_true", help="Run every mutant, ignoring earlier results")
+    parser.add_argument("--output", help="Write the report as JSON")
+    args = parser.parse_args()
+
+    if not shutil.which("javac") or not shutil.which("java"):
+        print("Error: javac and java must be on the PATH.")
+        sys.exit(1)
+
+    started = time.monotonic()
+    cache = None if args.no_cache else MutationCache()
+    try:
+        report = run_mutation_testing(args.solution, args.tests, args.junit, args.workers, args.job_timeout, cache)
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    print_report(report)
+    print(f"Finished in {time.monotonic() - started:.1f}s.")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    # A low score means another adversarial test round is worth paying for
+    if args.min_score is not None and (report["score"] or 0.0) < args.min_score:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+from . import package_env
+from .budget import RunBudget
+from .rundir import RunDir
+from .symbols import SymbolIndex, check_consistency
+
+# The stages of the "Generate Task" workflow, in the order a single working
+# tree has to run them. Names match the job ids in generate_task.yml and the
+# commands of python -m taskgen.
+STAGES = [
+    ("generate-task-description",
+     lambda api_key, branch_name: [api_key]),
+    ("generate-solution",
+     lambda api_key, branch_name: [api_key, branch_name]),
+    ("adversarial-review",
+     lambda api_key, branch_name: [api_key, os.path.join("tasks", "new_task.md"), ".hidden_tasks"]),
+    ("generate-tests",
+     lambda api_key, branch_name: [api_key, branch_name]),
+    ("adversarial-test-review",
+     lambda api_key, branch_name: [api_key, "gen_test"]),
+    ("generate-template-code",
+     lambda api_key, branch_name: [api_key, branch_name]),
+]
+
+STAGE_NAMES = [name for name, _ in STAGES]
+
+
+class StageError(Exception):
+    """Raised when a pipeline stage exits with a non-zero status."""
+
+    def __init__(self, stage, returncode, output):
+        super().__init__(f"Stage {stage} failed with exit code {returncode}")
+        self.stage = stage
+        self.returncode = returncode
+        self.output = output
+
+
+def run_stage(stage, api_key, branch_name, workdir, env=None):
+    """
+    Run a single stage in workdir and return its combined output.
+    """
+    for name, build_args in STAGES:
+        if name == stage:
+            break
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+
+    command = [sys.executable, "-m", "taskgen", stage] + build_args(api_key, branch_name)
+    result = subprocess.run(
+        command,
+        cwd=workdir,
+        env=package_env(env),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True
+    )
+    if result.returncode != 0:
+        raise StageError(stage, result.returncode, result.stdout)
+    return result.stdout
+
+
+def parse_branch_name(output):
+    """Extract the branch name announced by generate_task_description."""
+    match = re.search(r'::set-output name=branch_name::(\S+)', output)
+    return match.group(1) if match else None
+
+
+def run_pipeline(api_key, workdir, env=None, branch_name=None, completed=(),
+                 before_stage=None, after_stage=None, run_dir=None):
+    """
+    Run every stage that is not listed in completed, in order.
+
+    With a run_dir, stages that already have a completion marker are skipped
+    as well, their recorded outputs are restored into workdir, and every
+    stage that runs records its inputs, outputs, prompts and responses.
+    If the run directory holds a budget, optional stages are skipped once
+    it runs low and the time spent per stage is recorded in it.
+
+    before_stage(stage) is called before each stage is started and
+    after_stage(stage, branch_name) after it finished successfully, so
+    callers can rate limit and checkpoint. Returns the task branch name.
+    """
+    completed = list(completed)
+    budget = None
+    if run_dir:
+        run = RunDir(run_dir)
+        budget = RunBudget.for_run(run.path)
+        completed += [stage for stage in run.completed_stages(STAGE_NAMES) if stage not in completed]
+        branch_name = branch_name or run.branch_name
+        run.restore_outputs(run.completed_stages(STAGE_NAMES), workdir)
+
+    for stage in STAGE_NAMES:
+        if stage in completed:
+            continue
+        if stage != STAGE_NAMES[0] and not branch_name:
+            raise ValueError(f"Cannot run {stage} without a branch name.")
+
+        if budget and budget.should_skip(stage):
+            # Record the skip as a completed stage so a resumed run does not retry it
+            print(f"Skipping {stage}, the run budget is running low.")
+            budget.end_stage(stage, "skipped")
+            run.begin_stage(stage, workdir)
+            run.complete_stage(stage, workdir)
+            if after_stage:
+                after_stage(stage, branch_name)
+            continue
+
+        if before_stage:
+            before_stage(stage)
+
+        stage_env = dict(env or {})
+        if run_dir:
+            run.begin_stage(stage, workdir)
+            stage_env.update(TASK_RUN_DIR=run.path, TASK_STAGE=stage)
+        if budget:
+            budget.begin_stage(stage)
+        try:
+            output = run_stage(stage, api_key, branch_name, workdir, stage_env)
+        except StageError:
+            if budget:
+                budget.end_stage(stage, "failed")
+            raise
+        if budget:
+            budget.end_stage(stage)
+        if stage == STAGE_NAMES[0]:
+            branch_name = parse_branch_name(output) or branch_name
+        if run_dir:
+            with open(os.path.join(run.stage_dir(stage), "output.log"), "w") as f:
+                f.write(output)
+            run.branch_name = branch_name
+            run.complete_stage(stage, workdir)
+
+        if after_stage:
+            after_stage(stage, branch_name)
+    return branch_name
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the task generation pipeline locally.")
+    parser.add_argument("api_key")
+    parser.add_argument("--run-dir", default=os.path.join("runs", "latest"),
+                        help="Directory recording inputs, outputs, prompts and responses per stage")
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip completed stages and restart from the first incomplete one")
+    parser.add_argument("--token-budget", type=int, default=int(os.getenv("RUN_TOKEN_BUDGET", "0")) or None,
+                        help="Total prompt and output tokens the run may use")
+    parser.add_argument("--time-budget", type=int, default=int(os.getenv("RUN_TIME_BUDGET", "0")) or None,
+                        help="Wall-clock seconds the run may take")
+    args = parser.parse_args()
+
+    run = RunDir(args.run_dir)
+    if args.resume:
+        completed = run.completed_stages(STAGE_NAMES)
+        if completed:
+            print(f"Resuming after {completed[-1]} on branch {run.branch_name}")
+    else:
+        run.reset()
+    # A resumed run keeps drawing from the budget it started with
+    budget = RunBudget.for_run(run.path)
+    if budget is None and (args.token_budget or args.time_budget):
+        budget = RunBudget.create(run.path, args.token_budget, args.time_budget)
+
+    def announce(stage):
+        print(f"Running {stage}...")
+
+    try:
+        branch_name = run_pipeline(args.api_key, os.getcwd(), before_stage=announce, run_dir=run.path)
+    except StageError as e:
+        with open(os.path.join(run.stage_dir(e.stage), "output.log"), "w") as f:
+            f.write(e.output)
+        print(e.output)
+        print(f"Error: {e}. Rerun with --resume to restart from this stage.")
+        if budget:
+            print(budget.report())
+        sys.exit(1)
+    print(f"Pipeline completed on branch {branch_name}")
+
+    index = SymbolIndex(os.path.join(run.path, "symbols.json"))
+    index.update()
+    index.save()
+    problems = check_consistency(index)
+    if problems:
+        print(f"{len(problems)} consistency problems between the solution, template and tests:")
+        for problem in problems:
+            print(f"  {problem}")
+    if budget:
+        print(budget.report())
+
+
+if __name__ == "__main__":
+    main()
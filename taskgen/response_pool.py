@@ -0,0 +1,185 @@
+import os
+import sys
+import json
+import fcntl
+import random
+import hashlib
+import argparse
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from .completion import complete, create_client
+
+# Outside the checkout, so the pools outlive the job that uses them. The
+# scheduled Fill Response Pools workflow fills them and saves this directory
+# with actions/cache; jobs that serve responses restore it under the
+# "response-pools-" key prefix.
+POOL_DIR = os.getenv(
+    "RESPONSE_POOL_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "taskgen", "response_pools")
+)
+
+# Prompts whose answer does not depend on the submission, so responses can be
+# generated ahead of time. Each fill request gets one of the variations
+# appended so the pool does not converge on a single phrasing.
+POOLS = {
+    "compliment": {
+        "messages": [
+            {
+                "role": "system",
+                "content": "You are a helpful instructor providing positive feedback to a student."
+            },
+            {
+                "role": "user",
+                "content": (
+                    "A student has submitted their solution for a programming assignment, and their code passed all the tests.\n\n"
+                    "Provide a congratulatory message to the student, do not make it too rosy or too long but simple, and suggest some further readings or topics they can explore to deepen their understanding."
+                )
+            }
+        ],
+        "variations": [
+            "Suggest topics related to data structures.",
+            "Suggest topics related to algorithmic complexity.",
+            "Suggest topics related to testing and debugging.",
+            "Suggest topics related to object-oriented design.",
+            "Suggest topics related to the Java standard library.",
+            "Suggest topics related to clean code and refactoring.",
+        ],
+        "max_tokens": 300,
+        "size": 40,
+        "low_water": 10,
+        "max_uses": 5,
+    },
+}
+
+
+class ResponsePool:
+    """
+    Pre-generated responses for one prompt. The response a recipient gets
+    is picked by a hash of the recipient, so jobs that each restore the same
+    read-only copy of the pool still spread over it. Where the pool
+    directory persists between jobs, a response is also never served twice
+    to the same recipient and is retired after max_uses.
+    """
+
+    def __init__(self, name, directory=POOL_DIR):
+        if name not in POOLS:
+            raise ValueError(f"Unknown response pool: {name}")
+        self.name = name
+        self.spec = POOLS[name]
+        self.directory = directory
+        self.path = os.path.join(directory, f"{name}.json")
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        """Hold an exclusive lock and yield the pool state, saving it on exit."""
+        with open(self.path + ".lock", "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(self.path, "r") as f:
+                    state = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                state = {"responses": []}
+            yield state
+            with open(self.path + ".tmp", "w") as f:
+                json.dump(state, f, indent=2)
+            os.replace(self.path + ".tmp", self.path)
+
+    def available(self, state):
+        return [r for r in state["responses"] if r["uses"] < self.spec["max_uses"]]
+
+    def take(self, recipient):
+        """Return a response the recipient has not seen yet, or None if there is none."""
+        with self._locked() as state:
+            responses = self.available(state)
+            if not responses:
+                return None
+            start = int(hashlib.sha256(str(recipient).encode("utf-8")).hexdigest(), 16) % len(responses)
+            for offset in range(len(responses)):
+                response = responses[(start + offset) % len(responses)]
+                if recipient not in response["seen_by"]:
+                    response["uses"] += 1
+                    response["seen_by"].append(recipient)
+                    return response["text"]
+            return None
+
+    def is_low(self):
+        with self._locked() as state:
+            return len(self.available(state)) < self.spec["low_water"]
+
+    def fill(self, client, count=None, workers=4):
+        """
+        Generate responses until the pool holds its target size. Returns the
+        number added, or 0 when another fill is already running.
+        """
+        with open(self.path + ".fill.lock", "w") as fill_lock:
+            try:
+                fcntl.flock(fill_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return 0
+            return self._fill(client, count, workers)
+
+    def _fill(self, client, count, workers):
+        with self._locked() as state:
+            state["responses"] = self.available(state)
+            missing = (count or self.spec["size"]) - len(state["responses"])
+            known = {r["hash"] for r in state["responses"]}
+        if missing <= 0:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            texts = list(executor.map(lambda _: self._generate(client), range(missing)))
+
+        added = 0
+        with self._locked() as state:
+            for text in texts:
+                digest = hashlib.sha256(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+                if text and digest not in known:
+                    known.add(digest)
+                    state["responses"].append({"text": text, "hash": digest, "uses": 0, "seen_by": []})
+                    added += 1
+        return added
+
+    def _generate(self, client):
+        messages = [dict(message) for message in self.spec["messages"]]
+        messages[-1]["content"] += "\n\n" + random.choice(self.spec["variations"])
+        try:
+            return complete(
+                client,
+                messages,
+                stage=self.name,
+                max_tokens=self.spec["max_tokens"],
+                temperature=1.0,
+            )
+        except Exception as e:
+            print(f"Error generating {self.name} response: {e}")
+            return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage pre-generated response pools.")
+    parser.add_argument("command", choices=["fill", "status"])
+    parser.add_argument("pool", choices=sorted(POOLS))
+    parser.add_argument("--count", type=int, help="Target pool size (defaults to the pool's size)")
+    parser.add_argument("--dir", default=POOL_DIR)
+    args = parser.parse_args()
+
+    pool = ResponsePool(args.pool, args.dir)
+    if args.command == "status":
+        with pool._locked() as state:
+            available = pool.available(state)
+            print(f"{len(available)} of {len(state['responses'])} responses available in {args.pool}.")
+        return
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        print("Error: OPENAI_API_KEY is not set.")
+        sys.exit(1)
+
+    added = pool.fill(create_client(api_key), args.count)
+    print(f"Added {added} responses to {args.pool}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import re
+import json
+import hashlib
+import threading
+
+CACHE_DIR = os.getenv("REVIEW_CACHE_DIR", ".review_cache")
+
+
+def hash_text(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def review_key(task_description, sources):
+    """Hash of the task plus every submitted file, independent of walk order."""
+    digest = hashlib.sha256(hash_text(task_description).encode("ascii"))
+    for path in sorted(sources):
+        digest.update(f"\0{path}\0{hash_text(sources[path])}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def summarize_source(path, content):
+    """One compact line per unchanged file: its size and method signatures."""
+    signatures = re.findall(
+        r'^\s*((?:public|protected|private)[\w\s<>\[\],]*?\s\w+\s*\([^)]*\))\s*(?:throws [\w\s,.]+)?\{',
+        content,
+        re.MULTILINE
+    )
+    lines = content.count("\n") + 1
+    summary = f"- {path} ({lines} lines)"
+    if signatures:
+        summary += ": " + "; ".join(" ".join(signature.split()) for signature in signatures)
+    return summary
+
+
+class ReviewCache:
+    """
+    Reviews keyed on the content hash of task plus sources, and the last
+    reviewed state of each pull request.
+    """
+
+    def __init__(self, directory=CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _read(self, name):
+        try:
+            with open(os.path.join(self.directory, name), "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _write(self, name, data):
+        path = os.path.join(self.directory, name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def get_review(self, key):
+        entry = self._read(f"review-{key}.json")
+        return entry["feedback"] if entry else None
+
+    def put_review(self, key, feedback):
+        self._write(f"review-{key}.json", {"feedback": feedback})
+
+    def last_reviewed(self, pr_number):
+        """Return {'key', 'commit', 'files'} for the last review of the PR, or None."""
+        return self._read(f"pr-{pr_number}.json")
+
+    def mark_reviewed(self, pr_number, key, commit, sources):
+        self._write(f"pr-{pr_number}.json", {
+            "key": key,
+            "commit": commit,
+            "files": {path: hash_text(content) for path, content in sources.items()},
+        })
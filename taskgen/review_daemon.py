@@ -0,0 +1,442 @@
+import os
+import re
+import sys
+import hmac
+import json
+import base64
+import time
+import signal
+import sqlite3
+import fnmatch
+import hashlib
+import argparse
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .completion import Cancelled, create_client, percentile
+from .github import SERVER_URL
+from .review_cache import CACHE_DIR, ReviewCache
+from .review_submission import review_pull_request
+
+QUEUE_DB = os.getenv("REVIEW_QUEUE_DB", ".review_queue.sqlite3")
+WORK_DIR = os.getenv("REVIEW_WORK_DIR", ".review_daemon")
+
+# Pull request events that change the code under review
+REVIEWED_ACTIONS = ("opened", "synchronize", "reopened")
+MAX_ATTEMPTS = 3
+# Finished jobs the latency metrics are computed over
+METRICS_WINDOW = 200
+# owner/name of a repository, so a payload cannot steer the fetch URL
+REPOSITORY_NAME = re.compile(r'^[\w-][\w.-]*/[\w-][\w.-]*$')
+# Seconds a job waits for further pushes to the same pull request
+DEBOUNCE_SECONDS = float(os.getenv("REVIEW_DEBOUNCE_SECONDS", "30"))
+
+
+class JobQueue:
+    """
+    Review jobs in a SQLite database, so queued work survives a restart.
+    Jobs of one pull request are handed out one at a time, in order, and a
+    new job replaces the queued jobs of its pull request.
+    """
+
+    def __init__(self, path=QUEUE_DB):
+        self.path = path
+        self.lock = threading.Lock()
+        self.available = threading.Condition(self.lock)
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                repo TEXT NOT NULL,
+                pr INTEGER NOT NULL,
+                sha TEXT NOT NULL,
+                clone_url TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                outcome TEXT,
+                error TEXT,
+                enqueued REAL NOT NULL,
+                started REAL,
+                finished REAL,
+                not_before REAL
+            )
+        """)
+        columns = [row["name"] for row in self.db.execute("PRAGMA table_info(jobs)")]
+        if "not_before" not in columns:
+            self.db.execute("ALTER TABLE jobs ADD COLUMN not_before REAL")
+        self.db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+        # Jobs that were running when the daemon stopped start over
+        self.db.execute("UPDATE jobs SET status = 'queued', started = NULL WHERE status = 'running'")
+
+    def put(self, repo, pr, sha, clone_url, delay=0.0):
+        """
+        Queue a job that becomes available after delay seconds, marking the
+        queued jobs of the same pull request superseded. Returns (job id,
+        number of jobs superseded).
+        """
+        now = time.time()
+        with self.available:
+            superseded = self.db.execute(
+                "UPDATE jobs SET status = 'superseded', finished = ? WHERE repo = ? AND pr = ? AND status = 'queued'",
+                (now, repo, pr)
+            ).rowcount
+            cursor = self.db.execute(
+                "INSERT INTO jobs (repo, pr, sha, clone_url, enqueued, not_before) VALUES (?, ?, ?, ?, ?, ?)",
+                (repo, pr, sha, clone_url, now, now + delay)
+            )
+            self.available.notify()
+            return cursor.lastrowid, superseded
+
+    def claim(self, timeout=1.0):
+        """Mark the oldest job of a pull request nobody is working on as running and return it, or None."""
+        with self.available:
+            job = self._next()
+            if job is None:
+                self.available.wait(timeout)
+                job = self._next()
+            if job is None:
+                return None
+            self.db.execute(
+                "UPDATE jobs SET status = 'running', started = ?, attempts = attempts + 1 WHERE id = ?",
+                (time.time(), job["id"])
+            )
+            return dict(job, attempts=job["attempts"] + 1)
+
+    def _next(self):
+        return self.db.execute("""
+            SELECT * FROM jobs AS j WHERE status = 'queued' AND (not_before IS NULL OR not_before <= ?) AND NOT EXISTS (
+                SELECT 1 FROM jobs WHERE status = 'running' AND repo = j.repo AND pr = j.pr
+            ) ORDER BY id LIMIT 1
+        """, (time.time(),)).fetchone()
+
+    def finish(self, job_id, outcome):
+        with self.available:
+            self.db.execute(
+                "UPDATE jobs SET status = 'done', outcome = ?, finished = ? WHERE id = ?",
+                (outcome, time.time(), job_id)
+            )
+            self.available.notify_all()
+
+    def cancel(self, job_id):
+        with self.available:
+            self.db.execute("UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ?", (time.time(), job_id))
+            self.available.notify_all()
+
+    def fail(self, job, error):
+        """Requeue the job, or mark it failed after MAX_ATTEMPTS."""
+        status = "queued" if job["attempts"] < MAX_ATTEMPTS else "failed"
+        with self.available:
+            self.db.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished = ? WHERE id = ?",
+                (status, error, time.time() if status == "failed" else None, job["id"])
+            )
+            self.available.notify_all()
+
+    def metrics(self):
+        with self.lock:
+            counts = dict(self.db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            outcomes = dict(self.db.execute(
+                "SELECT outcome, COUNT(*) FROM jobs WHERE status = 'done' GROUP BY outcome"
+            ).fetchall())
+            recent = self.db.execute(
+                "SELECT started - enqueued, finished - started FROM jobs WHERE status = 'done' ORDER BY id DESC LIMIT ?",
+                (METRICS_WINDOW,)
+            ).fetchall()
+            oldest = self.db.execute("SELECT MIN(enqueued) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+        def summary(samples):
+            if not samples:
+                return None
+            return {"p50": round(percentile(samples, 50), 3), "p90": round(percentile(samples, 90), 3)}
+
+        return {
+            "queue_depth": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "superseded": counts.get("superseded", 0),
+            "cancelled": counts.get("cancelled", 0),
+            # Every superseded or cancelled job is a review of an outdated commit not paid for
+            "saved_calls": counts.get("superseded", 0) + counts.get("cancelled", 0),
+            "outcomes": outcomes,
+            "oldest_queued_seconds": round(time.time() - oldest, 3) if oldest else None,
+            "wait_seconds": summary([row[0] for row in recent]),
+            "review_seconds": summary([row[1] for row in recent]),
+        }
+
+
+class SubmissionReader:
+    """
+    Reads the task description and submitted sources of a commit from a
+    bare mirror per repository, fetching only the commits it needs. Commits
+    are always fetched from the pull request refs of the repository on
+    GITHUB_SERVER_URL, never from a URL a webhook payload names.
+    """
+
+    def __init__(self, work_dir, gh_token):
+        self.work_dir = work_dir
+        self.gh_token = gh_token
+        self.locks = {}
+        self.locks_lock = threading.Lock()
+
+    def _git(self, git_dir, *args, env=None):
+        return subprocess.run(
+            ["git", "--git-dir", git_dir] + list(args),
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            env=env
+        ).stdout
+
+    def _credentials(self):
+        """
+        Environment passing the token as a header for the server only. It
+        stays out of the URL, so neither the command line nor git's error
+        messages contain it.
+        """
+        env = dict(os.environ)
+        if self.gh_token:
+            basic = base64.b64encode(f"x-access-token:{self.gh_token}".encode("utf-8")).decode("ascii")
+            env.update({
+                "GIT_CONFIG_COUNT": "1",
+                "GIT_CONFIG_KEY_0": f"http.{SERVER_URL}/.extraheader",
+                "GIT_CONFIG_VALUE_0": f"Authorization: Basic {basic}",
+                "GIT_TERMINAL_PROMPT": "0",
+            })
+        return env
+
+    def redact(self, text):
+        """text with the token, in the forms git could show it in, removed."""
+        if not self.gh_token:
+            return text
+        basic = base64.b64encode(f"x-access-token:{self.gh_token}".encode("utf-8")).decode("ascii")
+        return text.replace(basic, "***").replace(self.gh_token, "***")
+
+    def read(self, repo, pr, sha):
+        if not REPOSITORY_NAME.match(repo):
+            raise ValueError(f"Invalid repository name: {repo!r}")
+        git_dir = os.path.join(self.work_dir, "repos", repo.replace("/", "__") + ".git")
+        with self.locks_lock:
+            lock = self.locks.setdefault(git_dir, threading.Lock())
+        with lock:
+            if not os.path.isdir(git_dir):
+                os.makedirs(git_dir)
+                self._git(git_dir, "init", "--bare", "--quiet")
+            try:
+                self._git(git_dir, "cat-file", "-e", f"{sha}^{{commit}}")
+            except subprocess.CalledProcessError:
+                url, env = f"{SERVER_URL}/{repo}.git", self._credentials()
+                ref = f"refs/pull/{pr}/head"
+                self._git(git_dir, "fetch", "--quiet", "--depth", "1", url, f"+{ref}:{ref}", env=env)
+                try:
+                    self._git(git_dir, "cat-file", "-e", f"{sha}^{{commit}}")
+                except subprocess.CalledProcessError:
+                    # The pull request moved on since the event; the commit
+                    # is still reachable from its ref history
+                    self._git(git_dir, "fetch", "--quiet", "--depth", "1", url, sha, env=env)
+
+        task_description = self._git(git_dir, "show", f"{sha}:tasks/new_task.md")
+        sources = {}
+        for path in self._git(git_dir, "ls-tree", "-r", "--name-only", sha, "--", "gen_src").splitlines():
+            if path.endswith(".java"):
+                sources[path] = self._git(git_dir, "show", f"{sha}:{path}")
+        return task_description, sources
+
+
+class ReviewDaemon:
+    def __init__(self, queue, reader, client, gh_token, workers=4, base_branches="task-*", secret=None, session=None,
+                 debounce=DEBOUNCE_SECONDS, repositories="*"):
+        if session is None:
+            import requests
+            session = requests.Session()
+
+        self.queue = queue
+        self.reader = reader
+        self.client = client
+        self.gh_token = gh_token
+        # One OpenAI client and one HTTP session for all workers, so
+        # connections stay open between reviews
+        self.session = session
+        self.workers = workers
+        self.base_branches = base_branches
+        self.repositories = [pattern.strip() for pattern in repositories.split(",") if pattern.strip()]
+        self.secret = secret
+        self.debounce = debounce
+        # (repo, pr) -> (sha, cancel event) of the review in progress
+        self.running = {}
+        self.running_lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.threads = []
+        self.started = time.time()
+
+    def accept(self, event, payload):
+        """Queue a review for a pull request event; returns the job id, or None if the event is ignored."""
+        if event not in (None, "pull_request") or payload.get("action") not in REVIEWED_ACTIONS:
+            return None
+        pull_request = payload["pull_request"]
+        if not fnmatch.fnmatch(pull_request["base"]["ref"], self.base_branches):
+            return None
+        repo = payload["repository"]["full_name"]
+        if not REPOSITORY_NAME.match(repo) or not any(fnmatch.fnmatch(repo, pattern) for pattern in self.repositories):
+            return None
+        pr, sha = int(pull_request["number"]), pull_request["head"]["sha"]
+        # The commit is fetched from the base repository's pull request ref;
+        # the URL is only kept for reference
+        job_id, superseded = self.queue.put(repo, pr, sha, f"{SERVER_URL}/{repo}.git", self.debounce)
+        if superseded:
+            print(f"{repo}#{pr}: {sha[:7]} supersedes {superseded} queued review(s).")
+        with self.running_lock:
+            running = self.running.get((repo, pr))
+        if running and running[0] != sha:
+            print(f"{repo}#{pr}: {sha[:7]} cancels the review of {running[0][:7]} in progress.")
+            running[1].set()
+        return job_id
+
+    def verify(self, body, signature):
+        if not self.secret:
+            return True
+        expected = "sha256=" + hmac.new(self.secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, signature or "")
+
+    def start(self):
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"review-worker-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        self.stopping.set()
+        for thread in self.threads:
+            thread.join()
+
+    def _work(self):
+        while not self.stopping.is_set():
+            job = self.queue.claim()
+            if job is None:
+                continue
+            label = f"{job['repo']}#{job['pr']} at {job['sha'][:7]}"
+            cancel = threading.Event()
+            with self.running_lock:
+                self.running[(job["repo"], job["pr"])] = (job["sha"], cancel)
+            try:
+                task_description, sources = self.reader.read(job["repo"], job["pr"], job["sha"])
+                if not sources:
+                    raise RuntimeError("no Java files in gen_src")
+                cache = ReviewCache(os.path.join(CACHE_DIR, job["repo"].replace("/", "__")))
+                outcome = review_pull_request(
+                    self.client, job["repo"], job["pr"], self.gh_token,
+                    task_description, sources, job["sha"], cache, self.session, cancel
+                )
+            except Cancelled:
+                print(f"Review of {label} cancelled, a newer commit is queued.")
+                self.queue.cancel(job["id"])
+            except Exception as e:
+                error = self.reader.redact(str(e))
+                if isinstance(e, subprocess.CalledProcessError) and e.stderr:
+                    error += ": " + self.reader.redact(e.stderr.strip())
+                print(f"Review of {label} failed (attempt {job['attempts']}): {error}")
+                self.queue.fail(job, error)
+            else:
+                print(f"Review of {label}: {outcome}")
+                self.queue.finish(job["id"], outcome)
+            finally:
+                with self.running_lock:
+                    del self.running[(job["repo"], job["pr"])]
+
+    def metrics(self):
+        return dict(self.queue.metrics(), workers=self.workers, uptime_seconds=round(time.time() - self.started))
+
+
+def make_handler(daemon):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, data):
+            body = json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._reply(200, daemon.metrics())
+            elif self.path == "/healthz":
+                self._reply(200, {"ok": True})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/webhook":
+                self._reply(404, {"error": "not found"})
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            if not daemon.verify(body, self.headers.get("X-Hub-Signature-256")):
+                self._reply(401, {"error": "bad signature"})
+                return
+            try:
+                job_id = daemon.accept(self.headers.get("X-GitHub-Event"), json.loads(body))
+            except (ValueError, KeyError, TypeError) as e:
+                self._reply(400, {"error": f"malformed payload: {e}"})
+                return
+            if job_id is None:
+                self._reply(200, {"queued": False})
+            else:
+                self._reply(202, {"queued": True, "job": job_id})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Review pull requests from webhook events on a pool of warm workers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.getenv("REVIEW_DAEMON_PORT", "8080")))
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--db", default=QUEUE_DB, help="SQLite file holding the job queue")
+    parser.add_argument("--work-dir", default=WORK_DIR, help="Directory for the repository mirrors")
+    parser.add_argument("--base-branches", default="task-*", help="Only review pull requests into matching branches")
+    parser.add_argument("--repositories", default=os.getenv("REVIEW_REPOSITORIES", "*"),
+                        help="Comma-separated owner/name patterns of the repositories to review")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS,
+                        help="Seconds to wait for further pushes before reviewing a pull request")
+    args = parser.parse_args()
+
+    api_key = os.getenv('OPENAI_API_KEY')
+    gh_token = os.getenv('GH_TOKEN') or os.getenv('GITHUB_TOKEN')
+    if not api_key or not gh_token:
+        print("Error: OPENAI_API_KEY and GH_TOKEN or GITHUB_TOKEN must be set.")
+        sys.exit(1)
+
+    daemon = ReviewDaemon(
+        JobQueue(args.db),
+        SubmissionReader(args.work_dir, gh_token),
+        create_client(api_key),
+        gh_token,
+        workers=args.workers,
+        base_branches=args.base_branches,
+        secret=os.getenv("REVIEW_WEBHOOK_SECRET"),
+        debounce=args.debounce,
+        repositories=args.repositories,
+    )
+    daemon.start()
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(daemon))
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    print(f"Listening on http://{args.host}:{server.server_port} with {args.workers} workers "
+          f"({daemon.queue.metrics()['queue_depth']} jobs queued).")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.stop()
+
+
+if __name__ == "__main__":
+    main()
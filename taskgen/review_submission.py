@@ -0,0 +1,160 @@
+import os
+import sys
+import subprocess
+
+from .completion import Cancelled, complete, create_client
+from .status_comment import StatusComment
+from .review_cache import ReviewCache, hash_text, review_key, summarize_source
+
+
+def main():
+    # Environment variables
+    api_key = os.getenv('OPENAI_API_KEY')
+    gh_token = os.getenv('GH_TOKEN') or os.getenv('GITHUB_TOKEN')
+    repo = os.getenv('GITHUB_REPOSITORY')
+    pr_number = os.getenv('GITHUB_PR_NUMBER')
+
+    if not all([api_key, gh_token, repo, pr_number]):
+        print("Error: Missing environment variables.")
+        sys.exit(1)
+
+    # Initialize OpenAI client
+    client = create_client(api_key)
+
+    # Read the task description from tasks/new_task.md
+    try:
+        with open('tasks/new_task.md', 'r') as f:
+            task_description = f.read()
+    except FileNotFoundError:
+        print("Error: Task description file 'tasks/new_task.md' not found.")
+        sys.exit(1)
+
+    # Collect student's submission code from gen_src directory
+    sources = collect_sources('gen_src')
+    if not sources:
+        print("Error: No Java files found in 'gen_src' directory.")
+        sys.exit(1)
+
+    try:
+        review_pull_request(client, repo, pr_number, gh_token, task_description, sources, current_commit(), ReviewCache())
+    except Exception as e:
+        print(f"Error reviewing submission: {e}")
+        sys.exit(1)
+
+def review_pull_request(client, repo, pr_number, gh_token, task_description, sources, commit, cache, session=None, cancel=None):
+    """
+    Review the sources and put the review in the pull request's status
+    comment. Returns 'unchanged'
+    when this exact task and code was reviewed last time, 'cached' when a
+    stored review was reused and 'reviewed' after a model call.
+
+    cancel is an optional threading.Event; once it is set no model call is
+    made or finished and nothing is posted, and Cancelled is raised.
+    """
+    # Skip the model entirely when this exact task and code was reviewed before
+    key = review_key(task_description, sources)
+    previous = cache.last_reviewed(pr_number)
+    if previous and previous["key"] == key:
+        print("Submission unchanged since the last review, nothing to do.")
+        return "unchanged"
+
+    feedback = cache.get_review(key)
+    outcome = "cached"
+    if feedback:
+        print("Found a cached review for identical content, skipping the model.")
+    else:
+        incremental = os.getenv('REVIEW_INCREMENTAL', '').lower() in ('1', 'true', 'yes')
+        if incremental and previous:
+            submission_code = build_incremental_submission(sources, previous)
+        else:
+            submission_code = build_full_submission(sources)
+        prompt = build_prompt(task_description, submission_code)
+        check_cancelled(cancel)
+        feedback = generate_review(client, prompt, cancel)
+        cache.put_review(key, feedback)
+        outcome = "reviewed"
+
+    # A review of a superseded commit is not worth a comment
+    check_cancelled(cancel)
+    note = f"commit {commit[:7]}" if commit else None
+    StatusComment(repo, pr_number, gh_token, session).update("review", feedback, note)
+    print("Feedback posted successfully.")
+    cache.mark_reviewed(pr_number, key, commit, sources)
+    return outcome
+
+def collect_sources(directory):
+    """Map the path of every Java file below directory to its content."""
+    sources = {}
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith('.java'):
+                file_path = os.path.join(root, file)
+                with open(file_path, 'r') as code_file:
+                    sources[file_path] = code_file.read()
+    return sources
+
+def build_full_submission(sources):
+    return "".join(f"// File: {path}\n{content}\n\n" for path, content in sources.items())
+
+def build_incremental_submission(sources, previous):
+    """
+    Send only files changed since the last reviewed commit in full, and a
+    one-line summary of everything else.
+    """
+    changed = [path for path, content in sources.items() if previous["files"].get(path) != hash_text(content)]
+    unchanged = [path for path in sources if path not in changed]
+    removed = [path for path in previous["files"] if path not in sources]
+
+    since = f" since commit {previous['commit'][:7]}" if previous.get("commit") else ""
+    parts = [f"Files changed{since}:\n\n"]
+    parts.extend(f"// File: {path}\n{sources[path]}\n\n" for path in changed)
+    if unchanged:
+        parts.append("Unchanged files, already reviewed:\n")
+        parts.extend(summarize_source(path, sources[path]) + "\n" for path in unchanged)
+    if removed:
+        parts.append("Removed files: " + ", ".join(removed) + "\n")
+    return "".join(parts)
+
+def current_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], check=True, stdout=subprocess.PIPE, text=True)
+        return result.stdout.strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+def build_prompt(task_description, submission_code):
+    return (
+        "You are a Java programming instructor. A student has submitted code for the following assignment:\n\n"
+        f"{task_description}\n\n"
+        "Here is the student's submission:\n\n"
+        f"{submission_code}\n\n"
+        "Please review the student's code for correctness, code quality, and adherence to the assignment requirements. "
+        "Check if the code compiles and meets the task objectives. "
+        "Provide constructive feedback, pointing out any issues and suggesting improvements. Your suggestions should be subtle hints to help the student with their submission rather than revealing the answer. "
+        "If the code is sound and correct, provide positive feedback and perhaps suggest advanced topics for further learning."
+        "Keep your output to a point and be concise and effective in your answers."
+    )
+
+def check_cancelled(cancel):
+    if cancel is not None and cancel.is_set():
+        raise Cancelled("the pull request has a newer commit")
+
+def generate_review(client, prompt, cancel=None):
+    return complete(
+        client,
+        stage="review-submission",
+        messages=[
+            {
+                "role": "system",
+                "content": "You are a helpful and thorough Java programming instructor."
+            },
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=1000,
+        temperature=0.7,
+        cancel=cancel,
+    )
+
+if __name__ == "__main__":
+    main()
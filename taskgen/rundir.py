@@ -0,0 +1,154 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from datetime import datetime
+
+COMPLETE_MARKER = "COMPLETE"
+
+_exchange_lock = threading.Lock()
+
+# Files each pipeline stage reads and writes, relative to the working tree.
+STAGE_ARTIFACTS = {
+    "generate-task-description": ([os.path.join("tasks", "original_task.md")], [os.path.join("tasks", "new_task.md")]),
+    "generate-solution": ([os.path.join("tasks", "new_task.md")], [".hidden_tasks"]),
+    "adversarial-review": ([os.path.join("tasks", "new_task.md"), ".hidden_tasks"], [".hidden_tasks"]),
+    "generate-tests": ([".hidden_tasks"], ["gen_test"]),
+    "adversarial-test-review": (["gen_test"], ["gen_test"]),
+    "generate-template-code": ([".hidden_tasks"], ["gen_src"]),
+}
+
+
+class RunDir:
+    """
+    A directory holding everything one pipeline run produced: per stage the
+    inputs, outputs, prompts and responses, plus a completion marker.
+    """
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        os.makedirs(self.path, exist_ok=True)
+
+    def stage_dir(self, stage):
+        return os.path.join(self.path, stage)
+
+    def is_complete(self, stage):
+        return os.path.exists(os.path.join(self.stage_dir(stage), COMPLETE_MARKER))
+
+    def completed_stages(self, stages):
+        """Return the leading stages that are complete, stopping at the first gap."""
+        completed = []
+        for stage in stages:
+            if not self.is_complete(stage):
+                break
+            completed.append(stage)
+        return completed
+
+    def reset(self):
+        """Forget every stage of a previous run."""
+        shutil.rmtree(self.path)
+        os.makedirs(self.path)
+
+    @property
+    def branch_name(self):
+        return self._read_meta().get("branch_name")
+
+    @branch_name.setter
+    def branch_name(self, value):
+        meta = self._read_meta()
+        meta["branch_name"] = value
+        with open(os.path.join(self.path, "run.json"), "w") as f:
+            json.dump(meta, f, indent=2)
+
+    def _read_meta(self):
+        try:
+            with open(os.path.join(self.path, "run.json"), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def begin_stage(self, stage, workdir):
+        """Clear leftovers of an earlier attempt and snapshot the stage inputs."""
+        stage_dir = self.stage_dir(stage)
+        if os.path.isdir(stage_dir):
+            shutil.rmtree(stage_dir)
+        inputs, _ = STAGE_ARTIFACTS.get(stage, ([], []))
+        copy_artifacts(workdir, os.path.join(stage_dir, "inputs"), inputs)
+
+    def complete_stage(self, stage, workdir):
+        """Snapshot the stage outputs and write the completion marker last."""
+        stage_dir = self.stage_dir(stage)
+        _, outputs = STAGE_ARTIFACTS.get(stage, ([], []))
+        output_dir = os.path.join(stage_dir, "outputs")
+        copy_artifacts(workdir, output_dir, outputs)
+
+        marker = {
+            "completed_at": datetime.now().isoformat(timespec="seconds"),
+            "outputs": hash_tree(output_dir),
+        }
+        with open(os.path.join(stage_dir, COMPLETE_MARKER), "w") as f:
+            json.dump(marker, f, indent=2)
+
+    def restore_outputs(self, stages, workdir):
+        """
+        Copy the recorded outputs of completed stages back into workdir, so a
+        resumed run starts from exactly what the earlier stages produced.
+        """
+        for stage in stages:
+            _, outputs = STAGE_ARTIFACTS.get(stage, ([], []))
+            output_dir = os.path.join(self.stage_dir(stage), "outputs")
+            for relative_path in outputs:
+                source = os.path.join(output_dir, relative_path)
+                target = os.path.join(workdir, relative_path)
+                if os.path.isdir(source):
+                    if os.path.isdir(target):
+                        shutil.rmtree(target)
+                    shutil.copytree(source, target)
+                elif os.path.isfile(source):
+                    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+                    shutil.copy2(source, target)
+
+
+def copy_artifacts(workdir, destination, relative_paths):
+    for relative_path in relative_paths:
+        source = os.path.join(workdir, relative_path)
+        target = os.path.join(destination, relative_path)
+        if os.path.isdir(source):
+            shutil.copytree(source, target, dirs_exist_ok=True)
+        elif os.path.isfile(source):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(source, target)
+
+
+def hash_tree(directory):
+    """Map every file below directory to the SHA-256 of its content."""
+    hashes = {}
+    for root, _, files in os.walk(directory):
+        for file in sorted(files):
+            file_path = os.path.join(root, file)
+            with open(file_path, "rb") as f:
+                hashes[os.path.relpath(file_path, directory)] = hashlib.sha256(f.read()).hexdigest()
+    return hashes
+
+
+def record_exchange(messages, response):
+    """
+    Store a prompt and its response in the current stage directory. Does
+    nothing unless the script runs inside a pipeline run (TASK_RUN_DIR).
+    """
+    run_path = os.getenv("TASK_RUN_DIR")
+    stage = os.getenv("TASK_STAGE")
+    if not run_path or not stage:
+        return
+
+    exchange_dir = os.path.join(run_path, stage, "exchanges")
+    os.makedirs(exchange_dir, exist_ok=True)
+    # Stages may complete several requests concurrently
+    with _exchange_lock:
+        index = len([name for name in os.listdir(exchange_dir) if name.startswith("prompt-")]) + 1
+
+        with open(os.path.join(exchange_dir, f"prompt-{index:03d}.json"), "w") as f:
+            json.dump(messages, f, indent=2, ensure_ascii=False)
+        with open(os.path.join(exchange_dir, f"response-{index:03d}.txt"), "w") as f:
+            f.write(response or "")
@@ -0,0 +1,203 @@
+import os
+import re
+import sys
+import time
+import threading
+
+from .github import GitHubError, create_comment, get_comment, list_comments, update_comment
+
+# First line of the bot's status comment, invisible on GitHub
+MARKER = "<!-- taskgen:status -->"
+
+# Login of the account that writes the status comment when that is not a
+# GitHub App (a personal access token); otherwise any bot account qualifies
+STATUS_AUTHOR = os.getenv("STATUS_COMMENT_AUTHOR")
+
+# Sections in the order they are shown
+SECTIONS = {
+    "review": "Review",
+    "feedback": "Test feedback",
+    "result": "Result",
+    "grade": "Grade",
+}
+
+# Replaced sections kept in the collapsed history, newest first
+HISTORY_LIMIT = 5
+HISTORY_CHARS = 1500
+# GitHub rejects comment bodies longer than this
+MAX_BODY = 65536
+
+SECTION = re.compile(r'<!-- taskgen:section (\w+) (.*?) -->\n(.*?)\n<!-- taskgen:/section \1 -->', re.DOTALL)
+ENTRY = re.compile(r'<!-- taskgen:entry -->\n(.*?)\n<!-- taskgen:/entry -->', re.DOTALL)
+
+# Writes of a section that another job's concurrent update overwrote are
+# merged again and retried this many times
+UPDATE_ATTEMPTS = 3
+
+# (repo, pr number) -> (comment id, body, ETag) of status comments this
+# process has read or written. Other jobs write their sections into the same
+# comment, so the body is revalidated before every update; while it is
+# unchanged that costs a 304 that does not count against the rate limit.
+_known = {}
+# (repo, pr number) -> lock, so threads of one process update in turn
+_update_locks = {}
+_known_lock = threading.Lock()
+
+
+class StatusComment:
+    """
+    The single comment the bot keeps on a pull request. Each stage owns a
+    section of it; updating a section edits the comment in place and moves
+    the section's previous content into a collapsed history.
+    """
+
+    def __init__(self, repo, pr_number, gh_token, session=None):
+        self.repo = repo
+        self.pr_number = pr_number
+        self.gh_token = gh_token
+        self.session = session
+
+    def _key(self):
+        return self.repo, str(self.pr_number)
+
+    def _remember(self, comment_id, body, etag=None):
+        with _known_lock:
+            _known[self._key()] = (comment_id, body, etag)
+
+    def find(self):
+        """(comment id, body) of the status comment, or (None, None) if there is none yet."""
+        with _known_lock:
+            known = _known.get(self._key())
+        if known:
+            comment_id, body, etag = known
+            try:
+                comment, etag = get_comment(self.repo, comment_id, self.gh_token, self.session, etag)
+            except GitHubError as e:
+                if e.status != 404:
+                    raise
+                # Someone deleted the comment; look for another or start anew
+                with _known_lock:
+                    _known.pop(self._key(), None)
+            else:
+                if comment is not None:
+                    body = comment["body"]
+                self._remember(comment_id, body, etag)
+                return comment_id, body
+        for comment in list_comments(self.repo, self.pr_number, self.gh_token, self.session):
+            # Anyone can paste the marker into a comment of their own
+            if comment.get("body", "").startswith(MARKER) and is_bot_comment(comment):
+                self._remember(comment["id"], comment["body"])
+                return comment["id"], comment["body"]
+        return None, None
+
+    def update(self, section, content, note=None, clear=()):
+        """
+        Set section to content, optionally clearing other sections that no
+        longer apply, and write the comment, or create it for the first
+        update of the pull request. GitHub cannot make the write conditional
+        on the body read, so the comment is read back afterwards; when a
+        concurrent update replaced it without this section, the section is
+        merged into the new body and written again. Raises GitHubError on
+        failure.
+        """
+        with _known_lock:
+            lock = _update_locks.setdefault(self._key(), threading.Lock())
+        with lock:
+            stamp = time.strftime("%Y-%m-%d %H:%M UTC", time.gmtime()) + (f", {note}" if note else "")
+            written = (stamp, content.strip())
+            for attempt in range(UPDATE_ATTEMPTS):
+                comment_id, body = self.find()
+                sections, history = parse(body or "")
+                if attempt == 0:
+                    for name in (section,) + tuple(clear):
+                        if name in sections:
+                            history.insert(0, history_entry(name, *sections.pop(name)))
+                sections[section] = written
+                body = render(sections, history[:HISTORY_LIMIT])
+                written = parse(body)[0][section]
+
+                if comment_id is not None:
+                    try:
+                        update_comment(self.repo, comment_id, self.gh_token, body, self.session)
+                    except GitHubError as e:
+                        if e.status != 404:
+                            raise
+                        # Someone deleted the comment; start a new one
+                        comment_id = None
+                if comment_id is None:
+                    comment_id = create_comment(self.repo, self.pr_number, self.gh_token, body, self.session)["id"]
+                self._remember(comment_id, body)
+
+                try:
+                    current, etag = get_comment(self.repo, comment_id, self.gh_token, self.session)
+                except GitHubError as e:
+                    if e.status != 404:
+                        raise
+                    continue
+                self._remember(comment_id, current["body"], etag)
+                if parse(current["body"])[0].get(section) == written:
+                    return comment_id
+                print(f"The status comment changed while updating its {SECTIONS[section].lower()} section, merging again.")
+            return comment_id
+
+
+def is_bot_comment(comment):
+    user = comment.get("user") or {}
+    if STATUS_AUTHOR:
+        return user.get("login") == STATUS_AUTHOR
+    return user.get("type") == "Bot"
+
+
+def parse(body):
+    """({section: (stamp, content)}, [history entry]) of a status comment body."""
+    sections = {name: (stamp, content) for name, stamp, content in SECTION.findall(body) if name in SECTIONS}
+    return sections, ENTRY.findall(body)
+
+
+def history_entry(section, stamp, content):
+    if len(content) > HISTORY_CHARS:
+        content = content[:HISTORY_CHARS].rstrip() + " …"
+    return f"**{SECTIONS[section]}**, {stamp}\n\n{content}"
+
+
+def render(sections, history):
+    """
+    The comment body. History entries are dropped, oldest first, until it
+    fits; if the sections alone are too long, the longest ones are cut
+    short, so every section keeps its closing marker.
+    """
+    sections = dict(sections)
+    while True:
+        parts = [MARKER]
+        for name, title in SECTIONS.items():
+            if name in sections:
+                stamp, content = sections[name]
+                parts.append(
+                    f"### {title}\n<sub>{stamp}</sub>\n\n"
+                    f"<!-- taskgen:section {name} {stamp} -->\n{content}\n<!-- taskgen:/section {name} -->"
+                )
+        body = "\n\n".join(parts)
+        if len(body) <= MAX_BODY or not sections:
+            break
+        longest = max(sections, key=lambda name: len(sections[name][1]))
+        stamp, content = sections[longest]
+        keep = max(0, len(content) - (len(body) - MAX_BODY) - len(" …"))
+        sections[longest] = (stamp, content[:keep].rstrip() + " …")
+    while True:
+        full = body
+        if history:
+            entries = "\n\n---\n\n".join(f"<!-- taskgen:entry -->\n{entry}\n<!-- taskgen:/entry -->" for entry in history)
+            full += f"\n\n<details>\n<summary>Earlier updates ({len(history)})</summary>\n\n{entries}\n\n</details>"
+        if len(full) <= MAX_BODY or not history:
+            return full
+        history = history[:-1]
+
+
+def update_status(repo, pr_number, gh_token, section, content, what="Feedback", note=None, clear=()):
+    """Update one section of the pull request's status comment, exiting on failure."""
+    try:
+        StatusComment(repo, pr_number, gh_token).update(section, content, note, clear)
+    except GitHubError as e:
+        print(f'Failed to post {what.lower()}: {e}')
+        sys.exit(1)
+    print(f'{what} posted successfully.')
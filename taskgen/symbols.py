@@ -0,0 +1,342 @@
+import os
+import re
+import sys
+import json
+import hashlib
+import argparse
+
+from .java import mask_comments_and_literals, matching_brace, method_spans
+
+ARTIFACT_DIRS = {
+    "solution": ".hidden_tasks",
+    "template": "gen_src",
+    "tests": "gen_test",
+}
+
+INDEX_VERSION = 3
+
+CLASS_DECLARATION = re.compile(r'\b(class|interface|enum|record)\s+([A-Za-z_]\w*)([^{;]*)\{')
+EXTENDS = re.compile(r'\bextends\s+([A-Za-z_]\w*)')
+# Everything a type extends or implements; interfaces may extend several
+SUPERTYPES = re.compile(r'\b(?:extends|implements)\s+(.*?)(?=\bimplements\b|\bpermits\b|$)', re.DOTALL)
+MODIFIERS = {"public", "private", "protected", "static", "final", "abstract", "synchronized", "native", "default"}
+CONSTRUCTOR_CALL = re.compile(r'\bnew\s+([A-Z]\w*)\s*(?:<[^<>()]*>)?\s*\(')
+MEMBER_CALL = re.compile(r'\b([A-Za-z_]\w*)\s*\.\s*([A-Za-z_]\w*)\s*\(')
+# Methods every object or enum has without declaring them
+IMPLICIT_METHODS = {"equals", "hashCode", "toString", "getClass", "values", "valueOf", "ordinal", "name", "compareTo"}
+# Type name, optional generic arguments, variable name, then '=', ';', ',' or ')'
+DECLARATION = re.compile(r'\b([A-Z]\w*)(?:\s*<[^;{}()]*?>)?(?:\[\])*\s+([a-z_]\w*)\s*(?=[=;,)])')
+
+
+def default_index_path():
+    """Inside a pipeline run the index lives in the run directory."""
+    run_dir = os.getenv("TASK_RUN_DIR")
+    if run_dir:
+        return os.path.join(run_dir, "symbols.json")
+    return os.getenv("SYMBOL_INDEX", ".symbol_index.json")
+
+
+def split_top_level(text, separator=","):
+    """Split on separator outside <>, () and [] nesting."""
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char in "<([":
+            depth += 1
+        elif char in ">)]":
+            depth -= 1
+        if char == separator and depth == 0:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if "".join(current).strip():
+        parts.append("".join(current))
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parameter_types(parameters):
+    types = []
+    for parameter in split_top_level(parameters):
+        tokens = [token for token in re.sub(r'@\w+', '', parameter).split() if token != "final"]
+        types.append(" ".join(tokens[:-1]).replace(" ", "") if len(tokens) > 1 else tokens[0])
+    return types
+
+
+# Generic arguments as in HashMap<String, List<Integer>> or Collections.<T>f:
+# right after a name, empty or starting with a type. Comparisons such as
+# a < b, c > d do not qualify.
+GENERIC_ARGUMENTS = re.compile(r'(?<=[\w.])<\s*(?:[A-Z?][\w\s,.?\[\]]*)?>')
+COMMENT = re.compile(r'/\*.*?\*/|//[^\n]*', re.DOTALL)
+
+
+def count_arguments(code, masked, open_paren):
+    """Number of arguments in the call whose '(' is at open_paren."""
+    close = open_paren
+    depth = 0
+    for close in range(open_paren, len(masked)):
+        if masked[close] == "(":
+            depth += 1
+        elif masked[close] == ")":
+            depth -= 1
+            if depth == 0:
+                break
+    # Masking blanks literals, so only the original text tells f("") from f()
+    if not COMMENT.sub("", code[open_paren + 1:close]).strip():
+        return 0
+    arguments = masked[open_paren + 1:close]
+    while True:
+        stripped = GENERIC_ARGUMENTS.sub("", arguments)
+        if stripped == arguments:
+            break
+        arguments = stripped
+    depth = commas = 0
+    for char in arguments:
+        if char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif char == "," and depth == 0:
+            commas += 1
+    return commas + 1
+
+
+def parse_java(code):
+    """
+    Extract classes with their methods, plus the constructor and member calls
+    made in the file, from one Java source file.
+    """
+    masked = mask_comments_and_literals(code)
+
+    classes = []
+    for match in CLASS_DECLARATION.finditer(masked):
+        end = matching_brace(masked, match.end() - 1)
+        extends = EXTENDS.search(match.group(3))
+        supertypes = [
+            re.sub(r'<.*', '', name).split(".")[-1]
+            for clause in SUPERTYPES.findall(match.group(3)) for name in split_top_level(clause)
+        ]
+        classes.append({
+            "name": match.group(2),
+            "kind": match.group(1),
+            "extends": extends.group(1) if extends else None,
+            "supertypes": supertypes,
+            "abstract": "abstract" in masked[max(masked.rfind(char, 0, match.start()) for char in ";{}") + 1:match.start()].split(),
+            "start": match.start(),
+            "end": end if end != -1 else len(masked),
+            "methods": [],
+        })
+
+    for name, parameters, start, end in method_spans(code):
+        owners = [c for c in classes if c["start"] <= start < c["end"]]
+        if not owners:
+            continue
+        owner = min(owners, key=lambda c: c["end"] - c["start"])
+        boundary = max(masked.rfind(char, 0, start) for char in ";{}")
+        header = re.sub(r'@\w+(?:\([^)]*\))?', '', masked[boundary + 1:start]).split()
+        modifiers = [token for token in header if token in MODIFIERS]
+        return_type = "".join(token for token in header if token not in MODIFIERS) or None
+        owner["methods"].append({
+            "name": name,
+            "parameters": parameter_types(parameters),
+            "returns": None if name == owner["name"] else return_type,
+            "static": "static" in modifiers,
+            "visibility": next((m for m in ("public", "protected", "private") if m in modifiers), "package"),
+        })
+
+    variables = {name: type_name for type_name, name in DECLARATION.findall(masked)}
+    calls = []
+    for match in CONSTRUCTOR_CALL.finditer(masked):
+        calls.append({
+            "class": match.group(1),
+            "method": match.group(1),
+            "arguments": count_arguments(code, masked, match.end() - 1),
+            "line": masked.count("\n", 0, match.start()) + 1,
+        })
+    for match in MEMBER_CALL.finditer(masked):
+        receiver = match.group(1)
+        class_name = receiver if receiver[0].isupper() else variables.get(receiver)
+        if class_name:
+            calls.append({
+                "class": class_name,
+                "method": match.group(2),
+                "arguments": count_arguments(code, masked, match.end() - 1),
+                "line": masked.count("\n", 0, match.start()) + 1,
+            })
+
+    for c in classes:
+        del c["start"], c["end"]
+    return {"classes": classes, "calls": calls}
+
+
+class SymbolIndex:
+    """
+    Classes, method signatures and calls of the solution, template and
+    test sources, with the hash of every file so that an update only
+    re-parses the files that changed.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_index_path()
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+        if data.get("version") != INDEX_VERSION:
+            data = {"version": INDEX_VERSION, "artifacts": {}}
+        self.data = data
+
+    def update(self, artifact_dirs=ARTIFACT_DIRS):
+        """Re-parse new and changed files; returns the number of files parsed."""
+        parsed = 0
+        for artifact, directory in artifact_dirs.items():
+            previous = self.data["artifacts"].get(artifact, {})
+            files = {}
+            if os.path.isdir(directory):
+                for name in sorted(os.listdir(directory)):
+                    if not name.endswith(".java"):
+                        continue
+                    with open(os.path.join(directory, name), "rb") as f:
+                        content = f.read()
+                    digest = hashlib.sha256(content).hexdigest()
+                    if previous.get(name, {}).get("hash") == digest:
+                        files[name] = previous[name]
+                        continue
+                    files[name] = dict(parse_java(content.decode("utf-8", errors="replace")), hash=digest)
+                    parsed += 1
+            self.data["artifacts"][artifact] = files
+        return parsed
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.data, f)
+        os.replace(tmp_path, self.path)
+
+    def classes(self, artifact):
+        """Map class name to (file, class entry) for one artifact set."""
+        found = {}
+        for file, entry in self.data["artifacts"].get(artifact, {}).items():
+            for c in entry["classes"]:
+                found[c["name"]] = (file, c)
+        return found
+
+    def calls(self, artifact):
+        for file, entry in self.data["artifacts"].get(artifact, {}).items():
+            for call in entry["calls"]:
+                yield file, call
+
+
+def signature(method):
+    static = "static " if method["static"] else ""
+    returns = f"{method['returns']} " if method["returns"] else ""
+    return f"{static}{returns}{method['name']}({', '.join(method['parameters'])})"
+
+
+def inherited_methods(classes, class_name):
+    """
+    (methods, complete) of class_name and every type it extends or
+    implements within the same artifact set. complete is False when a
+    supertype is not in the set, such as RuntimeException, or when one is
+    an interface or abstract class, whose methods without a body are not
+    indexed; methods may then be missing from the list.
+    """
+    methods = []
+    complete = True
+    pending, seen = [class_name], set()
+    while pending:
+        name = pending.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        if name not in classes:
+            complete = False
+            continue
+        entry = classes[name][1]
+        if entry["kind"] == "interface" or entry.get("abstract"):
+            complete = False
+        methods.extend(entry["methods"])
+        pending.extend(entry.get("supertypes", []))
+    return methods, complete
+
+
+def check_consistency(index):
+    """
+    Return a list of problems: solution API missing or different in the
+    template, and test calls to solution methods that do not exist or take
+    a different number of arguments. Calls on JDK types are not checked.
+    """
+    problems = []
+    solution = index.classes("solution")
+    template = index.classes("template")
+
+    if template:
+        for class_name, (file, solution_class) in solution.items():
+            if class_name not in template:
+                problems.append(f"template: class {class_name} from {file} is missing")
+                continue
+            template_file, template_class = template[class_name]
+            template_signatures = {signature(m) for m in template_class["methods"]}
+            solution_signatures = {signature(m) for m in solution_class["methods"] if m["visibility"] != "private"}
+            for missing in sorted(solution_signatures - template_signatures):
+                problems.append(f"template: {template_file} lacks {class_name}.{missing}")
+            public_template = {signature(m) for m in template_class["methods"] if m["visibility"] != "private"}
+            for extra in sorted(public_template - solution_signatures):
+                problems.append(f"template: {template_file} declares {class_name}.{extra}, which the solution does not")
+
+    for file, call in index.calls("tests"):
+        class_name = call["class"]
+        if class_name not in solution or solution[class_name][1]["kind"] == "record":
+            continue
+        if call["method"] in IMPLICIT_METHODS:
+            continue
+        target = f"new {class_name}" if call["method"] == class_name else f"{class_name}.{call['method']}"
+        inherited, complete = inherited_methods(solution, class_name)
+        methods = [m for m in inherited if m["name"] == call["method"]]
+        if not complete:
+            # The method, or an overload of it, may come from a type outside
+            # the solution, which is not indexed
+            continue
+        if not methods:
+            if call["method"] == class_name and call["arguments"] == 0:
+                continue  # implicit default constructor
+            problems.append(f"tests: {file}:{call['line']} calls {target}, which does not exist")
+        elif not any(len(m["parameters"]) == call["arguments"] or m["parameters"][-1:] and m["parameters"][-1].endswith("...")
+                     for m in methods):
+            expected = " or ".join(sorted({str(len(m["parameters"])) for m in methods}))
+            problems.append(f"tests: {file}:{call['line']} calls {target} with "
+                            f"{call['arguments']} arguments, expected {expected}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index the Java symbols of the task artifacts and check their consistency.")
+    parser.add_argument("command", choices=["check", "show"])
+    parser.add_argument("--solution", default=ARTIFACT_DIRS["solution"])
+    parser.add_argument("--template", default=ARTIFACT_DIRS["template"])
+    parser.add_argument("--tests", default=ARTIFACT_DIRS["tests"])
+    parser.add_argument("--index", help="Index file (defaults to the run directory or .symbol_index.json)")
+    args = parser.parse_args()
+
+    index = SymbolIndex(args.index)
+    parsed = index.update({"solution": args.solution, "template": args.template, "tests": args.tests})
+    index.save()
+
+    if args.command == "show":
+        for artifact in ARTIFACT_DIRS:
+            for class_name, (file, entry) in sorted(index.classes(artifact).items()):
+                print(f"{artifact}: {file} {entry['kind']} {class_name}")
+                for method in entry["methods"]:
+                    print(f"    {method['visibility']} {signature(method)}")
+        return
+
+    problems = check_consistency(index)
+    for problem in problems:
+        print(problem)
+    print(f"{len(problems)} problems found ({parsed} files re-indexed).")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+EXERCISE_HEADER = '#### Exercise'
+
+
+def split_task_into_exercises(task_content):
+    """Split a task description into exercises, each starting with '#### Exercise'."""
+    exercises = []
+    current_exercise = []
+    in_exercise = False
+    for line in task_content.split('\n'):
+        if line.strip().startswith(EXERCISE_HEADER):
+            if current_exercise:
+                exercises.append('\n'.join(current_exercise))
+                current_exercise = []
+            in_exercise = True
+        if in_exercise:
+            current_exercise.append(line)
+    if current_exercise:
+        exercises.append('\n'.join(current_exercise))
+    return exercises
@@ -0,0 +1,226 @@
+import os
+import re
+import sys
+from collections import deque
+import xml.etree.ElementTree as ET
+
+# Rough size of a prompt token, used to turn a token budget into characters
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 800
+
+MAX_FAILURES = 50
+MAX_FRAMES = 3
+MAX_MESSAGE_LENGTH = 300
+TAIL_LINES = 40
+
+# Stack frames from these packages say nothing about the student's code
+IGNORED_FRAME_PREFIXES = (
+    "org.junit.", "junit.", "org.hamcrest.", "org.opentest4j.", "org.apache.maven.",
+    "org.gradle.", "java.", "javax.", "jdk.", "sun.", "worker.org.gradle.",
+)
+
+FAILURE_HEADERS = [
+    # Surefire per-test line: [ERROR] testRoll(DiceTest)  Time elapsed: 0.01 s  <<< FAILURE!
+    re.compile(r'^\[ERROR\]\s+(?P<method>[\w$]+)\((?P<cls>[\w.$]+)\).*<<< (?:FAILURE|ERROR)!'),
+    # Surefire 3 per-test line: [ERROR] DiceTest.testRoll  Time elapsed: 0.01 s  <<< FAILURE!
+    re.compile(r'^\[ERROR\]\s+(?P<cls>[\w.$]+)\.(?P<method>[\w$]+)\s+Time elapsed.*<<< (?:FAILURE|ERROR)!'),
+    # Surefire summary: [ERROR]   DiceTest.testRoll:12 expected:<3> but was:<4>
+    re.compile(r'^\[ERROR\]\s+(?P<cls>[\w.$]+)\.(?P<method>[\w$]+):\d+\s+(?P<message>.+)$'),
+    # JUnitCore: 1) testRoll(DiceTest)
+    re.compile(r'^\d+\) (?P<method>[\w$]+)\((?P<cls>[\w.$]+)\)'),
+    # Gradle: DiceTest > testRoll FAILED
+    re.compile(r'^(?P<cls>[\w.$]+) > (?P<method>[\w$]+).*\bFAILED\b'),
+]
+
+TOTALS = re.compile(r'Tests run: (\d+), Failures: (\d+)(?:, Errors: (\d+))?')
+EXPECTED_ACTUAL = re.compile(r'expected:? ?<(?P<expected>.*?)> but was:? ?<(?P<actual>.*?)>')
+
+
+class Failure:
+    def __init__(self, test_id):
+        self.test_id = test_id
+        self.message = None
+        self.frames = []
+
+    def add_message(self, message):
+        if not self.message and message:
+            self.message = message.strip()[:MAX_MESSAGE_LENGTH]
+
+    def add_frame(self, frame):
+        frame = frame.strip()
+        if frame.startswith("at "):
+            frame = frame[3:]
+        if len(self.frames) < MAX_FRAMES and not frame.startswith(IGNORED_FRAME_PREFIXES):
+            self.frames.append(frame)
+
+    def render(self):
+        lines = [f"- {self.test_id}"]
+        if self.message:
+            match = EXPECTED_ACTUAL.search(self.message)
+            if match:
+                lines.append(f"  expected: {match.group('expected')}, actual: {match.group('actual')}")
+            else:
+                lines.append(f"  {self.message}")
+        lines.extend(f"  at {frame}" for frame in self.frames)
+        return "\n".join(lines)
+
+
+class TestReport:
+    """Failing tests, run totals and, for unknown formats, the tail of the log."""
+
+    def __init__(self):
+        self.failures = {}
+        self.dropped = 0
+        self.total = None
+        self.failed = None
+        self.tail = deque(maxlen=TAIL_LINES)
+
+    def failure(self, test_id):
+        """Return the failure for test_id, or None once MAX_FAILURES are kept."""
+        if test_id in self.failures:
+            return self.failures[test_id]
+        if len(self.failures) >= MAX_FAILURES:
+            self.dropped += 1
+            return None
+        self.failures[test_id] = Failure(test_id)
+        return self.failures[test_id]
+
+    def render(self, token_budget=DEFAULT_TOKEN_BUDGET):
+        budget = token_budget * CHARS_PER_TOKEN
+        parts = []
+        if self.total is not None:
+            parts.append(f"{self.failed} of {self.total} tests failed.")
+
+        if not self.failures:
+            tail = "\n".join(self.tail)
+            parts.append(tail[-budget:])
+            return "\n".join(parts)
+
+        used = sum(len(part) + 1 for part in parts)
+        omitted = self.dropped
+        for index, failure in enumerate(self.failures.values()):
+            text = failure.render()
+            if used + len(text) + 1 > budget:
+                omitted += len(self.failures) - index
+                break
+            parts.append(text)
+            used += len(text) + 1
+        if omitted:
+            parts.append(f"... and {omitted} more failing tests.")
+        return "\n".join(parts)
+
+
+def parse_test_results(path):
+    """
+    Parse a JUnit XML report, a directory of them (e.g. target/surefire-reports)
+    or a Maven/Gradle/JUnit console log in one pass.
+    """
+    if os.path.isdir(path):
+        report = TestReport()
+        for name in sorted(os.listdir(path)):
+            if name.endswith(".xml"):
+                parse_junit_xml(os.path.join(path, name), report)
+        return report
+
+    with open(path, "r", errors="replace") as f:
+        start = f.read(512).lstrip()
+    if start.startswith("<"):
+        try:
+            return parse_junit_xml(path)
+        except ET.ParseError:
+            pass
+    return parse_console_log(path)
+
+
+def parse_junit_xml(path, report=None):
+    report = report or TestReport()
+    total = report.total or 0
+    failed = report.failed or 0
+    testcase = None
+    open_elements = []
+    for event, element in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            open_elements.append(element)
+            if element.tag == "testcase":
+                testcase = f"{element.get('classname', '')}.{element.get('name', '')}".lstrip(".")
+            continue
+
+        open_elements.pop()
+        if element.tag == "testcase":
+            total += 1
+            testcase = None
+            # Detach the finished test case so memory stays flat for huge reports
+            if open_elements:
+                open_elements[-1].remove(element)
+        elif element.tag in ("failure", "error") and testcase:
+            failed += 1
+            failure = report.failure(testcase)
+            if failure:
+                failure.add_message(element.get("message") or element.get("type"))
+                for line in (element.text or "").splitlines():
+                    if line.strip().startswith("at "):
+                        failure.add_frame(line)
+                    else:
+                        failure.add_message(line)
+            element.clear()
+        elif element.tag in ("system-out", "system-err"):
+            element.clear()
+    report.total, report.failed = total, failed
+    return report
+
+
+def parse_console_log(path):
+    report = TestReport()
+    current = None
+    with open(path, "r", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            report.tail.append(line[:MAX_MESSAGE_LENGTH])
+            stripped = line.strip()
+
+            totals = TOTALS.search(line)
+            if totals and "Time elapsed" not in line:
+                report.total = int(totals.group(1))
+                report.failed = int(totals.group(2)) + int(totals.group(3) or 0)
+
+            header = match_failure_header(stripped)
+            if header:
+                current = report.failure(f"{header.group('cls')}.{header.group('method')}")
+                if current and "message" in header.groupdict():
+                    current.add_message(header.group("message"))
+                continue
+
+            if current is None or not stripped:
+                continue
+            if stripped.startswith("at "):
+                current.add_frame(stripped)
+            elif stripped.startswith("[") or stripped.startswith("Tests run"):
+                current = None
+            else:
+                current.add_message(stripped)
+    return report
+
+
+def match_failure_header(line):
+    for pattern in FAILURE_HEADERS:
+        match = pattern.match(line)
+        if match:
+            return match
+    return None
+
+
+def summarize_test_results(path, token_budget=DEFAULT_TOKEN_BUDGET):
+    return parse_test_results(path).render(token_budget)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python -m taskgen test-results <test_results_file> [token_budget]")
+        sys.exit(1)
+
+    results_path = sys.argv[1]
+    token_budget = int(sys.argv[2]) if len(sys.argv) == 3 else DEFAULT_TOKEN_BUDGET
+    summary = summarize_test_results(results_path, token_budget)
+    print(summary)
+    if os.path.isfile(results_path):
+        print(f"\n{os.path.getsize(results_path)} bytes reduced to {len(summary)} characters.")
@@ -0,0 +1,171 @@
+import os
+import re
+import sys
+import shutil
+import argparse
+import subprocess
+import tempfile
+
+from .grading_pool import GradingPool
+from .java import mask_comments_and_literals
+from .symbols import SymbolIndex, check_consistency
+
+# Classpath with the JUnit 4 and Hamcrest jars; without it the gate does not run the tests
+JUNIT_CLASSPATH = os.getenv("JUNIT_CLASSPATH")
+
+# "gated" runs the adversarial stages only on files that fail validation,
+# "always" reviews every file as before
+ADVERSARIAL_MODE = os.getenv("ADVERSARIAL_MODE", "gated")
+
+DIAGNOSTIC = re.compile(r'([\w$]+)\.java:\d+: error: ([^\n]*)')
+FAILED_TEST = re.compile(r'^\w+\(([\w$.]+)\)$')
+
+
+def java_files(directory):
+    if not directory or not os.path.isdir(directory):
+        return {}
+    files = {}
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".java"):
+            with open(os.path.join(directory, name), "r") as f:
+                files[name] = f.read()
+    return files
+
+
+def syntax_problems(file_name, code):
+    """Problems a file has on its own: leftover markdown, no class, unbalanced brackets."""
+    problems = []
+    if "```" in code:
+        problems.append("contains markdown code fences")
+    masked = mask_comments_and_literals(code)
+    declared = re.findall(r'\b(?:class|interface|enum|record)\s+([A-Za-z_]\w*)', masked)
+    if not declared:
+        problems.append("declares no class")
+    elif re.search(r'\bpublic\s+(?:(?:abstract|final)\s+)*(?:class|interface|enum|record)\s', masked) \
+            and file_name[:-len(".java")] not in declared:
+        problems.append(f"public type does not match the file name {file_name}")
+    for opening, closing in ("{}", "()"):
+        if masked.count(opening) != masked.count(closing):
+            problems.append(f"unbalanced '{opening}{closing}'")
+    return problems
+
+
+def compile_problems(files, classpath=None):
+    """Compile the files together and return {file name: [first error]} of the files javac rejects."""
+    with tempfile.TemporaryDirectory() as scratch_dir:
+        paths = []
+        for name, code in files.items():
+            path = os.path.join(scratch_dir, name)
+            with open(path, "w") as f:
+                # Tests declare 'package test;', solutions live in the default package
+                f.write(re.sub(r'^\s*package\s+[\w.]+\s*;', '', code, count=1, flags=re.MULTILINE))
+            paths.append(path)
+        command = ["javac", "-nowarn", "-d", os.path.join(scratch_dir, "classes")]
+        if classpath:
+            command += ["-cp", classpath]
+        try:
+            result = subprocess.run(command + paths, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, timeout=120)
+        except subprocess.TimeoutExpired:
+            return {name: ["javac timed out"] for name in files}
+    if result.returncode == 0:
+        return {}
+    problems = {}
+    for class_name, message in DIAGNOSTIC.findall(result.stdout):
+        problems.setdefault(f"{class_name}.java", [f"does not compile: {message}"])
+    return problems or {name: ["does not compile"] for name in files}
+
+
+def validate(solution_dir, test_dir=None):
+    """
+    Validate the solution and, if given, the tests. Returns (solution
+    problems, test problems), each {file name: [problem]}; files without
+    problems are left out. Compilation needs javac on the PATH and running
+    the tests JUNIT_CLASSPATH as well; those checks are skipped otherwise.
+    """
+    solution = java_files(solution_dir)
+    tests = java_files(test_dir)
+    solution_problems = {name: p for name, p in ((n, syntax_problems(n, c)) for n, c in solution.items()) if p}
+    test_problems = {name: p for name, p in ((n, syntax_problems(n, c)) for n, c in tests.items()) if p}
+    if not solution:
+        solution_problems["(none)"] = ["no solution files"]
+
+    # Test calls to solution methods that do not exist or take other arguments
+    if tests and not solution_problems:
+        index = SymbolIndex(os.devnull)
+        index.update({"solution": solution_dir, "tests": test_dir})
+        for problem in check_consistency(index):
+            match = re.match(r'tests: ([\w$]+\.java):', problem)
+            if match:
+                test_problems.setdefault(match.group(1), []).append(problem.split(": ", 1)[1])
+
+    if solution_problems or test_problems or not shutil.which("javac"):
+        return solution_problems, test_problems
+
+    solution_problems.update(compile_problems(solution))
+    if solution_problems or not tests or not JUNIT_CLASSPATH or not shutil.which("java"):
+        return solution_problems, test_problems
+
+    pool = GradingPool(JUNIT_CLASSPATH, workers=1, job_timeout=60, cpu_limit=60)
+    try:
+        result = pool.grade_all({"solution": solution_dir}, test_dir)["solution"]
+    finally:
+        pool.close()
+    if result.get("compiled") is False:
+        for class_name, message in DIAGNOSTIC.findall(result.get("error", "")):
+            test_problems.setdefault(f"{class_name}.java", []).append(f"does not compile: {message}")
+    elif result.get("error"):
+        test_problems.setdefault("(all)", []).append(result["error"])
+    for failure in result.get("failed", []):
+        # A failing test means the test or the class it tests is wrong, so both get reviewed
+        match = FAILED_TEST.match(failure["test"])
+        test_class = match.group(1).split(".")[-1] if match else failure["test"]
+        test_problems.setdefault(f"{test_class}.java", []).append(f"{failure['test']} fails: {failure['message']}")
+        tested = f"{test_class[:-len('Test')]}.java" if test_class.endswith("Test") else None
+        if tested in solution:
+            solution_problems.setdefault(tested, []).append(f"fails {failure['test']}: {failure['message']}")
+    return solution_problems, test_problems
+
+
+def files_to_review(problems, directory):
+    """
+    The files an adversarial stage should rewrite: all of them when gating
+    is off, otherwise only those with problems. Problems not tied to a file
+    put every file under review; with no files there is nothing to review
+    even though such problems remain, so an empty list alone is no pass.
+    """
+    names = list(java_files(directory))
+    if ADVERSARIAL_MODE == "always":
+        return names
+    if any(name not in names for name in problems):
+        return names
+    return [name for name in names if name in problems]
+
+
+def format_problems(problems, files):
+    return "\n".join(f"- {name}: {problem}" for name in files for problem in problems.get(name, []))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the checks that decide which files the adversarial stages review.")
+    parser.add_argument("--solution", default=".hidden_tasks")
+    parser.add_argument("--tests", default="gen_test")
+    args = parser.parse_args()
+
+    solution_problems, test_problems = validate(args.solution, args.tests)
+    checks = ["syntax", "symbols"]
+    if shutil.which("javac"):
+        checks.append("compile")
+        if JUNIT_CLASSPATH and shutil.which("java"):
+            checks.append("tests")
+    print(f"Checks run: {', '.join(checks)}")
+    for label, problems in (("solution", solution_problems), ("tests", test_problems)):
+        for name in sorted(problems):
+            for problem in problems[name]:
+                print(f"{label}: {name}: {problem}")
+    if not solution_problems and not test_problems:
+        print("All files pass; the adversarial stages would be skipped.")
+    sys.exit(1 if solution_problems or test_problems else 0)
+
+
+if __name__ == "__main__":
+    main()